@@ -1,5 +1,31 @@
 from django.apps import AppConfig
+from django.core.checks import Tags, register
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+
+from .checks import check_shared_cache
+from .signals import groups_changed, post_save_user
 
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        CustomUser = self.get_model('CustomUser')
+
+        post_save.connect(
+            post_save_user,
+            sender=CustomUser,
+            dispatch_uid='post_save_user',
+        )
+        post_delete.connect(
+            post_save_user,
+            sender=CustomUser,
+            dispatch_uid='post_delete_user',
+        )
+        m2m_changed.connect(
+            groups_changed,
+            sender=CustomUser.groups.through,
+            dispatch_uid='groups_changed',
+        )
+        register(check_shared_cache, Tags.caches, deploy=True)
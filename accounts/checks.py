@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Error
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Refuses the cached sessions and users with a cache of each process.
+
+    A logout, a password change or a user saved on one process would be
+    missed by the sessions and snapshots cached by the others. It's a
+    deploy check, run by `manage.py check --deploy` on the release of the
+    Procfile.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHES:
+        return []
+    errors = []
+    if 'accounts.middleware.CachedAuthenticationMiddleware' in settings.MIDDLEWARE:
+        errors.append(Error(
+            'CachedAuthenticationMiddleware needs a cache shared by the processes.',
+            hint='Set CACHE_LOCATION to the memcached server.',
+            id='accounts.E001',
+        ))
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db':
+        errors.append(Error(
+            'The cached_db sessions need a cache shared by the processes.',
+            hint='Set CACHE_LOCATION to the memcached server.',
+            id='accounts.E002',
+        ))
+    return errors
@@ -36,9 +36,13 @@ class CustomUserCreationForm(forms.ModelForm):
             raise ValidationError('A confirmação não está correta.')
         return password2
 
-    def save(self, commit=True):
+    def save(self, commit=True, password=None):
+        """Saves the user, `password` is the hash of password1 if already made."""
         user = super().save(commit=False)
-        user.set_password(self.cleaned_data['password1'])
+        if password is None:
+            user.set_password(self.cleaned_data['password1'])
+        else:
+            user.password = password
         if commit:
             user.save()
         return user
@@ -57,9 +61,10 @@ class CustomPasswordResetForm(forms.Form):
     email = forms.EmailField(label='E-mail')
 
     def clean_email(self):
-        # There's a user with this e-mail on db?
+        # There's a user with this e-mail on db? It's kept for save().
         email = self.cleaned_data['email']
-        if not User.objects.filter(email=email).exists():
+        self.user = User.objects.filter(email__iexact=email).order_by('pk').first()
+        if self.user is None:
             raise ValidationError(
                 'Nenhum usuário encontrado com este e-mail.'
             )
@@ -67,10 +72,9 @@ class CustomPasswordResetForm(forms.Form):
     
     def save(self, request=None, use_https=False):
         """Generate a one-use link for resetting password and send it."""
-        email = self.cleaned_data['email']
-        user_email = User.objects.get(email=email)
-        token = default_token_generator.make_token(user_email)
-        reset = PasswordReset(user=user_email, token=token)
+        user = self.user
+        token = default_token_generator.make_token(user)
+        reset = PasswordReset(user=user, token=token)
         reset.save()
         
         subject = 'Criar nova senha no Simple MOOC'
@@ -85,5 +89,5 @@ class CustomPasswordResetForm(forms.Form):
             subject,
             'accounts/password_reset_email.html',
             context,
-            [user_email.email]
+            [user.email]
         )
\ No newline at end of file
@@ -0,0 +1,105 @@
+import time
+import uuid
+import asyncio
+import statistics
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.urls import reverse
+from django.db import connections
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the throughput of the sign up view under concurrency, '
+        'through the WSGI or the ASGI handler. The users are created on the '
+        'configured database (DATABASE_URL) and deleted at the end, so it only '
+        'runs with DEBUG on.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Sign ups made (default: 200).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Sign ups made at the same time (default: 8).',
+        )
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Uses the ASGI handler, otherwise a thread per concurrent sign up on the WSGI one.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError('Com DEBUG desligado o banco pode ser o de produção, nada foi feito.')
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests e --concurrency devem ser ao menos 1.')
+
+        # Allows the "testserver" host of the test clients.
+        setup_test_environment()
+        prefix = f'bench{uuid.uuid4().hex[:8]}'
+        url = reverse('accounts:register')
+        signups = [
+            {
+                'username': f'{prefix}-{number}',
+                'email': f'{prefix}-{number}@benchmark.com',
+                'password1': 'benchmark-123',
+                'password2': 'benchmark-123',
+            }
+            for number in range(options['requests'])
+        ]
+
+        try:
+            start = time.perf_counter()
+            if options['asgi']:
+                latencies = asyncio.run(self.run_asgi(url, signups, options['concurrency']))
+            else:
+                latencies = self.run_wsgi(url, signups, options['concurrency'])
+            elapsed = time.perf_counter() - start
+        finally:
+            get_user_model().objects.filter(username__startswith=f'{prefix}-').delete()
+            teardown_test_environment()
+
+        latencies.sort()
+        self.stdout.write(
+            f'{"ASGI" if options["asgi"] else "WSGI"}  '
+            f'requests: {len(latencies)}  concurrency: {options["concurrency"]}  '
+            f'throughput: {len(latencies) / elapsed:.1f} req/s  '
+            f'latency p50: {statistics.median(latencies) * 1000:.0f} ms  '
+            f'p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms'
+        )
+
+    def run_wsgi(self, url, signups, concurrency):
+        def signup(data):
+            start = time.perf_counter()
+            response = Client().post(url, data)
+            elapsed = time.perf_counter() - start
+            # Each thread has its own connection.
+            connections.close_all()
+            assert response.status_code == 302, response.status_code
+            return elapsed
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(signup, signups))
+
+    async def run_asgi(self, url, signups, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def signup(data):
+            async with semaphore:
+                start = time.perf_counter()
+                # The AsyncClient of Django 3.1 can't read multipart bodies.
+                response = await AsyncClient().post(url, urlencode(data), content_type=FORM_CONTENT_TYPE)
+                assert response.status_code == 302, response.status_code
+                return time.perf_counter() - start
+
+        return list(await asyncio.gather(*(signup(data) for data in signups)))
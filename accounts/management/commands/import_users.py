@@ -0,0 +1,175 @@
+import os
+import csv
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stats import clear_site_stats
+from courses.models import Course, Enrollment
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the users of a CSV file with the columns username, email and, '
+        'optionally, full_name and password. Users without a password must reset it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path of the CSV file, with a header row.')
+        parser.add_argument(
+            '--course', type=int, action='append', dest='courses', default=[],
+            help='Pk of a course to enroll the users in, can be repeated.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Processes hashing the passwords (default: the number of CPUs).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Users inserted per query (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        courses = list(Course.objects.filter(pk__in=options['courses']).values_list('pk', flat=True))
+        missing = set(options['courses']) - set(courses)
+        if missing:
+            raise CommandError(f'Curso(s) não encontrado(s): {", ".join(map(str, sorted(missing)))}.')
+
+        self.courses = courses
+        self.seen_usernames = set()
+        self.seen_emails = set()
+        created = skipped = 0
+
+        # PBKDF2 is slow on purpose, the passwords of a chunk are hashed
+        # by all the workers while the previous chunk is inserted. The
+        # workers are spawned, a forked one would share the db connection.
+        executor = None
+        if options['workers'] > 1:
+            executor = ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('spawn'))
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as csv_file:
+                rows = enumerate(csv.DictReader(csv_file), start=2)
+                pending = None
+                while True:
+                    chunk = list(islice(rows, options['chunk_size']))
+                    if not chunk:
+                        break
+                    lines, users, passwords = self.prepare(chunk)
+                    skipped += len(chunk) - len(users)
+                    hashes = self.hash_passwords(executor, passwords, options['workers'])
+                    if pending:
+                        inserted = self.insert(*pending)
+                        created += inserted
+                        skipped += len(pending[1]) - inserted
+                    pending = (lines, users, hashes)
+                if pending:
+                    inserted = self.insert(*pending)
+                    created += inserted
+                    skipped += len(pending[1]) - inserted
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if created:
+            clear_site_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} usuário(s) criado(s), {skipped} linha(s) ignorada(s).'
+        ))
+
+    def prepare(self, chunk):
+        """Returns the lines, the valid new users of the chunk and their passwords."""
+        rows = []
+        for line, row in chunk:
+            username = User.normalize_username((row.get('username') or '').strip())
+            email = User.objects.normalize_email((row.get('email') or '').strip())
+            try:
+                if not username or len(username) > 30:
+                    raise ValidationError('invalid username')
+                User.username_validator(username)
+                validate_email(email)
+            except ValidationError:
+                self.stderr.write(f'Linha {line}: nome de usuário ou e-mail inválido, ignorada.')
+                continue
+            if username in self.seen_usernames or email.lower() in self.seen_emails:
+                self.stderr.write(f'Linha {line}: nome de usuário ou e-mail repetido, ignorada.')
+                continue
+            self.seen_usernames.add(username)
+            self.seen_emails.add(email.lower())
+            rows.append((line, username, email, row))
+
+        # One query for the whole chunk.
+        existing = User.objects.filter(username__in=[username for _, username, _, _ in rows])
+        existing_usernames = set(existing.values_list('username', flat=True))
+        existing = (
+            User.objects
+            .annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=[email.lower() for _, _, email, _ in rows])
+        )
+        existing_emails = set(existing.values_list('email_lower', flat=True))
+
+        lines, users, passwords = [], [], []
+        for line, username, email, row in rows:
+            if username in existing_usernames or email.lower() in existing_emails:
+                self.stderr.write(f'Linha {line}: usuário já existe, ignorada.')
+                continue
+            lines.append(line)
+            users.append(User(
+                username=username,
+                email=email,
+                full_name=(row.get('full_name') or '').strip(),
+            ))
+            # An empty password makes an unusable one.
+            passwords.append(row.get('password') or None)
+        return lines, users, passwords
+
+    def hash_passwords(self, executor, passwords, workers):
+        """Starts hashing the passwords, returns an iterator of the hashes."""
+        if executor is None:
+            return map(make_password, passwords)
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return executor.map(make_password, passwords, chunksize=chunksize)
+
+    def insert(self, lines, users, hashes):
+        """Inserts the users, waiting for their hashes, and enrolls them.
+
+        The users of a chunk and their enrollments are inserted in a
+        transaction: if one of them conflicts (ex: signed up since the
+        chunk was checked) the whole chunk is skipped. Returns the number
+        of users inserted.
+        """
+        if not users:
+            return 0
+        for user, password in zip(users, hashes):
+            user.password = password
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                if self.courses:
+                    # Only PostgreSQL sets the pks on bulk_create().
+                    pks = (
+                        User.objects
+                        .filter(username__in=[user.username for user in users])
+                        .values_list('pk', flat=True)
+                    )
+                    Enrollment.objects.bulk_create(
+                        [
+                            Enrollment(user_id=pk, course_id=course, status=Enrollment.EnrollmentStatus.APROVADO)
+                            for pk in pks
+                            for course in self.courses
+                        ],
+                        batch_size=1000,
+                    )
+        except IntegrityError as error:
+            self.stderr.write(f'Linhas {lines[0]} a {lines[-1]}: conflito ao inserir o bloco ({error}), ignorado.')
+            return 0
+        return len(users)
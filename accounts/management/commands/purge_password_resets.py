@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import PasswordReset
+
+
+class Command(BaseCommand):
+    help = 'Deletes the password resets that are expired or already confirmed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Resets deleted per query (default: 1000).',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Seconds to wait between the batches (default: 0).',
+        )
+
+    def handle(self, *args, **options):
+        # Small batches, each a short transaction, so the table is never
+        # locked for long. Each batch starts after the last pk of the
+        # previous one, so the rows already passed aren't scanned again.
+        deleted = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                PasswordReset.objects.purgeable()
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not pks:
+                break
+            deleted += PasswordReset.objects.filter(pk__in=pks).delete()[0]
+            last_pk = pks[-1]
+            if len(pks) < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'{deleted} reset(s) de senha removido(s).'))
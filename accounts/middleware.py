@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+
+from .utils import cache_user_snapshot, get_user_snapshot
+
+
+def get_user(request):
+    """Returns the user of the session, from the cache when possible.
+
+    Like django.contrib.auth.get_user(), the user must be active and the
+    session hash must match, otherwise the default path logs it out.
+    """
+    user_id = request.session.get(SESSION_KEY)
+    backend_path = request.session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    # Only the ModelBackend users are cached, another backend could
+    # refuse a user for other reasons.
+    if not isinstance(auth.load_backend(backend_path), ModelBackend):
+        return auth.get_user(request)
+
+    user, version = get_user_snapshot(user_id)
+    if user is not None:
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if user.is_active and session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+            return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache_user_snapshot(user, version)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Sets request.user from a cached snapshot, see accounts.utils.
+
+    Saves the user query of every authenticated request. The snapshot is
+    cleared when the user is saved or deleted or their groups change,
+    and expires after USER_SNAPSHOT_CACHE_TIMEOUT seconds.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_get_user(request))
+
+
+def _cached_get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.7 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+# The e-mail lookup of the password reset is case insensitive, iexact
+# is UPPER("email") = UPPER(%s) on PostgreSQL.
+def create_email_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS accounts_customuser_email_upper_idx '
+            'ON accounts_customuser (UPPER("email"::text))'
+        )
+
+
+def drop_email_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS accounts_customuser_email_upper_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_auto_20210302_1921'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='passwordreset',
+            options={'ordering': ('-created_at',), 'verbose_name': 'reset de senha', 'verbose_name_plural': 'reset de senhas'},
+        ),
+        migrations.AddIndex(
+            model_name='passwordreset',
+            index=models.Index(fields=['created_at'], name='password_reset_created_idx'),
+        ),
+        migrations.RunPython(create_email_upper_index, drop_email_upper_index),
+    ]
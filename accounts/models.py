@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.models import (
     AbstractBaseUser, UserManager, PermissionsMixin
@@ -48,9 +52,42 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         """Returns the full name or the username."""
         return str(self)
     
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self.__dict__.pop('_session_auth_hash', None)
+
+    def get_session_auth_hash(self):
+        """Returns the HMAC of the password field.
+
+        A user loaded from the cache, see accounts.utils, has the hash
+        but not the password.
+        """
+        if '_session_auth_hash' in self.__dict__:
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
     def is_instructor(self):
-        """Returns True if the user is an instructor."""
-        return self.groups.filter(name='instructor').exists()
+        """Returns True if the user is an instructor.
+        
+        The result is kept on the instance. If the groups were loaded with
+        prefetch_related('groups'), no query is made.
+        """
+        if not hasattr(self, '_is_instructor'):
+            groups = getattr(self, '_prefetched_objects_cache', {}).get('groups')
+            if groups is not None:
+                self._is_instructor = any(group.name == 'instructor' for group in groups)
+            else:
+                self._is_instructor = self.groups.filter(name='instructor').exists()
+        return self._is_instructor
+
+
+class PasswordResetManager(models.Manager):
+    """A custom manager for the class PasswordReset."""
+
+    def purgeable(self):
+        """Returns the resets that can't be used anymore, expired or confirmed."""
+        limit = timezone.now() - timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+        return self.get_queryset().filter(Q(created_at__lt=limit) | Q(confirmed=True))
 
 
 class PasswordReset(models.Model):
@@ -64,15 +101,25 @@ class PasswordReset(models.Model):
     token = models.CharField('Token', max_length=50, unique=True)
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     confirmed = models.BooleanField('Confirmado?', blank=True, default=False)
+
+    objects = PasswordResetManager()
     
     class Meta:
         verbose_name = 'reset de senha'
         verbose_name_plural = 'reset de senhas'
         ordering = ('-created_at',)
+        indexes = [
+            # The purge of the expired resets.
+            models.Index(fields=['created_at'], name='password_reset_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user} - {self.confirmed}'
     
+    def is_expired(self):
+        """Returns True if the reset is older than PASSWORD_RESET_TIMEOUT seconds."""
+        return self.created_at < timezone.now() - timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+
     def confirm(self):
         """Confirms the password reset, "invalidate" the token."""
         self.confirmed = True
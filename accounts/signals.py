@@ -0,0 +1,18 @@
+from .utils import clear_user_snapshot
+
+
+def post_save_user(sender, instance, **kwargs):
+    # Also a password change, the snapshot has the session hash.
+    clear_user_snapshot(instance.pk)
+
+
+def groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # The snapshot has the instructor flag.
+    if not reverse:
+        if action.startswith('post_'):
+            clear_user_snapshot(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        clear_user_snapshot(*pk_set)
+    elif action == 'pre_clear':
+        # Changed from the group side, instance is a Group.
+        clear_user_snapshot(*instance.user_set.values_list('pk', flat=True))
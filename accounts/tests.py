@@ -1,3 +1,407 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest import mock
+from datetime import timedelta
 
-# Create your tests here.
+from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core import mail
+from django.utils import timezone
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.db import IntegrityError, connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import Group
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth import get_user_model
+
+from model_bakery import baker
+
+from courses.models import Enrollment
+from courses.utils import bump_enrollments_version
+
+from accounts.checks import check_shared_cache
+from accounts.forms import CustomPasswordResetForm
+from accounts.models import PasswordReset
+from accounts.utils import cache_user_snapshot, get_user_snapshot
+
+
+class CustomUserModelTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructors = Group.objects.create(name='instructor')
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        cls.user.groups.add(cls.instructors)
+
+    def test_is_instructor_memoized(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.is_instructor())
+            self.assertTrue(user.is_instructor())
+
+    def test_is_instructor_from_prefetched_groups(self):
+        user = get_user_model().objects.prefetch_related('groups').get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_instructor())
+
+    def test_is_not_instructor(self):
+        user = get_user_model().objects.create_user(username='student', email='s@teste.com', password='123')
+        self.assertFalse(user.is_instructor())
+
+
+class DashboardViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', user=cls.user, course__name='Curso Aprovado', status=1)
+        baker.make('courses.Enrollment', user=cls.user, course__name='Curso Pendente', status=0)
+        baker.make('courses.Enrollment', user=cls.user, course__name='Curso Cancelado', status=2)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='user', password='123')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_only_approved_enrollments(self):
+        response = self.client.get(reverse('accounts:dashboard'))
+        self.assertContains(response, 'Curso Aprovado', count=2)
+        self.assertNotContains(response, 'Curso Pendente')
+        self.assertNotContains(response, 'Curso Cancelado')
+
+    def test_constant_queries(self):
+        url = reverse('accounts:dashboard')
+        # The user is cached by the first request, the fragments are
+        # rendered again on both counts.
+        self.client.get(url)
+        bump_enrollments_version(self.user.pk)
+        queries = self.count_queries(url)
+        baker.make('courses.Enrollment', user=self.user, status=1, _quantity=5)
+        self.assertEqual(self.count_queries(url), queries)
+
+    def enrollment_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return [query for query in context.captured_queries if 'courses_enrollment' in query['sql']]
+
+    def test_returning_user_runs_no_enrollment_queries(self):
+        url = reverse('accounts:dashboard')
+        self.assertTrue(self.enrollment_queries(url))
+        self.assertFalse(self.enrollment_queries(url))
+
+    def test_enrollment_change_invalidates_the_cache(self):
+        url = reverse('accounts:dashboard')
+        self.client.get(url)
+        enrollment = baker.make('courses.Enrollment', user=self.user, course__name='Curso Novo', status=1)
+        self.assertContains(self.client.get(url), 'Curso Novo')
+        enrollment.delete()
+        self.assertNotContains(self.client.get(url), 'Curso Novo')
+
+    def test_course_edit_invalidates_the_cache(self):
+        url = reverse('accounts:dashboard')
+        self.client.get(url)
+        course = self.user.enrollments.get(status=1).course
+        course.name = 'Curso Renomeado'
+        with CaptureQueriesContext(connection) as context:
+            course.save()
+        # Only the version of the course is bumped, whatever the enrollments.
+        self.assertFalse([query for query in context.captured_queries if 'courses_enrollment' in query['sql']])
+        self.assertContains(self.client.get(url), 'Curso Renomeado')
+
+
+class ImportUsersCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course')
+        get_user_model().objects.create_user(username='existente', email='existente@teste.com')
+
+    def import_users(self, content, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(content)
+        self.addCleanup(os.remove, csv_file.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_users', csv_file.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import(self):
+        content = (
+            'username,email,full_name,password\n'
+            'ana,ana@teste.com,Ana Lima,segredo123\n'
+            'bruno,bruno@TESTE.com,,\n'
+            'carla,carla@teste.com,Carla,outra123\n'
+        )
+        out, err = self.import_users(content, courses=[self.course.pk], workers=2, chunk_size=2)
+        self.assertIn('3 usuário(s) criado(s), 0 linha(s) ignorada(s)', out)
+
+        User = get_user_model()
+        ana = User.objects.get(username='ana')
+        self.assertEqual(ana.full_name, 'Ana Lima')
+        self.assertTrue(ana.check_password('segredo123'))
+        bruno = User.objects.get(username='bruno')
+        self.assertEqual(bruno.email, 'bruno@teste.com')
+        self.assertFalse(bruno.has_usable_password())
+        self.assertTrue(User.objects.get(username='carla').check_password('outra123'))
+
+        self.assertSetEqual(
+            set(self.course.enrollments.values_list('user__username', 'status')),
+            {('ana', 1), ('bruno', 1), ('carla', 1)},
+        )
+
+    def test_invalid_and_duplicated_rows_are_skipped(self):
+        content = (
+            'username,email\n'
+            'existente,nova@teste.com\n'
+            'outro,EXISTENTE@teste.com\n'
+            'com espaço,espaco@teste.com\n'
+            'semail,\n'
+            'dani,dani@teste.com\n'
+            'dani,dani2@teste.com\n'
+        )
+        out, err = self.import_users(content, workers=1)
+        self.assertIn('1 usuário(s) criado(s), 5 linha(s) ignorada(s)', out)
+        self.assertIn('Linha 2: usuário já existe', err)
+        self.assertIn('Linha 4: nome de usuário ou e-mail inválido', err)
+        self.assertIn('Linha 7: nome de usuário ou e-mail repetido', err)
+        self.assertTrue(get_user_model().objects.filter(username='dani', email='dani@teste.com').exists())
+
+    def test_conflicting_chunk_is_skipped_whole(self):
+        content = (
+            'username,email\n'
+            'ana,ana@teste.com\n'
+            'bruno,bruno@teste.com\n'
+            'carla,carla@teste.com\n'
+        )
+        bulk_create = Enrollment.objects.bulk_create
+        calls = []
+
+        def conflict_once(*args, **kwargs):
+            # The enrollments of the first chunk conflict.
+            calls.append(args)
+            if len(calls) == 1:
+                raise IntegrityError('UNIQUE constraint failed')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Enrollment.objects, 'bulk_create', side_effect=conflict_once):
+            out, err = self.import_users(content, courses=[self.course.pk], workers=1, chunk_size=2)
+        self.assertIn('1 usuário(s) criado(s), 2 linha(s) ignorada(s)', out)
+        self.assertIn('Linhas 2 a 3: conflito ao inserir o bloco', err)
+        # The users of the chunk were not left without their enrollments.
+        self.assertListEqual(
+            list(get_user_model().objects.filter(username__in=['ana', 'bruno', 'carla']).values_list('username', flat=True)),
+            ['carla'],
+        )
+
+    def test_course_not_found(self):
+        with self.assertRaises(CommandError):
+            self.import_users('username,email\n', courses=[self.course.pk + 1])
+
+
+class BenchmarkSignupCommandTests(TestCase):
+
+    def test_refused_without_debug(self):
+        with self.assertRaisesMessage(CommandError, 'DEBUG desligado'):
+            call_command('benchmark_signup', requests=1, stdout=io.StringIO())
+        self.assertFalse(get_user_model().objects.exists())
+
+    @override_settings(DEBUG=True)
+    def test_invalid_requests(self):
+        with self.assertRaisesMessage(CommandError, 'ao menos 1'):
+            call_command('benchmark_signup', requests=0, stdout=io.StringIO())
+
+
+class RegisterViewTests(TestCase):
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('accounts:register'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'accounts/register.html')
+
+    def test_register_logs_in_hashing_once(self):
+        data = {'username': 'novo', 'email': 'novo@teste.com', 'password1': 'segredo123', 'password2': 'segredo123'}
+        encode = PBKDF2PasswordHasher.encode
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=encode) as hasher:
+            response = self.client.post(reverse('accounts:register'), data)
+        self.assertRedirects(response, reverse('core:home'))
+        self.assertEqual(hasher.call_count, 1)
+
+        user = get_user_model().objects.get(username='novo')
+        self.assertTrue(user.check_password('segredo123'))
+        self.assertEqual(int(self.client.session['_auth_user_id']), user.pk)
+
+    def test_invalid_form(self):
+        data = {'username': 'novo', 'email': 'novo@teste.com', 'password1': 'segredo123', 'password2': 'outra'}
+        response = self.client.post(reverse('accounts:register'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'password2', 'A confirmação não está correta.')
+        self.assertFalse(get_user_model().objects.filter(username='novo').exists())
+
+
+class PasswordResetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user', email='User@Teste.com', password='123')
+
+    def make_reset(self, token, age=0, **kwargs):
+        reset = PasswordReset.objects.create(user=self.user, token=token, **kwargs)
+        created_at = timezone.now() - timedelta(seconds=age)
+        PasswordReset.objects.filter(pk=reset.pk).update(created_at=created_at)
+        reset.created_at = created_at
+        return reset
+
+    def test_form_finds_the_user_ignoring_the_case(self):
+        with self.assertNumQueries(1):
+            form = CustomPasswordResetForm({'email': 'user@teste.COM'})
+            self.assertTrue(form.is_valid())
+        form.save(RequestFactory().get('/'))
+        self.assertEqual(self.user.resets.count(), 1)
+        self.assertListEqual(mail.outbox[0].to, ['User@teste.com'])
+
+    def test_form_unknown_email(self):
+        form = CustomPasswordResetForm({'email': 'outro@teste.com'})
+        self.assertFalse(form.is_valid())
+
+    def test_confirm(self):
+        reset = self.make_reset('valido')
+        url = reverse('accounts:password_reset_confirm', args=(reset.token,))
+        response = self.client.post(url, {'new_password1': 'nova-senha-123', 'new_password2': 'nova-senha-123'})
+        self.assertRedirects(response, reverse('accounts:login'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('nova-senha-123'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(PASSWORD_RESET_TIMEOUT=60)
+    def test_confirm_expired(self):
+        reset = self.make_reset('expirado', age=61)
+        self.assertTrue(reset.is_expired())
+        url = reverse('accounts:password_reset_confirm', args=(reset.token,))
+        response = self.client.post(url, {'new_password1': 'nova-senha-123', 'new_password2': 'nova-senha-123'})
+        self.assertRedirects(response, reverse('accounts:password_reset'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('123'))
+
+    @override_settings(PASSWORD_RESET_TIMEOUT=60)
+    def test_purge(self):
+        for number in range(3):
+            self.make_reset(f'expirado-{number}', age=61)
+        self.make_reset('confirmado', confirmed=True)
+        valid = self.make_reset('valido', age=30)
+
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as context:
+            call_command('purge_password_resets', batch_size=2, stdout=out)
+        self.assertIn('4 reset(s) de senha removido(s)', out.getvalue())
+        self.assertListEqual(list(PasswordReset.objects.all()), [valid])
+        # Two batches of select and delete, and the last empty select.
+        self.assertEqual(len(context.captured_queries), 5)
+        # The next batch starts after the last pk deleted.
+        self.assertIn('"id" >', context.captured_queries[2]['sql'])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_local_cache_refused(self):
+        errors = check_shared_cache(None)
+        self.assertListEqual([error.id for error in errors], ['accounts.E001', 'accounts.E002'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': 'localhost:11211',
+    }})
+    def test_shared_cache(self):
+        self.assertListEqual(check_shared_cache(None), [])
+
+    @override_settings(
+        MIDDLEWARE=['django.contrib.auth.middleware.AuthenticationMiddleware'],
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+    )
+    def test_local_cache_without_cached_sessions_and_users(self):
+        self.assertListEqual(check_shared_cache(None), [])
+
+
+class CachedAuthenticationMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='user', password='123')
+
+    def get_user(self):
+        response = self.client.get(reverse('core:home'))
+        return response.wsgi_request.user
+
+    def test_no_session_or_user_query(self):
+        self.get_user()
+        with self.assertNumQueries(0):
+            user = self.get_user()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_authenticated)
+            self.assertFalse(user.is_instructor())
+
+    def test_user_save_clears_the_snapshot(self):
+        self.get_user()
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.full_name = 'Novo Nome'
+        user.save()
+        self.assertEqual(self.get_user().full_name, 'Novo Nome')
+
+    def test_snapshot_of_an_older_user_is_ignored(self):
+        # A request loads the user, the user is saved before the request
+        # caches it.
+        _, version = get_user_snapshot(self.user.pk)
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        get_user_model().objects.get(pk=self.user.pk).save()
+        cache_user_snapshot(stale, version)
+        user, _ = get_user_snapshot(self.user.pk)
+        self.assertIsNone(user)
+
+    def test_password_change_logs_out_the_other_sessions(self):
+        self.get_user()
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.set_password('nova-senha')
+        user.save()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_inactive_user_is_logged_out(self):
+        self.get_user()
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        # An update sends no signal, the snapshot expires.
+        cache.clear()
+        self.assertFalse(self.get_user().is_authenticated)
+
+    def test_groups_change_clears_the_snapshot(self):
+        self.get_user()
+        instructors = Group.objects.create(name='instructor')
+        get_user_model().objects.get(pk=self.user.pk).groups.add(instructors)
+        self.assertTrue(self.get_user().is_instructor())
+        instructors.user_set.clear()
+        self.assertFalse(self.get_user().is_instructor())
+
+    def test_edit_password_keeps_the_session(self):
+        data = {'old_password': '123', 'new_password1': 'nova-senha-123', 'new_password2': 'nova-senha-123'}
+        self.get_user()
+        response = self.client.post(reverse('accounts:edit_password'), data)
+        self.assertRedirects(response, reverse('accounts:dashboard'))
+        self.assertTrue(self.get_user().is_authenticated)
+
+    def test_edit_keeps_the_password(self):
+        self.get_user()
+        data = {'username': 'user', 'email': 'user@teste.com', 'full_name': 'Nome'}
+        response = self.client.post(reverse('accounts:edit'), data)
+        self.assertRedirects(response, reverse('accounts:edit'))
+        user = get_user_model().objects.get(pk=self.user.pk)
+        self.assertEqual(user.full_name, 'Nome')
+        self.assertTrue(user.check_password('123'))
+        self.assertTrue(self.get_user().is_authenticated)
@@ -0,0 +1,66 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.contrib.auth import get_user_model
+
+# The fields of the user kept on the cache, all but the password hash.
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'full_name', 'is_active', 'is_staff', 'is_superuser',
+    'last_login', 'date_joined',
+)
+
+
+def _user_snapshot_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def _user_version_key(user_id):
+    return f'accounts:user:{user_id}:version'
+
+
+def get_user_snapshot(user_id):
+    """Returns the cached user, or None, and the version of the user.
+
+    The user is a CustomUser with the SNAPSHOT_FIELDS loaded, the
+    password is deferred, and is_instructor() and get_session_auth_hash()
+    answer without a query. The version is passed on to
+    cache_user_snapshot() when the user is loaded from the db instead.
+    """
+    keys = _user_snapshot_key(user_id), _user_version_key(user_id)
+    values = cache.get_many(keys)
+    snapshot, version = values.get(keys[0]), values.get(keys[1])
+    # Cached before the last clear_user_snapshot(), maybe stale.
+    if snapshot is None or snapshot['version'] != version:
+        return None, version
+    User = get_user_model()
+    # from_db() takes the values in the order of the fields.
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [snapshot[name] for name in field_names])
+    user._is_instructor = snapshot['is_instructor']
+    user._session_auth_hash = snapshot['session_auth_hash']
+    return user, version
+
+
+def cache_user_snapshot(user, version):
+    """Keeps on the cache what the requests of `user` need of it.
+
+    `version` is the one returned by get_user_snapshot() before `user`
+    was loaded. If the user is saved meanwhile the version changes, and
+    this snapshot, of the older user, is never returned.
+    """
+    snapshot = {name: getattr(user, name) for name in SNAPSHOT_FIELDS}
+    snapshot['is_instructor'] = user.is_instructor()
+    snapshot['session_auth_hash'] = user.get_session_auth_hash()
+    snapshot['version'] = version
+    cache.set(_user_snapshot_key(user.pk), snapshot, settings.USER_SNAPSHOT_CACHE_TIMEOUT)
+
+
+def clear_user_snapshot(*user_ids):
+    """Makes the next request of the users load them from the db."""
+    # A new version, the snapshots being cached by the requests running
+    # now are of the older users.
+    version = uuid.uuid4().hex
+    cache.set_many({_user_version_key(user_id): version for user_id in user_ids}, None)
+    cache.delete_many([_user_snapshot_key(user_id) for user_id in user_ids])
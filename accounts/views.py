@@ -1,8 +1,12 @@
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import PasswordChangeForm, SetPasswordForm
-from django.contrib.auth import authenticate, login, update_session_auth_hash
+from django.contrib.auth import login, update_session_auth_hash
+from django.contrib.auth.hashers import make_password
 
 from .forms import (
     CustomUserCreationForm, EditAccountForm, CustomPasswordResetForm
@@ -58,8 +62,11 @@ def password_reset(request):
 
 def password_reset_confirm(request, token):
     """Displays a form for entering a new password."""
-    reset = get_object_or_404(PasswordReset, token=token, confirmed=False)
-    
+    reset = get_object_or_404(PasswordReset.objects.select_related('user'), token=token, confirmed=False)
+    if reset.is_expired():
+        messages.error(request, 'Este link expirou, peça um novo para criar sua senha.')
+        return redirect('accounts:password_reset')
+
     form = SetPasswordForm(reset.user, data=request.POST or None)
     if form.is_valid():
         form.save()
@@ -75,19 +82,21 @@ def password_reset_confirm(request, token):
     return render(request, 'accounts/password_reset_confirm.html', context)
 
 
-def register(request):
-    """Registers a new user."""
+async def register(request):
+    """Registers a new user.
+
+    An async view, under ASGI the password is hashed on a thread pool
+    instead of the single thread running the sync code of all requests,
+    so concurrent sign ups are hashed in parallel. The new user is
+    logged in directly, authenticate() would hash the password again.
+    """
     form = CustomUserCreationForm(request.POST or None)
-    if form.is_valid():
-        form.save()
-        user = authenticate(
-            request,
-            username=form.cleaned_data['username'], 
-            password=form.cleaned_data['password1'],
-        )
-        login(request, user)
+    if await sync_to_async(form.is_valid)():
+        password = await sync_to_async(make_password, thread_sensitive=False)(form.cleaned_data['password1'])
+        user = await sync_to_async(form.save)(password=password)
+        await sync_to_async(login)(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         messages.info(request, 'Sua conta foi criada com sucesso, boas vindas!')
         return redirect('core:home')
 
     context = {'form': form}
-    return render(request, 'accounts/register.html', context)
\ No newline at end of file
+    return await sync_to_async(render)(request, 'accounts/register.html', context)
@@ -1,5 +1,51 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+
+from .signals import clear_stats, clear_stats_if_created, clear_stats_if_status_saved
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Clear the totals of the about page, see core.stats.
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+
+        post_save.connect(
+            clear_stats_if_created,
+            sender=User,
+            dispatch_uid='core_post_save_user',
+        )
+        post_delete.connect(
+            clear_stats,
+            sender=User,
+            dispatch_uid='core_post_delete_user',
+        )
+
+        Course = apps.get_model('courses', 'Course')
+
+        post_save.connect(
+            clear_stats_if_created,
+            sender=Course,
+            dispatch_uid='core_post_save_course',
+        )
+        post_delete.connect(
+            clear_stats,
+            sender=Course,
+            dispatch_uid='core_post_delete_course',
+        )
+
+        Enrollment = apps.get_model('courses', 'Enrollment')
+
+        post_save.connect(
+            clear_stats_if_status_saved,
+            sender=Enrollment,
+            dispatch_uid='core_post_save_enrollment',
+        )
+        post_delete.connect(
+            clear_stats,
+            sender=Enrollment,
+            dispatch_uid='core_post_delete_enrollment',
+        )
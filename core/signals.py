@@ -0,0 +1,19 @@
+from .stats import clear_site_stats
+
+
+def clear_stats(sender, **kwargs):
+    """Clears the totals when a user, a course or an enrollment is deleted."""
+    clear_site_stats()
+
+
+def clear_stats_if_created(sender, instance, created, **kwargs):
+    # A user is saved on every login and a course on every edit, only a
+    # new one changes the totals.
+    if created:
+        clear_site_stats()
+
+
+def clear_stats_if_status_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Only the approved enrollments are counted.
+    if created or update_fields is None or 'status' in update_fields:
+        clear_site_stats()
@@ -0,0 +1,40 @@
+"""Cached totals of the platform, shown on the about page.
+
+Counting the users is a full scan of the table, so the totals are kept
+on the cache. The signals of core.signals clear them when a course, a
+user or an enrollment is created or deleted, and they expire after
+SITE_STATS_CACHE_TIMEOUT seconds anyway, for the changes the signals
+don't see (ex: bulk updates, a user added to the instructors).
+
+Example:
+    from core.stats import get_site_stats
+    get_site_stats()['students']
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+
+SITE_STATS_KEY = 'core:site_stats'
+
+
+def get_site_stats():
+    """Returns the number of courses, students, instructors and enrollments."""
+    stats = cache.get(SITE_STATS_KEY)
+    if stats is None:
+        from courses.models import Course, Enrollment
+
+        User = get_user_model()
+        stats = {
+            'courses': Course.objects.count(),
+            'students': User.objects.exclude(groups__name='instructor').exclude(is_staff=True).count(),
+            'instructors': User.objects.filter(groups__name='instructor').count(),
+            'enrollments': Enrollment.objects.filter(status=1).count(),
+        }
+        cache.set(SITE_STATS_KEY, stats, settings.SITE_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def clear_site_stats():
+    """Makes the next get_site_stats() count again."""
+    cache.delete(SITE_STATS_KEY)
@@ -1,5 +1,12 @@
 from django.urls import reverse
-from django.test import SimpleTestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from model_bakery import baker
+
+from core.stats import SITE_STATS_KEY, get_site_stats
 
 
 class HomeViewTests(SimpleTestCase):
@@ -31,4 +38,73 @@ class ContactViewTests(SimpleTestCase):
     def test_view_uses_correct_template(self):
         response = self.client.get(reverse('core:contact'))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'contact.html')
\ No newline at end of file
+        self.assertTemplateUsed(response, 'contact.html')
+
+
+@override_settings(ABOUT_COURSES_PAGE_SIZE=2)
+class AboutViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = baker.make('courses.Course', _quantity=3)
+        instructors = Group.objects.create(name='instructor')
+        cls.instructor = baker.make(get_user_model(), full_name='Instrutor')
+        cls.instructor.groups.add(instructors)
+        cls.student = baker.make(get_user_model())
+        baker.make('courses.Enrollment', user=cls.student, course=cls.courses[0], status=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('core:about'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'about.html')
+
+    def test_stats(self):
+        response = self.client.get('/sobre/')
+        self.assertDictEqual(
+            response.context['stats'],
+            {'courses': 3, 'students': 1, 'instructors': 1, 'enrollments': 1},
+        )
+        self.assertContains(response, 'Instrutor</li>')
+
+    def test_stats_are_cached(self):
+        self.client.get('/sobre/')
+        # A page of courses, its boundary and the instructors.
+        self.assertNumQueries(3, self.client.get, '/sobre/')
+
+    def test_stats_cleared_by_the_signals(self):
+        self.assertEqual(get_site_stats()['courses'], 3)
+        course = baker.make('courses.Course')
+        self.assertEqual(get_site_stats()['courses'], 4)
+        course.delete()
+        self.assertEqual(get_site_stats()['students'], 1)
+        baker.make(get_user_model())
+        self.assertEqual(get_site_stats()['students'], 2)
+
+        # A login saves the user, an edit the course, but they don't
+        # change the totals.
+        get_site_stats()
+        self.student.save(update_fields=['last_login'])
+        self.courses[0].save()
+        self.assertIsNotNone(cache.get(SITE_STATS_KEY))
+
+        # The approved enrollments are counted.
+        enrollment = baker.make('courses.Enrollment', user=self.student, course=self.courses[1])
+        self.assertEqual(get_site_stats()['enrollments'], 1)
+        enrollment.approve()
+        self.assertEqual(get_site_stats()['enrollments'], 2)
+
+    def test_courses_are_paginated(self):
+        response = self.client.get('/sobre/')
+        self.assertListEqual(list(response.context['courses']), self.courses[:0:-1])
+        next_cursor = response.context['next_cursor']
+
+        response = self.client.get('/sobre/', {'antes': next_cursor})
+        self.assertListEqual(list(response.context['courses']), self.courses[:1])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/sobre/', {'antes': 'x'})
+        self.assertEqual(response.status_code, 404)
@@ -12,6 +12,6 @@ urlpatterns = [
     path('', views.home, name='home'),
     # Ex: /contato/
     path('contato/', views.contact, name='contact'),
-    # Ex: /about/
-    # path('sobre/', views.about, name='about'),  # TODO
+    # Ex: /sobre/
+    path('sobre/', views.about, name='about'),
 ]
\ No newline at end of file
@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
 
 from courses.models import Course
+from courses.pagination import newest_first_page
+
+from .stats import get_site_stats
 
 
 def home(request):
@@ -14,18 +19,34 @@ def contact(request):
     return render(request, 'contact.html')
 
 
-# TODO 
-# def about(request):
-#     """About page."""
-#     courses = Course.objects.all()
-    
-#     User = get_user_model()
-#     students = User.objects.exclude(groups__name='instructor').exclude(is_staff=True)
-#     instructors = User.objects.filter(groups__name='instructor')
-
-#     context = {
-#         'courses': courses,
-#         'students': students,
-#         'instructors': instructors,
-#     }
-#     return render(request, 'about.html', context)
\ No newline at end of file
+def about(request):
+    """About page.
+
+    The totals come from the cache, see core.stats, and only a page of
+    the courses and a few instructors are loaded, however many there are.
+    """
+    try:
+        courses, next_cursor = newest_first_page(
+            Course.objects.only('pk', 'name', 'slug', 'description', 'created_at'),
+            request.GET.get('antes'),
+            settings.ABOUT_COURSES_PAGE_SIZE,
+        )
+    except ValueError:
+        raise Http404('Página inválida.')
+
+    User = get_user_model()
+    instructors = (
+        User.objects
+        .filter(groups__name='instructor')
+        .only('username', 'full_name')
+        .order_by('-date_joined')[:settings.ABOUT_INSTRUCTORS_SIZE]
+    )
+
+    context = {
+        'stats': get_site_stats(),
+        'courses': courses,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('antes'),
+        'instructors': instructors,
+    }
+    return render(request, 'about.html', context)
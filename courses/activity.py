@@ -0,0 +1,125 @@
+"""Buffered log of the activity of the users, for the analytics.
+
+The views only append an event to a bounded in-memory ring buffer, a
+daemon thread bulk inserts the events on the db:
+
+- every ACTIVITY_LOG_FLUSH_INTERVAL seconds;
+- sooner, when ACTIVITY_LOG_BATCH_SIZE events are waiting;
+- and when the process exits, by an atexit hook.
+
+Without ACTIVITY_LOG_FLUSH_INTERVAL there is no thread and no flush at
+exit, the events wait for an explicit flush(). The tests that go through
+the views set it to None and reset the buffer of the module.
+
+Backpressure: the buffer holds at most ACTIVITY_LOG_BUFFER_SIZE events.
+When the db can't keep up the oldest events are dropped, a request never
+waits for the db. The dropped events, and the batches that failed to be
+inserted, are counted and logged as a warning, they are not retried.
+
+Example:
+    from courses.activity import log_activity
+    log_activity(Activity.Kind.AULA, request.user, course, lesson=lesson)
+"""
+
+import atexit
+import logging
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from .buffers import BufferedWriter
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer(BufferedWriter):
+    """A bounded buffer of activity events, flushed in batches.
+
+    An event is a tuple (kind, user_id, course_id, lesson_id,
+    material_id, created_at).
+    """
+
+    thread_name = 'activity-flush'
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=None):
+        super().__init__(flush_interval)
+        self.batch_size = batch_size
+        self.events = deque(maxlen=max_size)
+        self.dropped = 0
+
+    def append(self, event):
+        """Keeps an event, dropping the oldest one if the buffer is full."""
+        self._check_fork()
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            ready = len(self.events) >= self.batch_size
+        if self.flush_interval:
+            if self.thread is None:
+                self._start_thread()
+            if ready:
+                self.wake_up.set()
+
+    def flush(self):
+        """Inserts the waiting events in batches, returns how many were inserted."""
+        from .models import Activity
+
+        inserted = failed = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [self.events.popleft() for _ in range(min(self.batch_size, len(self.events)))]
+                    dropped, self.dropped = self.dropped, 0
+                if dropped:
+                    logger.warning('Activity buffer full, %d events dropped.', dropped)
+                if not batch:
+                    break
+                activities = [
+                    Activity(
+                        kind=kind, user_id=user_id, course_id=course_id,
+                        lesson_id=lesson_id, material_id=material_id, created_at=created_at,
+                    )
+                    for kind, user_id, course_id, lesson_id, material_id, created_at in batch
+                ]
+                try:
+                    Activity.objects.bulk_create(activities)
+                except Exception:
+                    logger.exception('Could not insert %d activity events.', len(batch))
+                    failed += len(batch)
+                    if failed >= self.batch_size:
+                        # The db is down, the next flush tries again.
+                        break
+                else:
+                    inserted += len(batch)
+        return inserted
+
+    def clear(self):
+        self.events.clear()
+
+
+_buffer = None
+
+
+def get_activity_buffer():
+    """Returns the buffer of the process, set by the ACTIVITY_LOG_* settings."""
+    global _buffer
+    if _buffer is None:
+        _buffer = ActivityBuffer(
+            max_size=settings.ACTIVITY_LOG_BUFFER_SIZE,
+            batch_size=settings.ACTIVITY_LOG_BATCH_SIZE,
+            flush_interval=settings.ACTIVITY_LOG_FLUSH_INTERVAL,
+        )
+        if _buffer.flush_interval:
+            atexit.register(_buffer.flush)
+    return _buffer
+
+
+def log_activity(kind, user, course, lesson=None, material=None):
+    """Logs that `user` opened a page of the course, without touching the db."""
+    get_activity_buffer().append((
+        kind, user.pk, course.pk,
+        lesson and lesson.pk, material and material.pk,
+        timezone.now(),
+    ))
@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.db.models import Sum
 
 from .models import (
-    Course, Enrollment, Announcement, Comment, Lesson, Material
+    Course, Enrollment, Announcement, Comment, Lesson, Material,
+    CourseDailyStats, AnnouncementDailyStats,
 )
 from .forms import CourseFormAdmin, LessonFormAdmin
 
@@ -32,6 +34,10 @@ class CourseAdmin(admin.ModelAdmin):
 class MaterialInline(admin.StackedInline):
     model = Material
 
+    class Media:
+        # Sends big resources in resumable chunks, see views.material_upload.
+        js = ('courses/js/chunked_upload.js',)
+
 
 class LessonAdmin(admin.ModelAdmin):
     list_display = ('name', 'course', 'order', 'is_available', 'release_date')
@@ -74,7 +80,55 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_filter = ('course', 'user')
 
 
+class DailyStatsAdmin(admin.ModelAdmin):
+    """Read only reports over the rollups of the rollup_stats command.
+
+    The totals of the filtered period are summed from the rollups too,
+    the enrollments and comments are never counted here.
+    """
+    date_hierarchy = 'day'
+    totals = ()
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        if hasattr(response, 'context_data') and 'cl' in response.context_data:
+            queryset = response.context_data['cl'].queryset
+            response.context_data['totals'] = [
+                (self.model._meta.get_field(name).verbose_name, total)
+                for name, total in queryset.aggregate(**{name: Sum(name) for name in self.totals}).items()
+            ]
+        return response
+
+
+class CourseDailyStatsAdmin(DailyStatsAdmin):
+    list_display = ('day', 'course', 'enrollments', 'active_students', 'comments')
+    list_filter = ('course',)
+    list_select_related = ('course',)
+    # The active students of the days can't be summed, a student can be
+    # active on many days.
+    totals = ('enrollments', 'comments')
+
+
+class AnnouncementDailyStatsAdmin(DailyStatsAdmin):
+    list_display = ('day', 'announcement', 'comments')
+    list_filter = ('announcement__course',)
+    search_fields = ('announcement__title',)
+    list_select_related = ('announcement',)
+    totals = ('comments',)
+
+
 admin.site.register(Course, CourseAdmin)
 admin.site.register(Lesson, LessonAdmin)
 admin.site.register(Announcement, AnnouncementAdmin)
-admin.site.register(Enrollment, EnrollmentAdmin)
\ No newline at end of file
+admin.site.register(Enrollment, EnrollmentAdmin)
+admin.site.register(CourseDailyStats, CourseDailyStatsAdmin)
+admin.site.register(AnnouncementDailyStats, AnnouncementDailyStatsAdmin)
@@ -1,18 +1,78 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 
-
-from .signals import post_save_announcement
+from .signals import (
+    post_save_announcement, post_delete_announcement, post_save_comment, post_delete_comment,
+    post_save_course, post_save_enrollment,
+    pre_save_material, post_save_material, post_delete_material,
+)
 
 
 class CoursesConfig(AppConfig):
     name = 'courses'
 
     def ready(self):
+        Course = self.get_model('Course')
+
+        post_save.connect(
+            post_save_course,
+            sender=Course,
+            dispatch_uid='post_save_course',
+        )
+
+        Enrollment = self.get_model('Enrollment')
+
+        post_save.connect(
+            post_save_enrollment,
+            sender=Enrollment,
+            dispatch_uid='post_save_enrollment',
+        )
+        post_delete.connect(
+            post_save_enrollment,
+            sender=Enrollment,
+            dispatch_uid='post_delete_enrollment',
+        )
+
         Announcement = self.get_model('Announcement')
 
         post_save.connect(
             post_save_announcement, 
             sender=Announcement, 
             dispatch_uid='post_save_announcement',
-        )
\ No newline at end of file
+        )
+        post_delete.connect(
+            post_delete_announcement,
+            sender=Announcement,
+            dispatch_uid='post_delete_announcement',
+        )
+
+        Comment = self.get_model('Comment')
+
+        post_save.connect(
+            post_save_comment,
+            sender=Comment,
+            dispatch_uid='post_save_comment',
+        )
+        post_delete.connect(
+            post_delete_comment,
+            sender=Comment,
+            dispatch_uid='post_delete_comment',
+        )
+
+        Material = self.get_model('Material')
+
+        pre_save.connect(
+            pre_save_material,
+            sender=Material,
+            dispatch_uid='pre_save_material',
+        )
+        post_save.connect(
+            post_save_material,
+            sender=Material,
+            dispatch_uid='post_save_material',
+        )
+        post_delete.connect(
+            post_delete_material,
+            sender=Material,
+            dispatch_uid='post_delete_material',
+        )
@@ -0,0 +1,61 @@
+"""Base of the in-memory buffers written to the db by a background thread.
+
+See courses.activity and courses.heartbeats.
+"""
+
+import os
+import threading
+
+from django.db import connections
+
+
+class BufferedWriter:
+    """A buffer flushed to the db every `flush_interval` seconds.
+
+    Subclasses keep their own items and implement flush() and clear().
+    The daemon thread is started by the first item added, with
+    _start_thread(). Without `flush_interval` there is no thread, the
+    buffer is only flushed when flush() is called.
+    """
+
+    thread_name = 'buffer-flush'
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake_up = threading.Event()
+        self.thread = None
+        self.pid = os.getpid()
+
+    def flush(self):
+        """Writes the waiting items, returns how many were written."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drops the waiting items."""
+        raise NotImplementedError
+
+    def _check_fork(self):
+        # A forked worker (ex: gunicorn --preload) starts with an empty
+        # buffer and without the thread of the parent.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.clear()
+            self.thread = None
+
+    def _start_thread(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            # Set by the subclasses to flush before the interval ends.
+            self.wake_up.wait(self.flush_interval)
+            self.wake_up.clear()
+            self.flush()
+            # The thread has its own connection, not closed by any request.
+            connections.close_all()
@@ -4,6 +4,23 @@ from django.shortcuts import get_object_or_404, redirect
 from .models import Course, Enrollment
 
 
+def check_enrollment(user, course):
+    """Returns (has_permission, message, enrollment) for a user accessing a course.
+
+    The message explains why the user has no permission. The enrollment
+    is None for the staff without an enrollment on the course.
+    """
+    enrollment = Enrollment.objects.filter(user=user, course=course).first()
+    if user.is_staff:
+        return True, '', enrollment
+
+    if enrollment is None:
+        return False, 'Desculpe, mas você não tem permissão para acessar esta página.', None
+    if not enrollment.is_approved():
+        return False, 'A sua inscrição no curso ainda está pendente.', enrollment
+    return True, '', enrollment
+
+
 def enrollment_required(view_func):
     """A decorator for verify if a user has a enrollment on a course.
     
@@ -12,26 +29,13 @@ def enrollment_required(view_func):
     def _wrapper(request, *args, **kwargs):
         pk, slug = kwargs['pk'], kwargs['slug']
         course = get_object_or_404(Course, pk=pk, slug=slug)
-        has_permission = request.user.is_staff
-        
-        if not has_permission:
-            try:
-                enrollment = Enrollment.objects.get(
-                    user=request.user,
-                    course=course,
-                )
-            except Enrollment.DoesNotExist:
-                message = 'Desculpe, mas você não tem permissão para acessar esta página.'
-            else:
-                if enrollment.is_approved():
-                    has_permission = True
-                else:
-                    message = 'A sua inscrição no curso ainda está pendente.'
+        has_permission, message, enrollment = check_enrollment(request.user, course)
         
         if not has_permission:
             messages.error(request, message)
             return redirect('accounts:dashboard')
         
         request.course = course
+        request.enrollment = enrollment
         return view_func(request, *args, **kwargs)
-    return _wrapper
\ No newline at end of file
+    return _wrapper
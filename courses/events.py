@@ -0,0 +1,131 @@
+"""Publish/subscribe of the events of the courses app.
+
+A subscriber is an async view waiting for something to happen on a
+channel, ex: a new comment on an announcement. The broker used is set by
+`COURSES_EVENTS_BROKER`:
+
+- LocalBroker: in-process, wakes up the subscribers immediately. Only
+  sees the events published by the same process.
+- CacheBroker: a stand-in for a real broker when there are many
+  processes, it keeps a version per channel in the cache (must be a
+  cache shared by the processes, ex: file based or Memcached) and the
+  subscribers poll it.
+
+Example:
+    from courses.events import get_broker
+    get_broker().publish('announcement-1')
+"""
+
+import time
+import asyncio
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class LocalSubscription:
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self):
+        # Publishers run on other threads, the event belongs to the loop.
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout):
+        """Returns True if something was published before the timeout."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """An in-process broker."""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Returns a subscription, must be created on the event loop."""
+        subscription = LocalSubscription(self, channel)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions[subscription.channel]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.channel]
+
+    def publish(self, channel):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+
+class CacheSubscription:
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.key = broker.key(channel)
+        self.version = cache.get(self.key, 0)
+
+    async def wait(self, timeout):
+        """Returns True if something was published before the timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.broker.poll_interval)
+            if await sync_to_async(cache.get)(self.key, 0) != self.version:
+                return True
+        return False
+
+    def close(self):
+        pass
+
+
+class CacheBroker:
+    """A broker over the cache, for deployments with many processes."""
+    poll_interval = 1
+    timeout = 60 * 60
+
+    def key(self, channel):
+        return f'courses:events:{channel}'
+
+    def subscribe(self, channel):
+        return CacheSubscription(self, channel)
+
+    def publish(self, channel):
+        key = self.key(channel)
+        if not cache.add(key, 1, self.timeout):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # The key expired between add() and incr().
+                cache.set(key, 1, self.timeout)
+
+
+_broker = None
+
+
+def get_broker():
+    """Returns the broker set by the COURSES_EVENTS_BROKER setting."""
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.COURSES_EVENTS_BROKER)()
+    return _broker
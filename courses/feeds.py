@@ -0,0 +1,63 @@
+"""Atom and JSON feeds of the announcements of a course.
+
+The feeds are read by feed readers and integrations that poll them, so
+the views answer an unchanged feed with a 304 before loading any
+announcement.
+
+Example:
+    from courses.feeds import atom_feed, json_feed
+"""
+
+from django.utils.feedgenerator import Atom1Feed
+
+
+def _items(request, announcements):
+    for announcement in announcements:
+        link = request.build_absolute_uri(announcement.get_absolute_url())
+        yield announcement, link
+
+
+def atom_feed(request, course, announcements):
+    """Returns the Atom XML of the announcements of `course`."""
+    feed = Atom1Feed(
+        title=f'Anúncios — {course.name}',
+        link=request.build_absolute_uri(course.get_absolute_url()),
+        description=course.description,
+        language='pt-br',
+        author_name=course.name,
+        feed_url=request.build_absolute_uri(),
+    )
+    for announcement, link in _items(request, announcements):
+        feed.add_item(
+            title=announcement.title,
+            link=link,
+            unique_id=link,
+            description=announcement.content_html,
+            pubdate=announcement.created_at,
+            updateddate=announcement.updated_at,
+        )
+    return feed.writeString('utf-8')
+
+
+def json_feed(request, course, announcements):
+    """Returns the announcements of `course` as a JSON Feed 1.1 dict."""
+    return {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': f'Anúncios — {course.name}',
+        'home_page_url': request.build_absolute_uri(course.get_absolute_url()),
+        'feed_url': request.build_absolute_uri(),
+        'description': course.description,
+        'language': 'pt-BR',
+        'items': [
+            {
+                'id': link,
+                'url': link,
+                'title': announcement.title,
+                'content_html': announcement.content_html,
+                'summary': announcement.excerpt,
+                'date_published': announcement.created_at.isoformat(),
+                'date_modified': announcement.updated_at.isoformat(),
+            }
+            for announcement, link in _items(request, announcements)
+        ],
+    }
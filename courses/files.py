@@ -0,0 +1,240 @@
+"""Helpers for serving the files of the courses app.
+
+Example:
+    from courses.files import serve_file
+"""
+
+import io
+import os
+import re
+import zipfile
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Bigger blocks than the FileResponse default (4 KiB) mean less Python
+# overhead per byte when the file is streamed by the worker itself.
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class RangedFile:
+    """A read-only file wrapper that only exposes the bytes [start, start + length).
+
+    Keeps `fileno()` available, so WSGI servers that implement
+    `wsgi.file_wrapper` with sendfile (like gunicorn) can still send the
+    range without copying it through Python.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Returns the (start, end) inclusive byte range asked by a Range header.
+
+    Returns None when the header is missing, malformed or asks for
+    multiple ranges, in that case the whole file must be served.
+    Raises ValueError if the range can not be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range, ex: "bytes=-500" means the last 500 bytes.
+        length = int(end)
+        if not length:
+            raise ValueError('Empty suffix range.')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable.')
+    return start, end
+
+
+def if_range_passes(header, etag, last_modified):
+    """Returns True if the If-Range precondition allows a partial response."""
+    if not header:
+        return True
+    if header.startswith(('"', 'W/')):
+        # Only strong comparison is allowed for If-Range.
+        return header == etag
+    return parse_http_date_safe(header) == last_modified
+
+
+def content_disposition(disposition, filename):
+    """Returns a Content-Disposition header value for `filename`.
+
+    Quotes, backslashes and non-ASCII characters are replaced in the
+    plain `filename` parameter, the real name goes in the RFC 5987
+    `filename*` parameter when they differ.
+    """
+    filename = ''.join(char for char in filename if char.isprintable())
+    fallback = ''.join(
+        '_' if char in '"\\' or not char.isascii() else char for char in filename
+    )
+    value = f'{disposition}; filename="{fallback}"'
+    if fallback != filename:
+        value += f"; filename*=UTF-8''{quote(filename)}"
+    return value
+
+
+def serve_file(request, storage, name, filename=None, as_attachment=False):
+    """Returns a response streaming the file `name` from `storage`.
+
+    Supports conditional GET, a single byte range (with If-Range) and, if
+    `MATERIALS_SENDFILE_HEADER` is set, hands off the transfer to the
+    front server with a X-Accel-Redirect (nginx) or X-Sendfile header.
+    """
+    size = storage.size(name)
+    last_modified = int(storage.get_modified_time(name).timestamp())
+    etag = quote_etag(f'{last_modified:x}-{size:x}')
+    filename = filename or os.path.basename(name)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    sendfile_header = getattr(settings, 'MATERIALS_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # The front server takes care of ranges and conditional requests.
+        response = HttpResponse()
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = settings.MATERIALS_SENDFILE_PREFIX + name
+        else:
+            response[sendfile_header] = storage.path(name)
+        # Let the front server guess the content type.
+        del response['Content-Type']
+        response['Content-Disposition'] = content_disposition(
+            'attachment' if as_attachment else 'inline', filename,
+        )
+    else:
+        byte_range = None
+        if if_range_passes(request.META.get('HTTP_IF_RANGE'), etag, last_modified):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        file = storage.open(name, 'rb')
+        if byte_range:
+            start, end = byte_range
+            file = RangedFile(file, start, end - start + 1)
+        response = FileResponse(file, as_attachment=as_attachment, filename=filename)
+        # FileResponse of Django 3.1 does not escape the quotes of the name.
+        response['Content-Disposition'] = content_disposition(
+            'attachment' if as_attachment else 'inline', filename,
+        )
+        response.block_size = STREAM_BLOCK_SIZE
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response['Content-Length'] = size
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class _ZipBuffer(io.RawIOBase):
+    """An unseekable sink for ZipFile, the written bytes are taken with pop().
+
+    Since it is unseekable, ZipFile writes each entry followed by a data
+    descriptor instead of going back to patch the local header.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _compress_type(name):
+    # Videos, images and archives are already compressed, just store them.
+    content_type, _ = mimetypes.guess_type(name)
+    if content_type and content_type.startswith('text/'):
+        return zipfile.ZIP_DEFLATED
+    return zipfile.ZIP_STORED
+
+
+def zip_stream(entries):
+    """Yields a ZIP archive with the files of `entries` as it is built.
+
+    `entries` is an iterable of (arcname, storage, name). Only one block
+    of a file is held in memory at a time, so the memory used does not
+    depend on the size of the files.
+    """
+    buffer = _ZipBuffer()
+    used_names = set()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for arcname, storage, name in entries:
+            # Avoid duplicated names inside the archive, ex: "notas (1).txt".
+            root, ext = os.path.splitext(arcname)
+            counter = 1
+            while arcname in used_names:
+                arcname = f'{root} ({counter}){ext}'
+                counter += 1
+            used_names.add(arcname)
+
+            modified = storage.get_modified_time(name)
+            info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6])
+            info.compress_type = _compress_type(name)
+            # Knowing the size up front lets ZipFile decide on ZIP64.
+            info.file_size = storage.size(name)
+            with storage.open(name, 'rb') as source, archive.open(info, 'w') as dest:
+                for block in iter(lambda: source.read(STREAM_BLOCK_SIZE), b''):
+                    dest.write(block)
+                    yield buffer.pop()
+            yield buffer.pop()
+    # The central directory is written when the archive is closed.
+    yield buffer.pop()
+
+
+def zip_response(entries, filename):
+    """Returns a response streaming a ZIP archive with the files of `entries`."""
+    response = StreamingHttpResponse(zip_stream(entries), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition('attachment', filename)
+    return response
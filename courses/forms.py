@@ -7,7 +7,10 @@ from django.core.files.images import get_image_dimensions
 
 from core.mail import send_mail_template
 
-from .models import Comment, Course, Lesson
+from .images import VARIANT_WIDTHS
+from .models import Comment, Course, Lesson, MaterialUpload
+
+MIN_IMAGE_WIDTH = VARIANT_WIDTHS[0]
 
 
 class ContactCourseForm(forms.Form):
@@ -51,20 +54,36 @@ class CommentForm(forms.ModelForm):
         return comment
     
 
+class MaterialUploadForm(forms.ModelForm):
+    """A form for start a chunked upload of the resource of a material."""
+
+    class Meta:
+        model = MaterialUpload
+        fields = ('material', 'filename', 'size')
+
+    def save(self, user, commit=True):
+        upload = super().save(commit=False)
+        upload.user = user
+        if commit:
+            upload.save()
+        return upload
+
+
 class CourseFormAdmin(forms.ModelForm):
     """A form for create/change a course on admin site.
     
-    This form verify the dimensions of the image field on the course model.
+    This form verify if the image is not too small for the variants
+    generated from it.
     """
 
     def clean_image(self):
         image = self.cleaned_data.get('image')
-        if image:
+        if image and not getattr(image, '_committed', False):
             width, height = get_image_dimensions(image)
-            if width != 400:
-                raise ValidationError(f'A imagem possui {width}px de largura. Ela precisa ter 400px.')
-            if height != 250:
-                raise ValidationError(f'A imagem possui {height}px de altura. Ela precisa ter 250px.')
+            if width < MIN_IMAGE_WIDTH:
+                raise ValidationError(
+                    f'A imagem possui {width}px de largura. Ela precisa ter pelo menos {MIN_IMAGE_WIDTH}px.'
+                )
         return image
 
 
@@ -0,0 +1,100 @@
+"""Write coalescing buffer for the watch positions of the videos.
+
+The players send the position of the viewer every few seconds. Only the
+latest position of each (user, material) is kept in memory and the
+buffer is written in batches, so the writes grow with the viewers
+active on each flush interval, not with the heartbeats:
+
+- every WATCH_POSITIONS_FLUSH_INTERVAL seconds, by a daemon thread;
+- when WATCH_POSITIONS_FLUSH_SIZE positions are waiting, by the request
+  adding the last one;
+- when the process exits, by an atexit hook.
+
+The positions not flushed yet are lost if the process is killed, at
+most an interval of them. Without WATCH_POSITIONS_FLUSH_INTERVAL (the
+tests) there is no thread and no flush at exit.
+
+Example:
+    from courses.heartbeats import get_heartbeat_buffer
+    get_heartbeat_buffer().add(user.pk, material.pk, 42.5)
+"""
+
+import atexit
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from .buffers import BufferedWriter
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer(BufferedWriter):
+    """Keeps the latest watch positions until they are flushed to the db.
+
+    Also flushed by size, by the request adding the last position.
+    """
+
+    thread_name = 'heartbeat-flush'
+
+    def __init__(self, flush_interval=None, flush_size=500):
+        super().__init__(flush_interval)
+        self.flush_size = flush_size
+        self.positions = {}
+
+    def add(self, user_id, material_id, position):
+        """Keeps the position, replacing the previous one of the viewer."""
+        self._check_fork()
+        with self.lock:
+            self.positions[(user_id, material_id)] = (position, timezone.now())
+            full = len(self.positions) >= self.flush_size
+        if full:
+            self.flush()
+        elif self.flush_interval and self.thread is None:
+            self._start_thread()
+
+    def get(self, user_id, material_id):
+        """Returns the position waiting to be flushed, or None."""
+        with self.lock:
+            position = self.positions.get((user_id, material_id))
+        return position and position[0]
+
+    def flush(self):
+        """Writes the waiting positions, returns how many were written."""
+        from .models import WatchPosition
+
+        with self.flush_lock:
+            with self.lock:
+                positions, self.positions = self.positions, {}
+            if not positions:
+                return 0
+            try:
+                WatchPosition.objects.save_positions(positions)
+            except Exception:
+                logger.exception('Could not save %d watch positions.', len(positions))
+                # Kept for the next flush, unless a newer position arrived.
+                with self.lock:
+                    positions.update(self.positions)
+                    self.positions = positions
+                return 0
+            return len(positions)
+
+    def clear(self):
+        self.positions = {}
+
+
+_buffer = None
+
+
+def get_heartbeat_buffer():
+    """Returns the buffer of the process, set by the WATCH_POSITIONS_* settings."""
+    global _buffer
+    if _buffer is None:
+        _buffer = HeartbeatBuffer(
+            flush_interval=settings.WATCH_POSITIONS_FLUSH_INTERVAL,
+            flush_size=settings.WATCH_POSITIONS_FLUSH_SIZE,
+        )
+        if _buffer.flush_interval:
+            atexit.register(_buffer.flush)
+    return _buffer
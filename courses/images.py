@@ -0,0 +1,73 @@
+"""Responsive variants of the course images.
+
+The variants are generated once, when the image is uploaded, and their
+names are kept on the course, so rendering a page never opens an image.
+
+Example:
+    from courses.images import make_image_variants
+"""
+
+import io
+import os
+
+from PIL import Image, ImageOps
+from django.core.files.base import ContentFile
+
+# The catalog shows the images with 400 x 250 (16:10).
+ASPECT_RATIO = 400 / 250
+VARIANT_WIDTHS = (200, 400, 800)
+VARIANT_FORMATS = (
+    # (extension, Pillow format, save options)
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+VARIANTS_DIR = 'variants'
+
+
+def make_image_variants(image):
+    """Saves the resized variants of `image` and returns their description.
+
+    `image` is a committed ImageFieldFile. Returns a dict like:
+        {'width': 400, 'height': 250,
+         'webp': [[200, 'courses/images/variants/foo-200.webp'], ...],
+         'jpg': [[200, 'courses/images/variants/foo-200.jpg'], ...]}
+    The widths bigger than the original are skipped, images are never
+    upscaled.
+    """
+    storage = image.storage
+    directory, filename = os.path.split(image.name)
+    stem = os.path.splitext(filename)[0]
+
+    with image.open('rb'):
+        with Image.open(image) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+
+    widths = [width for width in VARIANT_WIDTHS if width <= original.width] \
+        or [original.width]
+    variants = {
+        'width': widths[-1],
+        'height': round(widths[-1] / ASPECT_RATIO),
+    }
+    for ext, image_format, options in VARIANT_FORMATS:
+        has_alpha = original.mode in ('RGBA', 'LA', 'P') and image_format != 'JPEG'
+        source = original.convert('RGBA' if has_alpha else 'RGB')
+        variants[ext] = []
+        for width in widths:
+            size = (width, round(width / ASPECT_RATIO))
+            resized = ImageOps.fit(source, size, method=Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            name = storage.save(
+                f'{directory}/{VARIANTS_DIR}/{stem}-{width}.{ext}',
+                ContentFile(buffer.getvalue()),
+            )
+            variants[ext].append([width, name])
+    return variants
+
+
+def delete_image_variants(storage, variants):
+    """Deletes the files of the variants described by `variants`."""
+    for ext, _, _ in VARIANT_FORMATS:
+        for _, name in variants.get(ext, []):
+            storage.delete(name)
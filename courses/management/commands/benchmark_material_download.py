@@ -0,0 +1,86 @@
+import os
+import time
+import tempfile
+import tracemalloc
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from courses.files import serve_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares memory and throughput of reading a whole material into '
+        'memory against streaming it with courses.files.serve_file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=2 * 1024 ** 3,
+            help='Size in bytes of the file used in the benchmark (default: 2 GiB).',
+        )
+        parser.add_argument(
+            '--skip-full-read', action='store_true',
+            help='Do not run the full read, it needs as much memory as --size.',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size']
+        factory = RequestFactory()
+
+        with tempfile.TemporaryDirectory() as location:
+            storage = FileSystemStorage(location=location)
+            name = 'benchmark.mp4'
+            # A sparse file, so creating it is instantaneous.
+            with open(os.path.join(location, name), 'wb') as f:
+                f.truncate(size)
+
+            def full_read():
+                with storage.open(name, 'rb') as f:
+                    return HttpResponse(f.read())
+
+            def stream():
+                return serve_file(factory.get('/'), storage, name)
+
+            def stream_range():
+                request = factory.get('/', HTTP_RANGE=f'bytes={size // 2}-')
+                return serve_file(request, storage, name)
+
+            @override_settings(MATERIALS_SENDFILE_HEADER='X-Accel-Redirect')
+            def sendfile():
+                return serve_file(factory.get('/'), storage, name)
+
+            cases = [
+                ('stream', stream),
+                ('stream (range, 2nd half)', stream_range),
+                ('X-Accel-Redirect', sendfile),
+            ]
+            if not options['skip_full_read']:
+                cases.insert(0, ('full read', full_read))
+
+            self.stdout.write(f'File size: {size / 1024 ** 2:.0f} MiB')
+            for label, build_response in cases:
+                peak, sent, elapsed = self.measure(build_response)
+                throughput = sent / 1024 ** 2 / elapsed if elapsed else 0
+                self.stdout.write(
+                    f'{label:<26} peak memory: {peak / 1024 ** 2:>9.2f} MiB  '
+                    f'sent: {sent / 1024 ** 2:>7.0f} MiB  '
+                    f'throughput: {throughput:>8.0f} MiB/s'
+                )
+
+    def measure(self, build_response):
+        """Returns the peak memory, bytes sent and time to consume a response."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = build_response()
+        sent = 0
+        for chunk in response:
+            sent += len(chunk)
+        response.close()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak, sent, elapsed
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Computes the courses taken by the students of each course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=settings.COURSE_RECOMMENDATIONS_SIZE,
+            help='Recommendations stored per course (default: COURSE_RECOMMENDATIONS_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        if options['top'] < 1:
+            raise CommandError('--top deve ser ao menos 1.')
+
+        total = build_recommendations(options['top'])
+        self.stdout.write(self.style.SUCCESS(f'{total} recomendação(ões) gravada(s).'))
@@ -0,0 +1,113 @@
+import os
+import time
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from courses.models import Material, MaterialBlob, MaterialUpload
+from courses.storage import BLOB_PREFIX, material_storage
+
+
+class Command(BaseCommand):
+    help = 'Deletes the material files that are not used by any material anymore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recomputes the reference counts from the materials before collecting.',
+        )
+        parser.add_argument(
+            '--orphans', action='store_true',
+            help='Also deletes blob files without a reference count row.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 60 * 60,
+            help='Seconds a file must be unused before deleting it (default: 1 day).',
+        )
+        parser.add_argument(
+            '--upload-max-age', type=int, default=7,
+            help='Days after which an unfinished upload is discarded (default: 7).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only lists what would be deleted.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if options['recount']:
+            self.recount()
+
+        deleted = 0
+        # Recently released blobs may be taken again by an upload going on.
+        released_before = timezone.now() - timedelta(seconds=options['min_age'])
+        blobs = MaterialBlob.objects.filter(references=0, updated_at__lt=released_before)
+        for blob in blobs.iterator():
+            if not dry_run:
+                # Only if no material took the blob again since the query.
+                rows, _ = MaterialBlob.objects.filter(pk=blob.pk, references=0).delete()
+                if not rows:
+                    continue
+                # A new upload of the same content touches the file before
+                # its material is saved, the row is created again then.
+                if self.taken_since(blob.name, released_before):
+                    continue
+                material_storage.delete(blob.name)
+            self.stdout.write(f'Removendo {blob.name}')
+            deleted += 1
+
+        # Unfinished uploads hold a partial file each.
+        limit = timezone.now() - timedelta(days=options['upload_max_age'])
+        for upload in MaterialUpload.objects.filter(updated_at__lt=limit):
+            self.stdout.write(f'Removendo envio incompleto {upload}')
+            if not dry_run:
+                upload.delete()
+            deleted += 1
+
+        if options['orphans']:
+            deleted += self.delete_orphans(options['min_age'], dry_run)
+
+        self.stdout.write(self.style.SUCCESS(f'{deleted} arquivo(s) removido(s).'))
+
+    def taken_since(self, name, released_before):
+        """Whether the storage touched the blob `name` after `released_before`."""
+        try:
+            return os.path.getmtime(material_storage.path(name)) >= released_before.timestamp()
+        except FileNotFoundError:
+            return False
+
+    def recount(self):
+        """Sets the references of every blob from the materials on db."""
+        counts = dict(
+            Material.objects
+            .filter(resource__startswith=BLOB_PREFIX)
+            .values_list('resource')
+            .annotate(total=Count('pk'))
+        )
+        MaterialBlob.objects.exclude(name__in=counts).update(references=0)
+        for name, total in counts.items():
+            MaterialBlob.objects.update_or_create(name=name, defaults={'references': total})
+
+    def delete_orphans(self, min_age, dry_run):
+        """Deletes old blob files that no MaterialBlob row knows about.
+
+        They are left behind by uploads whose material was never saved.
+        """
+        root = material_storage.path(BLOB_PREFIX)
+        known = set(MaterialBlob.objects.values_list('name', flat=True))
+        limit = time.time() - min_age
+        deleted = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, material_storage.location).replace(os.sep, '/')
+                if name in known or os.path.getmtime(path) > limit:
+                    continue
+                self.stdout.write(f'Removendo órfão {name}')
+                if not dry_run:
+                    os.remove(path)
+                deleted += 1
+        return deleted
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from courses.images import delete_image_variants, make_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Generates the responsive variants of the course images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerates the variants of every course, not only the missing ones.',
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            courses = courses.filter(image_variants={})
+
+        total = 0
+        for course in courses.iterator():
+            delete_image_variants(course.image.storage, course.image_variants)
+            variants = make_image_variants(course.image)
+            # update() skips Course.save(), the image is already committed.
+            Course.objects.filter(pk=course.pk).update(image_variants=variants)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'{total} curso(s) atualizado(s).'))
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import CourseDailyStats, Enrollment
+from courses.rollups import rollup_days
+
+
+class Command(BaseCommand):
+    help = 'Rolls up the enrollments, active students and comments of each day.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=date.fromisoformat,
+            help='First day to roll up, YYYY-MM-DD (default: the last day rolled up).',
+        )
+        parser.add_argument(
+            '--until', type=date.fromisoformat,
+            help='Last day to roll up, YYYY-MM-DD (default: today).',
+        )
+        parser.add_argument(
+            '--chunk-days', type=int, default=31,
+            help='Days rolled up per transaction (default: 31).',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days deve ser ao menos 1.')
+
+        until = options['until'] or timezone.localdate()
+        since = options['since'] or self.default_since()
+        if since is None:
+            self.stdout.write('Nada para consolidar.')
+            return
+        if since > until:
+            raise CommandError('--since não pode ser depois de --until.')
+
+        rows = 0
+        first_day = since
+        while first_day <= until:
+            last_day = min(first_day + timedelta(days=options['chunk_days'] - 1), until)
+            rows += rollup_days(first_day, last_day)
+            self.stdout.write(f'Consolidado de {first_day} a {last_day}.')
+            first_day = last_day + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'{rows} estatística(s) diária(s) gravada(s).'))
+
+    def default_since(self):
+        """The last day rolled up, maybe incomplete, or the first enrollment."""
+        last_day = CourseDailyStats.objects.aggregate(day=Max('day'))['day']
+        if last_day is not None:
+            return last_day
+        first = Enrollment.objects.aggregate(created_at=Min('created_at'))['created_at']
+        return first and timezone.localdate(first)
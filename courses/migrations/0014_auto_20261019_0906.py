@@ -0,0 +1,39 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:06
+
+import courses.storage
+import courses.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_auto_20210319_1733'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Nome')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Referências')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'arquivo de material',
+                'verbose_name_plural': 'arquivos de materiais',
+            },
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='filename',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Nome do arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='resource',
+            field=models.FileField(blank=True, help_text='Recurso usado na aula, como código base, anotações, imagem... Pode ser também o vídeo da aula.', max_length=255, null=True, storage=courses.storage.ContentAddressedStorage(), upload_to=courses.utils.material_directory_path, verbose_name='Recurso'),
+        ),
+    ]
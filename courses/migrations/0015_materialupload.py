@@ -0,0 +1,34 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0014_auto_20261019_0906'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nome do arquivo')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamanho')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Bytes recebidos')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='courses.material', verbose_name='Material')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='material_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'envio de material',
+                'verbose_name_plural': 'envios de materiais',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_materialupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variações da imagem'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Qualquer tamanho é aceito, a imagem é recortada na proporção 400 x 250.', null=True, upload_to='courses/images', verbose_name='Imagem'),
+        ),
+    ]
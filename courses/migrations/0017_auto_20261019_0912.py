@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_auto_20261019_0910'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['announcement', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_auto_20261019_0912'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='comments_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão dos comentários'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+from courses.utils import make_excerpt, render_text
+
+
+def render_contents(apps, schema_editor):
+    # The historical models have no save(), the fields are filled here.
+    Announcement = apps.get_model('courses', 'Announcement')
+    for announcement in Announcement.objects.only('content').iterator():
+        announcement.content_html = render_text(announcement.content)
+        announcement.excerpt = make_excerpt(announcement.content_html, 200)
+        announcement.save(update_fields=['content_html', 'excerpt'])
+
+    Lesson = apps.get_model('courses', 'Lesson')
+    for lesson in Lesson.objects.only('description').iterator():
+        lesson.description_html = render_text(lesson.description)
+        lesson.excerpt = make_excerpt(lesson.description_html, 150)
+        lesson.save(update_fields=['description_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_announcement_comments_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Conteúdo em HTML'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Resumo'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Descrição em HTML'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Resumo'),
+        ),
+        migrations.RunPython(render_contents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_auto_20261019_0921'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['course', 'created_at', 'id'], name='announcement_list_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_auto_20261019_0922'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='announcements_read_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Anúncios lidos até'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='announcements_read_ids',
+            field=models.TextField(default=',', editable=False, verbose_name='Anúncios lidos depois'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_auto_20261019_0925'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='feed_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Token do feed'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['course', 'updated_at'], name='announcement_feed_idx'),
+        ),
+    ]
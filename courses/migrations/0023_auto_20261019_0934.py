@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0022_auto_20261019_0928'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='lessons_done',
+            field=models.BinaryField(default=b'', verbose_name='Aulas concluídas'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='lessons_viewed',
+            field=models.BinaryField(default=b'', verbose_name='Aulas vistas'),
+        ),
+    ]
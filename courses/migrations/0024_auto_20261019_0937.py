@@ -0,0 +1,35 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0023_auto_20261019_0934'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchPosition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.FloatField(default=0, verbose_name='Posição (segundos)')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Atualizado em')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_positions', to='courses.material', verbose_name='Material')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_positions', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'posição do vídeo',
+                'verbose_name_plural': 'posições dos vídeos',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='watchposition',
+            constraint=models.UniqueConstraint(fields=('user', 'material'), name='unique_watch_position'),
+        ),
+    ]
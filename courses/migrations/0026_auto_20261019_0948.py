@@ -0,0 +1,60 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0025_auto_20261019_0940'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Dia')),
+                ('enrollments', models.PositiveIntegerField(default=0, verbose_name='Inscrições')),
+                ('active_students', models.PositiveIntegerField(default=0, verbose_name='Alunos ativos')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Comentários')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.course', verbose_name='Curso')),
+            ],
+            options={
+                'verbose_name': 'estatística diária do curso',
+                'verbose_name_plural': 'estatísticas diárias dos cursos',
+                'ordering': ('-day', 'course'),
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Dia')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Comentários')),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.announcement', verbose_name='Anúncio')),
+            ],
+            options={
+                'verbose_name': 'estatística diária do anúncio',
+                'verbose_name_plural': 'estatísticas diárias dos anúncios',
+                'ordering': ('-day', 'announcement'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='coursedailystats',
+            index=models.Index(fields=['day'], name='course_daily_stats_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='coursedailystats',
+            constraint=models.UniqueConstraint(fields=('course', 'day'), name='unique_course_daily_stats'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementdailystats',
+            index=models.Index(fields=['day'], name='announcement_daily_stats_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='announcementdailystats',
+            constraint=models.UniqueConstraint(fields=('announcement', 'day'), name='unique_announcement_daily_stats'),
+        ),
+    ]
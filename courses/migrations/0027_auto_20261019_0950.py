@@ -0,0 +1,33 @@
+# Generated by Django 3.1.7 on 2026-10-19 12:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0026_auto_20261019_0948'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseRecommendation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posição')),
+                ('score', models.FloatField(verbose_name='Similaridade')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='courses.course', verbose_name='Curso')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_by', to='courses.course', verbose_name='Curso recomendado')),
+            ],
+            options={
+                'verbose_name': 'recomendação',
+                'verbose_name_plural': 'recomendações',
+                'ordering': ('course', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='courserecommendation',
+            constraint=models.UniqueConstraint(fields=('course', 'rank'), name='unique_course_recommendation'),
+        ),
+    ]
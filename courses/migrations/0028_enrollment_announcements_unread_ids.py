@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0027_auto_20261019_0950'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='announcements_unread_ids',
+            field=models.TextField(default=',', editable=False, verbose_name='Anúncios não lidos antes'),
+        ),
+    ]
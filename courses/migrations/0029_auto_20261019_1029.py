@@ -0,0 +1,30 @@
+# Generated by Django 3.1.7 on 2026-10-19 13:29
+
+import secrets
+
+import courses.models
+from django.db import migrations, models
+
+
+def create_feed_tokens(apps, schema_editor):
+    # The tokens were created on the first visit to the announcements.
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    for enrollment in Enrollment.objects.filter(feed_token__isnull=True).only('pk').iterator():
+        enrollment.feed_token = secrets.token_urlsafe(32)
+        enrollment.save(update_fields=['feed_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0028_enrollment_announcements_unread_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_feed_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='feed_token',
+            field=models.CharField(default=courses.models.make_feed_token, editable=False, max_length=64, unique=True, verbose_name='Token do feed'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-19 13:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0029_auto_20261019_1029'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='announcement',
+            name='comments_version',
+        ),
+    ]
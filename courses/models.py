@@ -1,13 +1,26 @@
+import os
+import uuid
+import secrets
+import shutil
+import hashlib
+import tempfile
 from datetime import date
 
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Cast, Concat, Replace
 from django.urls import reverse
+from django.utils import timezone
 from django.conf import settings
+from django.core.files import File
 from django.core.validators import MinValueValidator
 from django.template.defaultfilters import pluralize
 
-from .utils import material_directory_path
+from .images import delete_image_variants, make_image_variants
+from .storage import BLOB_PREFIX, UPLOAD_PREFIX, material_storage
+from .utils import (
+    bump_enrollments_version, get_comments_version, make_excerpt, material_directory_path, render_text,
+)
 
 
 class CourseManager(models.Manager):
@@ -23,6 +36,18 @@ class CourseManager(models.Manager):
            Q(name__icontains=query) | Q(description__icontains=query)
         )
 
+    def recommended_for(self, course):
+        """Returns the courses taken by the students of `course`.
+
+        Reads the neighbours stored by the build_recommendations
+        command, most similar first, in a single query.
+        """
+        return (
+            self.get_queryset()
+            .filter(recommended_by__course=course)
+            .order_by('recommended_by__rank')
+        )
+
 
 class Course(models.Model):
     """A model for a course."""
@@ -35,8 +60,9 @@ class Course(models.Model):
         'Imagem', 
         upload_to='courses/images', 
         null=True, blank=True,
-        help_text='Use uma imagem com as dimensões 400 x 250.',
+        help_text='Qualquer tamanho é aceito, a imagem é recortada na proporção 400 x 250.',
     )
+    image_variants = models.JSONField('Variações da imagem', default=dict, blank=True, editable=False)
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -50,6 +76,17 @@ class Course(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # Commits the upload first, so the variants are named after it.
+            self.image.save(self.image.name, self.image.file, save=False)
+            delete_image_variants(self.image.storage, self.image_variants)
+            self.image_variants = make_image_variants(self.image)
+        elif not self.image and self.image_variants:
+            delete_image_variants(self.image.storage, self.image_variants)
+            self.image_variants = {}
+        super().save(*args, **kwargs)
+
     def released_lessons(self):
         """Returns all lessons released."""
         today = date.today()
@@ -59,6 +96,35 @@ class Course(models.Model):
         """A url for a specific course."""
         return reverse('courses:details', args=(self.pk, self.slug))
 
+
+class CourseRecommendation(models.Model):
+    """A course taken by the students of another, see courses.recommendations."""
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Curso',
+        related_name='recommendations',
+    )
+    recommended = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Curso recomendado',
+        related_name='recommended_by',
+    )
+    rank = models.PositiveSmallIntegerField('Posição')
+    score = models.FloatField('Similaridade')
+
+    class Meta:
+        verbose_name = 'recomendação'
+        verbose_name_plural = 'recomendações'
+        ordering = ('course', 'rank')
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'rank'], name='unique_course_recommendation'),
+        ]
+
+    def __str__(self):
+        return f'{self.course} → {self.recommended}'
+
     
 class Lesson(models.Model):
     """A model for a lesson of a course."""
@@ -70,6 +136,9 @@ class Lesson(models.Model):
     )
     name = models.CharField('Nome', max_length=100)
     description = models.TextField('Descrição', blank=True)
+    # The description rendered on save, the lists show only the excerpt.
+    description_html = models.TextField('Descrição em HTML', blank=True, editable=False)
+    excerpt = models.TextField('Resumo', blank=True, editable=False)
     order = models.PositiveIntegerField(
         'Ordem',  
         validators=[MinValueValidator(1)],
@@ -89,8 +158,16 @@ class Lesson(models.Model):
         verbose_name_plural = 'aulas'
         ordering = ('order',)
     
+    # Characters of the description shown on the list of lessons.
+    excerpt_length = 150
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        self.description_html = render_text(self.description)
+        self.excerpt = make_excerpt(self.description_html, self.excerpt_length)
+        super().save(*args, **kwargs)
     
     def is_available(self):
         """Returns True if a lesson is available. Otherwise returns False.
@@ -133,9 +210,12 @@ class Material(models.Model):
     resource = models.FileField(
         'Recurso',
         upload_to=material_directory_path, 
+        storage=material_storage,
+        max_length=255,
         blank=True, null=True,
         help_text='Recurso usado na aula, como código base, anotações, imagem... Pode ser também o vídeo da aula.',
     )
+    filename = models.CharField('Nome do arquivo', max_length=255, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'material'
@@ -143,6 +223,16 @@ class Material(models.Model):
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Keeps the uploaded file name, the storage saves it by content.
+        if self.resource and not self.resource._committed:
+            self.filename = os.path.basename(self.resource.name)
+        super().save(*args, **kwargs)
+
+    def get_filename(self):
+        """Returns the name of the file as it was uploaded."""
+        return self.filename or os.path.basename(self.resource.name)
     
     def is_embedded(self):
         """Returns True if exists a embedded video."""
@@ -155,6 +245,315 @@ class Material(models.Model):
             args=(self.lesson.course.pk, self.lesson.course.slug, self.pk),
         )
 
+    def get_download_url(self):
+        """A url for download the resource of a specific material."""
+        return reverse(
+            'courses:material_download', 
+            args=(self.lesson.course.pk, self.lesson.course.slug, self.pk),
+        )
+
+
+class MaterialBlobManager(models.Manager):
+    """A custom manager for the class MaterialBlob."""
+
+    def add_reference(self, name):
+        """Counts one more material using the blob `name`."""
+        if not name or not name.startswith(BLOB_PREFIX):
+            return
+        # update() does not touch auto_now, collect_material_blobs uses it.
+        changes = {'references': F('references') + 1, 'updated_at': timezone.now()}
+        updated = self.filter(name=name).update(**changes)
+        if not updated:
+            _, created = self.get_or_create(name=name, defaults={'references': 1})
+            if not created:
+                self.filter(name=name).update(**changes)
+
+    def remove_reference(self, name):
+        """Counts one less material using the blob `name`."""
+        if not name or not name.startswith(BLOB_PREFIX):
+            return
+        self.filter(name=name, references__gt=0).update(
+            references=F('references') - 1, updated_at=timezone.now(),
+        )
+
+
+class MaterialBlob(models.Model):
+    """The reference count of a file saved by the content addressed storage."""
+    name = models.CharField('Nome', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Referências', default=0)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    objects = MaterialBlobManager()
+
+    class Meta:
+        verbose_name = 'arquivo de material'
+        verbose_name_plural = 'arquivos de materiais'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class AssembledFile(File):
+    """A file already on disk, so the storage can move it instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class MaterialUpload(models.Model):
+    """A resumable upload, in chunks, of the resource of a material.
+
+    The chunks are written in place on a partial file, `offset` is the
+    number of bytes already received and checked. When all the bytes were
+    received the partial file is moved to the material storage.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        verbose_name='Material',
+        related_name='uploads',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Usuário',
+        related_name='material_uploads',
+    )
+    filename = models.CharField('Nome do arquivo', max_length=255)
+    size = models.PositiveBigIntegerField('Tamanho')
+    offset = models.PositiveBigIntegerField('Bytes recebidos', default=0)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'envio de material'
+        verbose_name_plural = 'envios de materiais'
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    def part_path(self):
+        """Returns the path of the partial file on disk."""
+        return material_storage.path(f'{UPLOAD_PREFIX}{self.pk}.part')
+
+    def is_complete(self):
+        """Returns True if all the bytes were received."""
+        return self.offset == self.size
+
+    def receive_chunk(self, stream, length, checksum):
+        """Reads a chunk of `length` bytes from `stream` to a temporary file.
+
+        The chunk is read and written in small blocks while its SHA-256 is
+        computed. Returns the path of the file, to append_chunk(), or None,
+        removing it, if the stream ends early or the checksum does not match.
+
+        Runs without any lock, a slow client holds no transaction.
+        """
+        upload_dir = material_storage.path(UPLOAD_PREFIX)
+        os.makedirs(upload_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=upload_dir, prefix=f'{self.pk}.', suffix='.chunk')
+        hasher = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as chunk:
+            remaining = length
+            while remaining:
+                block = stream.read(min(material_storage.hash_block_size, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                chunk.write(block)
+                remaining -= len(block)
+        if remaining or hasher.hexdigest() != checksum.lower():
+            os.remove(path)
+            return None
+        return path
+
+    def append_chunk(self, chunk_path, length):
+        """Appends the chunk received by receive_chunk() at the offset.
+
+        Must be called in a transaction, on an upload read with
+        select_for_update(), so two requests never write the same offset.
+        The chunk is already on the local disk, the lock is held shortly.
+        """
+        path = self.part_path()
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as part, open(chunk_path, 'rb') as chunk:
+            # Drops anything left by a chunk that failed before.
+            part.seek(self.offset)
+            part.truncate()
+            shutil.copyfileobj(chunk, part, material_storage.hash_block_size)
+
+        self.offset += length
+        self.save(update_fields=['offset', 'updated_at'])
+
+    def complete(self):
+        """Saves the received file as the resource of the material.
+
+        Must be called in a transaction, on an upload read with
+        select_for_update(), the partial file is moved and the upload
+        deleted.
+        """
+        material = self.material
+        material.filename = self.filename
+        with AssembledFile(open(self.part_path(), 'rb'), name=self.filename) as file:
+            material.resource.save(self.filename, file)
+        self.delete()
+        return material
+
+    def delete(self, *args, **kwargs):
+        if os.path.exists(self.part_path()):
+            os.remove(self.part_path())
+        return super().delete(*args, **kwargs)
+
+
+class WatchPositionManager(models.Manager):
+    """A custom manager for the class WatchPosition."""
+
+    def save_positions(self, positions):
+        """Saves many positions at once, creating or updating their rows.
+
+        `positions` maps (user_id, material_id) to (position, updated_at).
+        Takes a fixed number of queries per batch, whatever the number of
+        positions.
+        """
+        if not positions:
+            return
+        # A superset of the rows, filtered by the pairs below.
+        rows = self.get_queryset().filter(
+            user_id__in={user_id for user_id, _ in positions},
+            material_id__in={material_id for _, material_id in positions},
+        ).only('pk', 'user_id', 'material_id')
+        existing = {
+            (watch.user_id, watch.material_id): watch 
+            for watch in rows if (watch.user_id, watch.material_id) in positions
+        }
+
+        created = []
+        for key, (position, updated_at) in positions.items():
+            watch = existing.get(key) or self.model(user_id=key[0], material_id=key[1])
+            watch.position, watch.updated_at = position, updated_at
+            if key not in existing:
+                created.append(watch)
+        with transaction.atomic():
+            self.bulk_update(existing.values(), ['position', 'updated_at'], batch_size=100)
+            # A row created meanwhile by another process keeps its position,
+            # the next heartbeat of the viewer updates it.
+            self.bulk_create(created, ignore_conflicts=True)
+
+
+class WatchPosition(models.Model):
+    """The last position of a user on the video of a material.
+
+    Written in batches from the heartbeats of the players, see
+    courses.heartbeats.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Usuário',
+        related_name='watch_positions',
+    )
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        verbose_name='Material',
+        related_name='watch_positions',
+    )
+    position = models.FloatField('Posição (segundos)', default=0)
+    updated_at = models.DateTimeField('Atualizado em', default=timezone.now)
+
+    objects = WatchPositionManager()
+
+    class Meta:
+        verbose_name = 'posição do vídeo'
+        verbose_name_plural = 'posições dos vídeos'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'material'], name='unique_watch_position')
+        ]
+
+    def __str__(self):
+        return f'{self.user} — {self.material} ({self.position:.0f}s)'
+
+
+class Activity(models.Model):
+    """A page of a course opened by a user, for the analytics.
+
+    Inserted in batches by courses.activity, never saved by the views.
+    """
+
+    class Kind(models.IntegerChoices):
+        AULA = 1
+        MATERIAL = 2
+
+    kind = models.IntegerField('Tipo', choices=Kind.choices)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Usuário',
+        related_name='activities',
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Curso',
+        related_name='activities',
+    )
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        verbose_name='Aula',
+        related_name='activities',
+        blank=True, null=True,
+    )
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        verbose_name='Material',
+        related_name='activities',
+        blank=True, null=True,
+    )
+    created_at = models.DateTimeField('Criado em', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'atividade'
+        verbose_name_plural = 'atividades'
+        indexes = [
+            models.Index(fields=['created_at'], name='activity_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} — {self.get_kind_display()} ({self.created_at:%d/%m/%Y %H:%M})'
+
+
+def make_feed_token():
+    """Returns a new private token for the announcements feed of an enrollment."""
+    return secrets.token_urlsafe(32)
+
+
+class EnrollmentManager(models.Manager):
+    """A custom manager for the class Enrollment."""
+
+    def with_unread_announcements(self):
+        """Annotates `unread_announcements`, the count of unread announcements.
+
+        The counts of all the enrollments are taken in a single query.
+        """
+        marker = Concat(Value(','), Cast('course__announcements__pk', models.CharField()), Value(','))
+        unread = (
+            (
+                Q(course__announcements__created_at__gt=F('announcements_read_at'))
+                | Q(announcements_read_at__isnull=True)
+            ) & ~Q(announcements_read_ids__contains=marker)
+        ) | (
+            Q(course__announcements__created_at__lte=F('announcements_read_at'))
+            & Q(announcements_unread_ids__contains=marker)
+        )
+        return self.get_queryset().annotate(
+            unread_announcements=models.Count('course__announcements', filter=unread),
+        )
+
 
 class Enrollment(models.Model):
     """A model for an enrollment for a course."""
@@ -182,9 +581,31 @@ class Enrollment(models.Model):
         default=EnrollmentStatus.PENDENTE,
         blank=True,
     )
+    # The announcements read by the user: the ones created until
+    # announcements_read_at, except those listed in
+    # announcements_unread_ids, plus the newer ones listed in
+    # announcements_read_ids. The lists are saved like ",3,5,".
+    announcements_read_at = models.DateTimeField(
+        'Anúncios lidos até', 
+        blank=True, null=True, editable=False,
+    )
+    announcements_read_ids = models.TextField('Anúncios lidos depois', default=',', editable=False)
+    announcements_unread_ids = models.TextField('Anúncios não lidos antes', default=',', editable=False)
+    # The progress on the lessons, as bitsets where the bit order - 1 is
+    # set for each lesson viewed (or done), saved as little endian bytes.
+    lessons_viewed = models.BinaryField('Aulas vistas', default=b'', editable=False)
+    lessons_done = models.BinaryField('Aulas concluídas', default=b'', editable=False)
+    # Authenticates the announcements feed of the user.
+    feed_token = models.CharField(
+        'Token do feed', 
+        max_length=64, unique=True,
+        default=make_feed_token, editable=False,
+    )
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
 
+    objects = EnrollmentManager()
+
     class Meta:
         verbose_name = 'inscrição'
         verbose_name_plural = 'inscrições'
@@ -192,6 +613,13 @@ class Enrollment(models.Model):
             models.UniqueConstraint(fields=['user', 'course'], name='unique_enrollment')
         ]
     
+    # Read announcements listed before they are folded into
+    # announcements_read_at.
+    read_ids_limit = 20
+    # Unread announcements kept below announcements_read_at, the older
+    # ones are counted as read.
+    unread_ids_limit = 20
+
     def approve(self):
         """Changes the enrollment status to approved."""
         self.status = self.EnrollmentStatus.APROVADO
@@ -201,6 +629,147 @@ class Enrollment(models.Model):
         """Returns True if the user is approved."""
         return self.status == self.EnrollmentStatus.APROVADO
 
+    def _set_lesson_bit(self, field, lesson):
+        """Sets the bit of `lesson` on the bitset `field`, returns False if already set.
+
+        The bitset is swapped with a compare-and-swap UPDATE, so concurrent
+        updates of other bits are never lost.
+        """
+        bit = 1 << (lesson.order - 1)
+        while True:
+            current = bytes(getattr(self, field))
+            bits = int.from_bytes(current, 'little')
+            if bits & bit:
+                return False
+            bits |= bit
+            new = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+            updated = Enrollment.objects.filter(pk=self.pk, **{field: current}).update(**{field: new})
+            if updated:
+                setattr(self, field, new)
+                return True
+            # Changed by another request meanwhile, try again over it.
+            setattr(self, field, Enrollment.objects.values_list(field, flat=True).get(pk=self.pk))
+
+    def _has_lesson_bit(self, field, lesson):
+        return bool(int.from_bytes(bytes(getattr(self, field)), 'little') >> (lesson.order - 1) & 1)
+
+    def mark_lesson_viewed(self, lesson):
+        """Marks a lesson as viewed by the user. Nothing is written if it already was."""
+        return self._set_lesson_bit('lessons_viewed', lesson)
+
+    def mark_lesson_done(self, lesson):
+        """Marks a lesson as done by the user, it's also viewed."""
+        self.mark_lesson_viewed(lesson)
+        return self._set_lesson_bit('lessons_done', lesson)
+
+    def has_viewed(self, lesson):
+        """Returns True if the user has viewed the lesson."""
+        return self._has_lesson_bit('lessons_viewed', lesson)
+
+    def has_done(self, lesson):
+        """Returns True if the user has done the lesson."""
+        return self._has_lesson_bit('lessons_done', lesson)
+
+    def progress(self, orders):
+        """Returns the percentage of the lessons with the `orders` done by the user."""
+        if not orders:
+            return 0
+        mask = sum(1 << (order - 1) for order in set(orders))
+        done = int.from_bytes(bytes(self.lessons_done), 'little') & mask
+        return round(100 * bin(done).count('1') / len(set(orders)))
+
+    def read_announcement_ids(self):
+        """Returns the ids of the announcements read after announcements_read_at."""
+        return {int(pk) for pk in self.announcements_read_ids.strip(',').split(',') if pk}
+
+    def unread_announcement_ids(self):
+        """Returns the ids of the announcements not read until announcements_read_at."""
+        return {int(pk) for pk in self.announcements_unread_ids.strip(',').split(',') if pk}
+
+    def _below_read_mark(self, announcement):
+        return bool(self.announcements_read_at) and announcement.created_at <= self.announcements_read_at
+
+    def has_read(self, announcement):
+        """Returns True if the user has read the announcement."""
+        if self._below_read_mark(announcement):
+            return f',{announcement.pk},' not in self.announcements_unread_ids
+        return f',{announcement.pk},' in self.announcements_read_ids
+
+    def unread_announcements(self):
+        """Returns the announcements of the course not read by the user."""
+        announcements = self.course.announcements.exclude(pk__in=self.read_announcement_ids())
+        if self.announcements_read_at:
+            announcements = announcements.filter(
+                Q(created_at__gt=self.announcements_read_at) | Q(pk__in=self.unread_announcement_ids())
+            )
+        return announcements
+
+    def mark_announcement_read(self, announcement):
+        """Marks an announcement as read by the user, with a single UPDATE.
+
+        Nothing is written if it was already read.
+        """
+        if self.has_read(announcement):
+            return
+        if self._below_read_mark(announcement):
+            # One of the unread announcements kept below the mark.
+            marker = f',{announcement.pk},'
+            Enrollment.objects.filter(pk=self.pk).update(
+                announcements_unread_ids=Replace('announcements_unread_ids', Value(marker), Value(',')),
+            )
+            self.announcements_unread_ids = self.announcements_unread_ids.replace(marker, ',')
+            bump_enrollments_version(self.user_id)
+            return
+        marker = f'{announcement.pk},'
+        (
+            Enrollment.objects
+            .filter(pk=self.pk)
+            .exclude(announcements_read_ids__contains=f',{marker}')
+            .update(announcements_read_ids=Concat('announcements_read_ids', Value(marker)))
+        )
+        self.announcements_read_ids += marker
+        # The dashboard shows the count of unread announcements.
+        bump_enrollments_version(self.user_id)
+        if self.announcements_read_ids.count(',') > self.read_ids_limit:
+            self.compact_read_announcements()
+
+    def compact_read_announcements(self):
+        """Moves announcements_read_at up to the newest announcement read.
+
+        The announcements left behind by the mark without being read are
+        listed in announcements_unread_ids, only the newest
+        `unread_ids_limit` of them, so both lists stay short however the
+        user reads.
+        """
+        read_ids = self.read_announcement_ids()
+        unread_ids = sorted(self.unread_announcement_ids(), reverse=True)
+        announcements = self.course.announcements.all()
+        newest = announcements.filter(pk__in=read_ids).aggregate(created_at=Max('created_at'))['created_at']
+        if newest is not None:
+            skipped = announcements.filter(created_at__lte=newest).exclude(pk__in=read_ids)
+            if self.announcements_read_at:
+                skipped = skipped.filter(created_at__gt=self.announcements_read_at)
+            skipped = skipped.order_by('-created_at', '-pk').values_list('pk', flat=True)
+            # All the skipped ones are newer than the unread ones kept before.
+            unread_ids = list(skipped[:self.unread_ids_limit]) + unread_ids
+            self.announcements_read_at = newest
+
+        previous = {
+            'announcements_read_ids': self.announcements_read_ids,
+            'announcements_unread_ids': self.announcements_unread_ids,
+        }
+        self.announcements_read_ids = ','
+        self.announcements_unread_ids = ''.join(
+            f',{pk}' for pk in sorted(unread_ids[:self.unread_ids_limit])
+        ) + ','
+        # Skipped if another request marked an announcement meanwhile, the
+        # next mark compacts again.
+        Enrollment.objects.filter(pk=self.pk, **previous).update(
+            announcements_read_at=self.announcements_read_at,
+            announcements_read_ids=self.announcements_read_ids,
+            announcements_unread_ids=self.announcements_unread_ids,
+        )
+
 
 class Announcement(models.Model):
     """A model for an annoucement for a course."""
@@ -212,6 +781,9 @@ class Announcement(models.Model):
     )
     title = models.CharField('Título', max_length=100)
     content = models.TextField('Conteúdo')
+    # The content rendered on save, the lists show only the excerpt.
+    content_html = models.TextField('Conteúdo em HTML', blank=True, editable=False)
+    excerpt = models.TextField('Resumo', blank=True, editable=False)
 
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
@@ -220,10 +792,30 @@ class Announcement(models.Model):
         verbose_name = 'anúncio'
         verbose_name_plural = 'anúncios'
         ordering = ('-created_at',)
+        indexes = [
+            # Keyset pagination of the announcements of a course.
+            models.Index(fields=['course', 'created_at', 'id'], name='announcement_list_idx'),
+            # Last change of the announcements of a course, for the feeds.
+            models.Index(fields=['course', 'updated_at'], name='announcement_feed_idx'),
+        ]
+
+    # Characters of the content shown on the list of announcements.
+    excerpt_length = 200
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.content_html = render_text(self.content)
+        self.excerpt = make_excerpt(self.content_html, self.excerpt_length)
+        super().save(*args, **kwargs)
+
+    def comments_cache_key(self, page):
+        """Returns the cache key of a rendered page of comments."""
+        # created_at tells apart announcements that reused a deleted pk.
+        version = get_comments_version(self.pk)
+        return f'courses:comments:{self.pk}:{self.created_at.timestamp()}:{version}:{page}'
+
     def get_absolute_url(self):
         """A url for a specific announcement."""
         return reverse(
@@ -232,6 +824,18 @@ class Announcement(models.Model):
         )
 
 
+class CommentManager(models.Manager):
+    """A custom manager for the class Comment."""
+
+    def with_authors(self):
+        """Loads the comments with their users and the groups of the users.
+
+        Uses a constant number of queries, however many comments there are,
+        and lets CustomUser.is_instructor() answer from the loaded groups.
+        """
+        return self.get_queryset().select_related('user').prefetch_related('user__groups')
+
+
 class Comment(models.Model):
     """A model for comment in the announcement."""
     announcement = models.ForeignKey(
@@ -251,10 +855,16 @@ class Comment(models.Model):
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
 
+    objects = CommentManager()
+
     class Meta:
         verbose_name = 'comentário'
         verbose_name_plural = 'comentários'
         ordering = ('created_at',)
+        indexes = [
+            # Keyset pagination of the comments of an announcement.
+            models.Index(fields=['announcement', 'created_at', 'id'], name='comment_thread_idx'),
+        ]
 
     def __str__(self):
         if len(self.content) > 50:
@@ -271,4 +881,62 @@ class Comment(models.Model):
                 self.announcement.pk,
                 self.pk,
             ),
-        )
\ No newline at end of file
+        )
+
+
+class CourseDailyStats(models.Model):
+    """The totals of a course on a day, for the reports.
+
+    Computed from the enrollments, activities and comments by the
+    rollup_stats command, never by the views.
+    """
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        verbose_name='Curso',
+        related_name='daily_stats',
+    )
+    day = models.DateField('Dia')
+    enrollments = models.PositiveIntegerField('Inscrições', default=0)
+    active_students = models.PositiveIntegerField('Alunos ativos', default=0)
+    comments = models.PositiveIntegerField('Comentários', default=0)
+
+    class Meta:
+        verbose_name = 'estatística diária do curso'
+        verbose_name_plural = 'estatísticas diárias dos cursos'
+        ordering = ('-day', 'course')
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'day'], name='unique_course_daily_stats')
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='course_daily_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.course} — {self.day:%d/%m/%Y}'
+
+
+class AnnouncementDailyStats(models.Model):
+    """The comments of an announcement on a day, see CourseDailyStats."""
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        verbose_name='Anúncio',
+        related_name='daily_stats',
+    )
+    day = models.DateField('Dia')
+    comments = models.PositiveIntegerField('Comentários', default=0)
+
+    class Meta:
+        verbose_name = 'estatística diária do anúncio'
+        verbose_name_plural = 'estatísticas diárias dos anúncios'
+        ordering = ('-day', 'announcement')
+        constraints = [
+            models.UniqueConstraint(fields=['announcement', 'day'], name='unique_announcement_daily_stats')
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='announcement_daily_stats_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.announcement} — {self.day:%d/%m/%Y}'
@@ -0,0 +1,105 @@
+"""Keyset (cursor) pagination on (created_at, id).
+
+Unlike OFFSET pagination, the cost of a page does not grow with the
+position of the page, the database seeks on the index straight to the
+cursor.
+
+Example:
+    from courses.pagination import latest_page, older_page, newer_page, newest_first_page
+"""
+
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def make_cursor(created_at, pk):
+    """Returns an opaque cursor pointing to the position (created_at, pk)."""
+    value = f'{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def encode_cursor(obj):
+    """Returns an opaque cursor pointing to `obj`."""
+    return make_cursor(obj.created_at, obj.pk)
+
+
+def decode_cursor(cursor):
+    """Returns the (created_at, pk) of a cursor, raises ValueError if invalid."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValueError('Invalid cursor.')
+    if created_at is None:
+        raise ValueError('Invalid cursor.')
+    return created_at, pk
+
+
+def _older(cursor):
+    created_at, pk = decode_cursor(cursor)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+def _newer(cursor):
+    created_at, pk = decode_cursor(cursor)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def latest_page(queryset, size):
+    """Returns the `size` newest objects, oldest first, and if there are older ones.
+
+    The page is returned as an unsliced queryset, so it can still be
+    filtered. It costs one extra query to find where the page starts.
+    """
+    boundary = (
+        queryset
+        .order_by('-created_at', '-pk')
+        .values_list('created_at', 'pk')[size:size + 1]
+    )
+    boundary = list(boundary)
+    if not boundary:
+        return queryset.order_by('created_at', 'pk'), False
+    created_at, pk = boundary[0]
+    page = queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+    )
+    return page.order_by('created_at', 'pk'), True
+
+
+def older_page(queryset, cursor, size):
+    """Returns up to `size` objects older than `cursor`, oldest first, and if there are more."""
+    objects = list(queryset.filter(_older(cursor)).order_by('-created_at', '-pk')[:size + 1])
+    has_more = len(objects) > size
+    return objects[:size][::-1], has_more
+
+
+def newer_page(queryset, cursor, size):
+    """Returns up to `size` objects newer than `cursor`, oldest first, and if there are more."""
+    objects = list(queryset.filter(_newer(cursor)).order_by('created_at', 'pk')[:size + 1])
+    has_more = len(objects) > size
+    return objects[:size], has_more
+
+
+def newest_first_page(queryset, cursor, size):
+    """Returns up to `size` objects older than `cursor`, newest first, and the next cursor.
+
+    Without a cursor the page starts at the newest object. The next cursor
+    is None on the last page. Like latest_page(), the page is returned
+    as an unsliced queryset, so it can still be annotated.
+    """
+    if cursor:
+        queryset = queryset.filter(_older(cursor))
+    queryset = queryset.order_by('-created_at', '-pk')
+    # The last object of the page and the first of the next one.
+    boundary = list(queryset.values_list('created_at', 'pk')[size - 1:size + 1])
+    if len(boundary) < 2:
+        return queryset, None
+    created_at, pk = boundary[0]
+    page = queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gte=pk)
+    )
+    return page, make_cursor(created_at, pk)
@@ -0,0 +1,122 @@
+"""Course recommendations from the co-enrollments of the students.
+
+"Students who took this course also took...": the courses are compared
+by the cosine similarity of their columns on the user × course matrix
+of the approved enrollments,
+
+    similarity(a, b) = students of a and b / sqrt(students of a * students of b)
+
+and the top neighbours of each course are stored in CourseRecommendation
+by the build_recommendations command, so the details page only reads
+them.
+
+The matrix is a SciPy sparse matrix and the similarities are a single
+sparse product, millions of enrollments take seconds. NumPy and SciPy
+are in the requirements; the pure Python fallback, which counts the
+co-enrollments per student, is only meant for development environments
+without them and is fine up to a few thousand students.
+
+Example:
+    from courses.recommendations import build_recommendations
+    build_recommendations(top_k=4)
+"""
+
+import math
+from itertools import chain, permutations
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    # Development fallback only, see the module docstring.
+    np = sparse = None
+
+
+def _neighbours_sparse(pairs, top_k):
+    # Read straight from the iterator, no list of tuples is built.
+    pairs = np.fromiter(chain.from_iterable(pairs), dtype=np.int64).reshape(-1, 2)
+    if not len(pairs):
+        return {}
+    _, user_index = np.unique(pairs[:, 0], return_inverse=True)
+    course_ids, course_index = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs)), (user_index, course_index)),
+        shape=(user_index.max() + 1, len(course_ids)),
+    )
+    # Course × course co-enrollments, the diagonal has the students.
+    co_enrollments = (matrix.T @ matrix).tocsr()
+    students = co_enrollments.diagonal()
+    co_enrollments = co_enrollments - sparse.diags(students)
+    norms = sparse.diags(1 / np.sqrt(students))
+    similarities = (norms @ co_enrollments @ norms).tocsr()
+    similarities.eliminate_zeros()
+
+    neighbours = {}
+    for row in range(similarities.shape[0]):
+        start, end = similarities.indptr[row], similarities.indptr[row + 1]
+        if start == end:
+            continue
+        scores = similarities.data[start:end]
+        others = course_ids[similarities.indices[start:end]]
+        # Most similar first, the lowest pk breaks the ties.
+        best = np.lexsort((others, -scores))[:top_k]
+        neighbours[int(course_ids[row])] = [
+            (int(other), float(score)) for other, score in zip(others[best], scores[best])
+        ]
+    return neighbours
+
+
+def _neighbours_python(pairs, top_k):
+    # Development fallback, without NumPy and SciPy.
+    courses_of = defaultdict(list)
+    for user_pk, course_pk in pairs:
+        courses_of[user_pk].append(course_pk)
+
+    students = Counter()
+    co_enrollments = defaultdict(Counter)
+    for courses in courses_of.values():
+        students.update(courses)
+        for course_pk, other_pk in permutations(courses, 2):
+            co_enrollments[course_pk][other_pk] += 1
+
+    neighbours = {}
+    for course_pk, others in co_enrollments.items():
+        scores = [
+            (other_pk, total / math.sqrt(students[course_pk] * students[other_pk]))
+            for other_pk, total in others.items()
+        ]
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        neighbours[course_pk] = scores[:top_k]
+    return neighbours
+
+
+def course_neighbours(pairs, top_k):
+    """Returns the `top_k` most similar courses of each course.
+
+    `pairs` are (user_pk, course_pk) of the enrollments. Returns a dict
+    of course_pk -> [(other_pk, similarity), ...], most similar first.
+    Courses without co-enrollments are left out.
+    """
+    if np is None:
+        return _neighbours_python(pairs, top_k)
+    return _neighbours_sparse(pairs, top_k)
+
+
+def build_recommendations(top_k):
+    """Replaces the stored recommendations, returns how many were stored."""
+    from .models import CourseRecommendation, Enrollment
+
+    pairs = Enrollment.objects.filter(status=1).values_list('user', 'course').order_by()
+    neighbours = course_neighbours(pairs.iterator(chunk_size=10000), top_k)
+    recommendations = [
+        CourseRecommendation(course_id=course_pk, recommended_id=other_pk, rank=rank, score=score)
+        for course_pk, others in neighbours.items()
+        for rank, (other_pk, score) in enumerate(others, start=1)
+    ]
+    with transaction.atomic():
+        CourseRecommendation.objects.all().delete()
+        CourseRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+    return len(recommendations)
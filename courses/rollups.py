@@ -0,0 +1,81 @@
+"""Daily rollups of the enrollments, activities and comments.
+
+The reports of the admin read only CourseDailyStats and
+AnnouncementDailyStats, a row per course (or announcement) and day, so
+a year of data is a few hundred rows whatever the traffic was.
+
+A rollup replaces the rows of the days it computes, so a day can be
+rolled up again (ex: today, still incomplete) without double counting.
+
+Example:
+    from courses.rollups import rollup_days
+    rollup_days(date(2021, 3, 1), date(2021, 3, 31))
+"""
+
+from datetime import datetime, time, timedelta
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _per_day(queryset, total, *group_by):
+    """Counts `queryset` per `group_by` and local day of created_at."""
+    rows = (
+        queryset
+        .annotate(day=TruncDate('created_at'))
+        .values_list(*group_by, 'day')
+        .annotate(total=total)
+        .order_by()
+    )
+    return {row[:-1]: row[-1] for row in rows}
+
+
+def rollup_days(first_day, last_day):
+    """Recomputes the stats of the days from `first_day` to `last_day`.
+
+    Returns the number of CourseDailyStats rows written.
+    """
+    from .models import Activity, AnnouncementDailyStats, Comment, CourseDailyStats, Enrollment
+
+    period = {
+        'created_at__gte': _day_start(first_day),
+        'created_at__lt': _day_start(last_day + timedelta(days=1)),
+    }
+    enrollments = _per_day(Enrollment.objects.filter(**period), Count('pk'), 'course')
+    active_students = _per_day(Activity.objects.filter(**period), Count('user', distinct=True), 'course')
+    announcement_comments = _per_day(
+        Comment.objects.filter(**period), Count('pk'), 'announcement', 'announcement__course',
+    )
+
+    comments = defaultdict(int)
+    for (_, course_pk, day), total in announcement_comments.items():
+        comments[course_pk, day] += total
+
+    course_stats = [
+        CourseDailyStats(
+            course_id=course_pk,
+            day=day,
+            enrollments=enrollments.get((course_pk, day), 0),
+            active_students=active_students.get((course_pk, day), 0),
+            comments=comments.get((course_pk, day), 0),
+        )
+        for course_pk, day in enrollments.keys() | active_students.keys() | comments.keys()
+    ]
+    announcement_stats = [
+        AnnouncementDailyStats(announcement_id=announcement_pk, day=day, comments=total)
+        for (announcement_pk, _, day), total in announcement_comments.items()
+    ]
+
+    with transaction.atomic():
+        CourseDailyStats.objects.filter(day__range=(first_day, last_day)).delete()
+        AnnouncementDailyStats.objects.filter(day__range=(first_day, last_day)).delete()
+        CourseDailyStats.objects.bulk_create(course_stats, batch_size=500)
+        AnnouncementDailyStats.objects.bulk_create(announcement_stats, batch_size=500)
+    return len(course_stats)
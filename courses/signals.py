@@ -1,5 +1,10 @@
+from django.db import transaction
+
 from core.mail import send_mail_template
 
+from .events import get_broker
+from .utils import bump_comments_version, bump_course_version, bump_enrollments_version
+
 
 def post_save_announcement(sender, instance, created, **kwargs):
     """Sends an e-mail when an announcement is created on db.
@@ -7,6 +12,9 @@ def post_save_announcement(sender, instance, created, **kwargs):
     Sends an e-mail for each of the users with an enrollment on the
     course when an announcement of that course is created.
     """
+    # The dashboards show the unread announcements.
+    bump_course_version(instance.course_id)
+
     # Only send e-mail if a new record was created on db.
     if created:
         subject = f'[{instance.course}] {instance.title}'
@@ -22,4 +30,70 @@ def post_save_announcement(sender, instance, created, **kwargs):
                 'courses/announcement_email.html', 
                 context, 
                 recipient_list,
-            )
\ No newline at end of file
+            )
+
+
+def pre_save_material(sender, instance, **kwargs):
+    """Keeps the resource stored on db before the material is saved."""
+    instance._stored_resource = ''
+    if instance.pk:
+        instance._stored_resource = sender.objects.filter(
+            pk=instance.pk,
+        ).values_list('resource', flat=True).first() or ''
+
+
+def post_save_material(sender, instance, **kwargs):
+    """Updates the reference count of the blobs when a resource changes."""
+    from .models import MaterialBlob
+
+    old_name = getattr(instance, '_stored_resource', '')
+    new_name = instance.resource.name or ''
+    if old_name != new_name:
+        MaterialBlob.objects.add_reference(new_name)
+        MaterialBlob.objects.remove_reference(old_name)
+
+
+def post_delete_material(sender, instance, **kwargs):
+    """Releases the blob of a deleted material.
+
+    The file itself is removed later by the `collect_material_blobs`
+    command, since other materials may still use it.
+    """
+    from .models import MaterialBlob
+
+    MaterialBlob.objects.remove_reference(instance.resource.name)
+
+
+def _invalidate_comments(announcement_id):
+    bump_comments_version(announcement_id)
+    # Again after the commit, a page rendered before it has the old comments.
+    transaction.on_commit(lambda: bump_comments_version(announcement_id))
+
+
+def post_delete_comment(sender, instance, **kwargs):
+    """Invalidates the cached comments of the announcement of a comment."""
+    _invalidate_comments(instance.announcement_id)
+
+
+def post_save_comment(sender, instance, created, **kwargs):
+    """Wakes up the viewers waiting for new comments on the announcement."""
+    _invalidate_comments(instance.announcement_id)
+    if created:
+        channel = f'announcement-{instance.announcement_id}'
+        transaction.on_commit(lambda: get_broker().publish(channel))
+
+
+def post_save_enrollment(sender, instance, **kwargs):
+    """Invalidates the cached dashboard of the user of an enrollment."""
+    bump_enrollments_version(instance.user_id)
+
+
+def post_save_course(sender, instance, **kwargs):
+    """Invalidates the cached dashboards of the users enrolled on a course."""
+    bump_course_version(instance.pk)
+
+
+def post_delete_announcement(sender, instance, **kwargs):
+    """Invalidates the cached dashboards, they show the unread announcements."""
+    bump_course_version(instance.course_id)
+    bump_comments_version(instance.pk)
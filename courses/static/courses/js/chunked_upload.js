@@ -0,0 +1,139 @@
+/*
+ * Resumable upload, in chunks, of the resource of the materials on the
+ * lesson admin page. Big files chosen for a material that already exists
+ * are sent to the uploads URL given by the page (#material-uploads)
+ * instead of going in the form submission.
+ */
+(function () {
+  'use strict';
+
+  // Smaller files go in the form submission as usual.
+  var MIN_SIZE = 20 * 1024 * 1024;
+  // Bad checksums or out of sync offsets in a row before giving up.
+  var MAX_RETRIES = 5;
+
+  function csrfToken() {
+    var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? match[1] : '';
+  }
+
+  function request(method, url, body, headers) {
+    headers = headers || {};
+    headers['X-CSRFToken'] = csrfToken();
+    return fetch(url, {method: method, body: body, headers: headers, credentials: 'same-origin'})
+      .then(function (response) {
+        return response.json().then(function (data) {
+          data.status = response.status;
+          return data;
+        }, function () {
+          // Not JSON, ex: the login page after the session expired.
+          throw new Error('Unexpected response: ' + response.status);
+        });
+      });
+  }
+
+  function expect(status) {
+    return function (data) {
+      if (data.status !== status) {
+        throw new Error(data.error || 'Unexpected response: ' + data.status);
+      }
+      return data;
+    };
+  }
+
+  function sha256(buffer) {
+    return crypto.subtle.digest('SHA-256', buffer).then(function (digest) {
+      return Array.from(new Uint8Array(digest)).map(function (b) {
+        return ('0' + b.toString(16)).slice(-2);
+      }).join('');
+    });
+  }
+
+  function start(uploadsUrl, materialId, file) {
+    // Continues an upload interrupted before, if there is one.
+    var key = 'upload:' + materialId + ':' + file.name + ':' + file.size;
+    var uploadUrl = localStorage.getItem(key);
+    var state = uploadUrl ? request('GET', uploadUrl) : Promise.resolve({status: 404});
+
+    return state.then(function (data) {
+      if (data.status === 200) {
+        return data;
+      }
+      var form = new FormData();
+      form.append('material', materialId);
+      form.append('filename', file.name);
+      form.append('size', file.size);
+      return request('POST', uploadsUrl, form).then(expect(201)).then(function (data) {
+        localStorage.setItem(key, data.url);
+        return data;
+      });
+    }).then(function (data) {
+      data.key = key;
+      return data;
+    });
+  }
+
+  function sendChunks(upload, file, progress, retries) {
+    retries = retries || 0;
+    if (upload.offset >= upload.size) {
+      return request('POST', upload.complete_url).then(expect(200)).then(function (data) {
+        localStorage.removeItem(upload.key);
+        return data;
+      });
+    }
+    var end = Math.min(upload.offset + upload.chunk_size, upload.size);
+    var chunk = file.slice(upload.offset, end);
+    return chunk.arrayBuffer().then(function (buffer) {
+      return sha256(buffer).then(function (checksum) {
+        return request('PUT', upload.url, buffer, {
+          'Content-Range': 'bytes ' + upload.offset + '-' + (end - 1) + '/' + upload.size,
+          'X-Chunk-Sha256': checksum,
+        });
+      });
+    }).then(function (data) {
+      if (data.status === 200) {
+        retries = 0;
+      } else if ((data.status === 400 || data.status === 409) && data.offset !== undefined) {
+        // On a bad checksum or an out of sync offset, continues from the offset.
+        retries += 1;
+        if (retries > MAX_RETRIES) {
+          throw new Error(data.error || 'Too many retries.');
+        }
+      } else {
+        throw new Error(data.error || 'Unexpected response: ' + data.status);
+      }
+      upload.offset = data.offset;
+      progress(upload.offset, upload.size);
+      return sendChunks(upload, file, progress, retries);
+    });
+  }
+
+  document.addEventListener('change', function (event) {
+    var input = event.target;
+    if (!input.name || !/-resource$/.test(input.name) || !input.files.length) {
+      return;
+    }
+    var file = input.files[0];
+    var idInput = document.querySelector('input[name="' + input.name.replace(/-resource$/, '-id') + '"]');
+    var uploads = document.getElementById('material-uploads');
+    if (file.size < MIN_SIZE || !idInput || !idInput.value || !uploads) {
+      return;
+    }
+
+    var status = document.createElement('p');
+    input.parentNode.appendChild(status);
+    input.disabled = true;
+    start(uploads.dataset.url, idInput.value, file).then(function (upload) {
+      return sendChunks(upload, file, function (offset, size) {
+        status.textContent = 'Enviando: ' + Math.floor(offset * 100 / size) + '%';
+      });
+    }).then(function () {
+      status.textContent = 'Arquivo enviado.';
+      input.value = '';
+    }).catch(function () {
+      status.textContent = 'Falha no envio, escolha o arquivo novamente para continuar.';
+    }).then(function () {
+      input.disabled = false;
+    });
+  });
+})();
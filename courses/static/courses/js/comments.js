@@ -0,0 +1,54 @@
+/*
+ * Loads older or newer comments of an announcement without reloading the
+ * page, see views.announcement_comments and views.announcement_events.
+ */
+(function () {
+  'use strict';
+
+  var list = document.getElementById('comment-list');
+  var newerLink = document.querySelector('.load-comments[data-direction="newer"]');
+
+  function appendNewer(html, cursor) {
+    if (document.getElementById('no-comments')) {
+      list.innerHTML = '';
+    }
+    list.insertAdjacentHTML('beforeend', html);
+    newerLink.dataset.url = newerLink.dataset.url.split('?')[0] + '?depois=' + encodeURIComponent(cursor);
+  }
+
+  // Live updates, see views.announcement_events, only when enabled by
+  // COMMENT_EVENTS_ENABLED. Otherwise the link loads the new comments.
+  if (window.EventSource && list.dataset.eventsUrl) {
+    var events = new EventSource(list.dataset.eventsUrl);
+    // The new comments arrive by themselves.
+    newerLink.parentNode.style.display = 'none';
+    events.addEventListener('comments', function (event) {
+      appendNewer(JSON.parse(event.data).html, event.lastEventId);
+    });
+  }
+
+  document.addEventListener('click', function (event) {
+    var link = event.target.closest('.load-comments');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+
+    var older = link.dataset.direction === 'older';
+    fetch(link.dataset.url, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        if (!older) {
+          if (data.count) {
+            appendNewer(data.html, data.cursor);
+          }
+          return;
+        }
+        list.insertAdjacentHTML('afterbegin', data.html);
+        link.dataset.url = link.dataset.url.split('?')[0] + '?antes=' + encodeURIComponent(data.cursor);
+        if (!data.has_more) {
+          link.parentNode.style.display = 'none';
+        }
+      });
+  });
+})();
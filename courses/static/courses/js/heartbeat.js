@@ -0,0 +1,52 @@
+/*
+ * Sends the position of the viewer on the video every few seconds while
+ * it plays, and when the page is left, see views.material_heartbeat.
+ * Uses the YouTube IFrame API.
+ */
+(function () {
+  'use strict';
+
+  var frame = document.getElementById('video');
+  var csrf = document.getElementById('heartbeat-csrf').value;
+  var interval = parseInt(frame.dataset.heartbeatInterval, 10) * 1000;
+  var player = null;
+  var timer = null;
+  var lastSent = null;
+
+  function send(beacon) {
+    var position = Math.floor(player.getCurrentTime());
+    if (position === lastSent) {
+      return;
+    }
+    lastSent = position;
+    var data = new FormData();
+    data.append('posicao', position);
+    data.append('csrfmiddlewaretoken', csrf);
+    if (beacon && navigator.sendBeacon) {
+      navigator.sendBeacon(frame.dataset.heartbeatUrl, data);
+    } else {
+      fetch(frame.dataset.heartbeatUrl, {method: 'POST', body: data, credentials: 'same-origin'});
+    }
+  }
+
+  function onStateChange(event) {
+    clearInterval(timer);
+    timer = null;
+    if (event.data === YT.PlayerState.PLAYING) {
+      timer = setInterval(send, interval);
+    } else if (event.data === YT.PlayerState.PAUSED || event.data === YT.PlayerState.ENDED) {
+      send();
+    }
+  }
+
+  // Called by the IFrame API when it's loaded.
+  window.onYouTubeIframeAPIReady = function () {
+    player = new YT.Player(frame, {events: {onStateChange: onStateChange}});
+  };
+
+  window.addEventListener('pagehide', function () {
+    if (player && player.getCurrentTime) {
+      send(true);
+    }
+  });
+})();
@@ -0,0 +1,97 @@
+"""Storage backends for the courses app.
+
+Example:
+    from courses.storage import material_storage
+"""
+
+import os
+import hashlib
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'courses/blobs/'
+UPLOAD_PREFIX = 'courses/uploads/'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """A file system storage that saves each distinct content only once.
+
+    The name of a saved file is the SHA-256 of its content, sharded in two
+    levels of directories, ex: courses/blobs/ab/cd/abcd...ef.mp4. Saving a
+    content that already exists just returns the existing name, nothing is
+    written to the disk, but the existing file is touched: its mtime tells
+    `collect_material_blobs` that it was just taken again. Only the
+    extension of the requested name is kept.
+
+    Files are never deleted when a model is deleted, the references to each
+    blob are counted by `courses.models.MaterialBlob` and the unreferenced
+    ones are removed by the `collect_material_blobs` command.
+    """
+    hash_block_size = 64 * 1024
+
+    def blob_name(self, digest, ext):
+        return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def get_available_name(self, name, max_length=None):
+        # The final name only depends on the content, it's set by _save().
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        hasher = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Big uploads are already on disk, hash them and move if needed.
+            content.seek(0)
+            for block in iter(lambda: content.read(self.hash_block_size), b''):
+                hasher.update(block)
+            name = self.blob_name(hasher.hexdigest(), ext)
+            if not self._touch(name):
+                self._make_parent(name)
+                file_move_safe(content.temporary_file_path(), self.path(name))
+                self._set_permissions(name)
+            return name
+
+        # Otherwise hash while writing to a temporary file next to the blobs.
+        tmp_dir = self.path(f'{BLOB_PREFIX}tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+            name = self.blob_name(hasher.hexdigest(), ext)
+            if self._touch(name):
+                os.remove(tmp_path)
+            else:
+                self._make_parent(name)
+                os.replace(tmp_path, self.path(name))
+                self._set_permissions(name)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def _touch(self, name):
+        """Sets the mtime of the blob `name` to now, False if it doesn't exist."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _make_parent(self, name):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+
+    def _set_permissions(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+
+material_storage = ContentAddressedStorage()
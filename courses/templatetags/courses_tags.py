@@ -1,14 +1,82 @@
 from django import template
+from django.templatetags.static import static
+from django.utils.functional import SimpleLazyObject
 
 from courses.models import Enrollment
+from courses.utils import get_enrollments_version
 
 register = template.Library()
 
 
-@register.simple_tag
-def load_enrollments(user):
-    """Loads the enrollments of a user.
+def get_enrollments(user):
+    """Returns the approved enrollments of a user, with their courses.
+
+    Only the columns shown on the dashboard are loaded, plus the count
+    of unread announcements.
+    """
+    return list(
+        Enrollment.objects
+        .with_unread_announcements()
+        .filter(user=user, status=Enrollment.EnrollmentStatus.APROVADO)
+        .select_related('course')
+        .only('course__name', 'course__slug', 'course__description', 'course__start_date')
+        .order_by('course__name')
+    )
+
+
+@register.simple_tag(takes_context=True)
+def load_enrollments(context, user):
+    """Loads the approved enrollments of a user.
     
+    They are loaded once per request, the menu, the panel and the course
+    pages extending the dashboard share them. Nothing is queried until
+    they are used, so cached fragments cost no query.
+
     Usage: {% load_enrollments user as var %}{{ var }}
     """
-    return Enrollment.objects.filter(user=user)
\ No newline at end of file
+    request = context.get('request')
+    if request is None or request.user != user:
+        return SimpleLazyObject(lambda: get_enrollments(user))
+    if not hasattr(request, '_enrollments'):
+        request._enrollments = SimpleLazyObject(lambda: get_enrollments(user))
+    return request._enrollments
+
+
+@register.simple_tag
+def enrollments_version(user):
+    """Returns the version of the enrollments of a user, for cache keys.
+
+    Usage: {% enrollments_version user as var %}{% cache 600 name user.pk var %}
+    """
+    return get_enrollments_version(user.pk)
+
+
+@register.inclusion_tag('courses/course_image.html')
+def course_image(course, sizes='(max-width: 767px) 100vw, 400px'):
+    """Renders the image of a course with srcset and lazy loading.
+
+    Only reads the variants saved with the course, no image is opened.
+
+    Usage: {% course_image course %}
+    """
+    context = {'course': course, 'sizes': sizes}
+    variants = course.image_variants
+    if not course.image:
+        context['src'] = static('images/course-image.png')
+    elif not variants:
+        # Image uploaded before the variants existed.
+        context['src'] = course.image.url
+    else:
+        storage = course.image.storage
+        srcsets = {
+            ext: ', '.join(f'{storage.url(name)} {width}w' for width, name in variants[ext])
+            for ext in ('webp', 'jpg')
+        }
+        context.update({
+            'src': storage.url(variants['jpg'][-1][1]),
+            'webp_srcset': srcsets['webp'],
+            'jpg_srcset': srcsets['jpg'],
+            'width': variants['width'],
+            'height': variants['height'],
+        })
+    return context
\ No newline at end of file
@@ -0,0 +1,126 @@
+import time
+import atexit
+from unittest import mock
+from datetime import date, timedelta
+
+from django.utils import timezone
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+
+from model_bakery import baker
+
+from courses import activity, heartbeats
+from courses.activity import ActivityBuffer
+from courses.models import Activity
+
+
+class ActivityBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(get_user_model())
+        cls.course = baker.make('courses.Course')
+
+    def event(self):
+        return (Activity.Kind.AULA, self.user.pk, self.course.pk, None, None, timezone.now())
+
+    def test_full_buffer_drops_the_oldest_events(self):
+        buffer = ActivityBuffer(max_size=3)
+        events = [self.event() for _ in range(5)]
+        for event in events:
+            buffer.append(event)
+        self.assertListEqual(list(buffer.events), events[2:])
+        self.assertEqual(buffer.dropped, 2)
+
+        with self.assertLogs('courses.activity', 'WARNING') as logs:
+            self.assertEqual(buffer.flush(), 3)
+        self.assertIn('2 events dropped', logs.output[0])
+        self.assertEqual(buffer.dropped, 0)
+        self.assertEqual(Activity.objects.count(), 3)
+
+    def test_flush_in_batches(self):
+        buffer = ActivityBuffer(batch_size=2)
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(5):
+                buffer.append(self.event())
+        self.assertEqual(len(context.captured_queries), 0)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertEqual(Activity.objects.count(), 5)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_batches_are_dropped(self):
+        buffer = ActivityBuffer(batch_size=2)
+        for _ in range(5):
+            buffer.append(self.event())
+        with mock.patch.object(Activity.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertLogs('courses.activity', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+        # The failed batch is lost, the db is down so the rest waits.
+        self.assertEqual(len(buffer.events), 3)
+        self.assertEqual(buffer.flush(), 3)
+
+
+class ActivityBufferThreadTests(TransactionTestCase):
+
+    def test_thread_inserts_a_full_batch(self):
+        user = baker.make(get_user_model())
+        course = baker.make('courses.Course')
+        # The interval never ends during the test, a full batch wakes it up.
+        buffer = ActivityBuffer(batch_size=2, flush_interval=60)
+        for _ in range(2):
+            buffer.append((Activity.Kind.AULA, user.pk, course.pk, None, None, timezone.now()))
+        self.assertEqual(buffer.thread.name, 'activity-flush')
+
+        for _ in range(100):
+            if Activity.objects.count() == 2:
+                break
+            time.sleep(0.05)
+        self.assertEqual(Activity.objects.count(), 2)
+        self.assertFalse(buffer.events)
+
+
+@override_settings(ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None)
+class ActivityLogViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', slug='curso-de-teste')
+        cls.lesson = baker.make('courses.Lesson', course=cls.course, release_date=date.today() - timedelta(days=1))
+        cls.material = baker.make('courses.Material', url='https://www.youtube.com/embed/Mp0vhMDI7fA', lesson=cls.lesson)
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+        self.client.login(username='user', password='123')
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
+    def test_views_are_logged(self):
+        self.client.get(self.lesson.get_absolute_url())
+        self.client.get(self.material.get_absolute_url())
+        self.assertFalse(Activity.objects.exists())
+
+        self.assertIsNone(activity.get_activity_buffer().thread)
+        activity.get_activity_buffer().flush()
+        self.assertListEqual(
+            list(Activity.objects.order_by('pk').values_list('kind', 'user', 'course', 'lesson', 'material')),
+            [
+                (Activity.Kind.AULA, self.user.pk, self.course.pk, self.lesson.pk, None),
+                (Activity.Kind.MATERIAL, self.user.pk, self.course.pk, self.lesson.pk, self.material.pk),
+            ],
+        )
+
+    @override_settings(ACTIVITY_LOG_FLUSH_INTERVAL=5)
+    def test_buffer_flushed_at_exit(self):
+        with mock.patch.object(atexit, 'register') as register:
+            buffer = activity.get_activity_buffer()
+        self.assertEqual(buffer.flush_interval, 5)
+        register.assert_called_once_with(buffer.flush)
@@ -0,0 +1,114 @@
+import json
+import asyncio
+
+from django.urls import reverse
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from model_bakery import baker
+
+from courses.events import CacheBroker, LocalBroker
+
+
+class LocalBrokerTests(SimpleTestCase):
+
+    def test_publish_wakes_up_subscribers(self):
+        broker = LocalBroker()
+
+        async def wait():
+            subscription = broker.subscribe('canal')
+            asyncio.get_running_loop().call_later(0.01, broker.publish, 'canal')
+            try:
+                return await subscription.wait(1)
+            finally:
+                subscription.close()
+
+        self.assertTrue(asyncio.run(wait()))
+        self.assertEqual(dict(broker.subscriptions), {})
+
+    def test_wait_timeout(self):
+        broker = LocalBroker()
+
+        async def wait():
+            subscription = broker.subscribe('canal')
+            broker.publish('outro-canal')
+            return await subscription.wait(0.01)
+
+        self.assertFalse(asyncio.run(wait()))
+
+
+class CacheBrokerTests(SimpleTestCase):
+
+    def test_publish_changes_the_version(self):
+        broker = CacheBroker()
+        broker.poll_interval = 0.01
+
+        async def wait():
+            subscription = broker.subscribe('canal')
+            broker.publish('canal')
+            return await subscription.wait(1)
+
+        self.assertTrue(asyncio.run(wait()))
+
+
+@override_settings(COMMENT_EVENTS_ENABLED=True, COMMENT_EVENTS_TIMEOUT=0.05)
+class AnnouncementEventsViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', slug='curso-de-teste')
+        cls.announcement = baker.make('courses.Announcement', course=cls.course)
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+        cls.url = reverse('courses:announcement_events', args=(cls.course.pk, cls.course.slug, cls.announcement.pk))
+
+    def setUp(self):
+        cache.clear()
+
+    def cursor(self):
+        response = self.client.get(self.announcement.get_absolute_url())
+        return response.context['newer_cursor']
+
+    def test_page_has_the_events_url(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.announcement.get_absolute_url())
+        self.assertContains(response, f'data-events-url="{self.url}?depois=')
+        self.assertContains(response, 'Carregar novos comentários')
+
+    @override_settings(COMMENT_EVENTS_ENABLED=False)
+    def test_disabled(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.announcement.get_absolute_url())
+        self.assertNotContains(response, 'data-events-url')
+        self.assertContains(response, 'Carregar novos comentários')
+        self.assertEqual(self.client.get(self.url, {'depois': self.cursor()}).status_code, 404)
+
+    def test_view_forbidden_without_enrollment(self):
+        get_user_model().objects.create_user(username='other', email='other@teste.com', password='123')
+        self.client.login(username='other', password='123')
+        response = self.client.get(self.url, {'depois': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_view_no_new_comments(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url, {'depois': self.cursor()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response.content.decode(), 'retry: 500\n\n: sem novidades\n\n')
+
+    def test_view_new_comments(self):
+        self.client.login(username='user', password='123')
+        cursor = self.cursor()
+        baker.make('courses.Comment', announcement=self.announcement, content='Comentário novo')
+        response = self.client.get(self.url, {'depois': cursor})
+        content = response.content.decode()
+        self.assertIn('event: comments', content)
+        data = json.loads(content.split('data: ')[1].split('\n')[0])
+        self.assertEqual(data['count'], 1)
+        self.assertIn('Comentário novo', data['html'])
+
+        # The browser reconnects with the id of the last event.
+        last_event_id = content.split('id: ')[1].split('\n')[0]
+        response = self.client.get(self.url, {'depois': cursor}, HTTP_LAST_EVENT_ID=last_event_id)
+        self.assertNotIn('event: comments', response.content.decode())
@@ -0,0 +1,122 @@
+from unittest import mock
+from datetime import date, timedelta
+
+from django.urls import reverse
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+
+from model_bakery import baker
+
+from courses import activity, heartbeats
+from courses.heartbeats import HeartbeatBuffer
+from courses.models import WatchPosition
+
+
+class HeartbeatBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = baker.make(get_user_model(), _quantity=3)
+        cls.material = baker.make('courses.Material')
+
+    def test_keeps_only_the_latest_position(self):
+        buffer = HeartbeatBuffer()
+        with CaptureQueriesContext(connection) as context:
+            for position in range(100):
+                buffer.add(self.users[0].pk, self.material.pk, position)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(buffer.get(self.users[0].pk, self.material.pk), 99)
+        self.assertIsNone(buffer.get(self.users[1].pk, self.material.pk))
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(WatchPosition.objects.get().position, 99)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_flush_creates_and_updates(self):
+        WatchPosition.objects.create(user=self.users[0], material=self.material, position=10)
+        buffer = HeartbeatBuffer()
+        for user in self.users:
+            buffer.add(user.pk, self.material.pk, 30)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(buffer.flush(), 3)
+        # Select, update and insert, whatever the number of viewers.
+        queries = [query['sql'] for query in context.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(queries), 3)
+        self.assertListEqual(
+            list(WatchPosition.objects.values_list('position', flat=True)),
+            [30, 30, 30],
+        )
+
+    def test_flush_by_size(self):
+        buffer = HeartbeatBuffer(flush_size=2)
+        buffer.add(self.users[0].pk, self.material.pk, 1)
+        buffer.add(self.users[0].pk, self.material.pk, 2)
+        self.assertFalse(WatchPosition.objects.exists())
+        buffer.add(self.users[1].pk, self.material.pk, 3)
+        self.assertEqual(WatchPosition.objects.count(), 2)
+        self.assertDictEqual(buffer.positions, {})
+
+    def test_failed_flush_keeps_the_positions(self):
+        buffer = HeartbeatBuffer()
+        buffer.add(self.users[0].pk, self.material.pk, 1)
+        with mock.patch.object(WatchPosition.objects, 'save_positions', side_effect=DatabaseError):
+            with self.assertLogs('courses.heartbeats', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.get(self.users[0].pk, self.material.pk), 1)
+        self.assertEqual(buffer.flush(), 1)
+
+
+@override_settings(ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None)
+class MaterialHeartbeatViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', slug='curso-de-teste')
+        lesson = baker.make('courses.Lesson', course=cls.course, release_date=date.today() - timedelta(days=1))
+        cls.material = baker.make('courses.Material', url='https://www.youtube.com/embed/Mp0vhMDI7fA', lesson=lesson)
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+        cls.url = reverse('courses:material_heartbeat', args=(cls.course.pk, cls.course.slug, cls.material.pk))
+
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+        self.client.login(username='user', password='123')
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
+    def test_heartbeat_is_buffered(self):
+        for position in (5, 10, 15):
+            response = self.client.post(self.url, {'posicao': position})
+            self.assertEqual(response.status_code, 204)
+        self.assertFalse(WatchPosition.objects.exists())
+
+        heartbeats.get_heartbeat_buffer().flush()
+        watch = WatchPosition.objects.get()
+        self.assertEqual((watch.user, watch.material, watch.position), (self.user, self.material, 15))
+
+    def test_invalid_position(self):
+        for data in ({}, {'posicao': 'x'}, {'posicao': -1}):
+            response = self.client.post(self.url, data)
+            self.assertEqual(response.status_code, 400)
+
+    def test_material_of_another_course(self):
+        material = baker.make('courses.Material')
+        url = reverse('courses:material_heartbeat', args=(self.course.pk, self.course.slug, material.pk))
+        response = self.client.post(url, {'posicao': 1})
+        self.assertEqual(response.status_code, 404)
+
+    def test_video_resumes(self):
+        details = self.material.get_absolute_url()
+        self.assertContains(self.client.get(details), 'enablejsapi=1&amp;start=0')
+
+        WatchPosition.objects.create(user=self.user, material=self.material, position=42.7)
+        self.assertContains(self.client.get(details), 'start=42')
+
+        # A position not flushed yet is newer.
+        self.client.post(self.url, {'posicao': 50})
+        self.assertContains(self.client.get(details), 'start=50')
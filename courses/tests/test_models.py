@@ -1,10 +1,20 @@
+import io
+import shutil
+import tempfile
 from datetime import date, timedelta
 
-from django.test import TestCase
+from PIL import Image
+from django.conf import settings
+from django.db import connection
+from django.template import Context, Template
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
 
 from model_bakery import baker
 
-from courses.models import Course
+from courses.models import Course, Enrollment
 
 
 class CourseModelTests(TestCase):
@@ -43,7 +53,7 @@ class CourseModelTests(TestCase):
         self.assertTrue(self.fields['image'].null)
         self.assertEqual(
             self.fields['image'].help_text, 
-            'Use uma imagem com as dimensões 400 x 250.',
+            'Qualquer tamanho é aceito, a imagem é recortada na proporção 400 x 250.',
         )
     
     def test_created_at_field(self):
@@ -116,6 +126,12 @@ class LessonModelTests(TestCase):
         self.assertEqual(self.fields['description'].verbose_name, 'Descrição')
         self.assertTrue(self.fields['description'].blank)
     
+    def test_description_rendered_on_save(self):
+        lesson = baker.make('courses.Lesson', description='Linha 1\nLinha 2 ' + 'a' * 200)
+        self.assertTrue(lesson.description_html.startswith('<p>Linha 1<br>Linha 2 '))
+        self.assertTrue(lesson.excerpt.endswith('...</p>'))
+        self.assertNotIn('a' * 150, lesson.excerpt)
+    
     def test_order_field(self):
         self.assertEqual(self.fields['order'].verbose_name, 'Ordem')
         self.assertEqual(self.fields['order'].help_text, 'Ordem de liberação da aula, começando do 1.')
@@ -270,6 +286,142 @@ class EnrollmentModelTests(TestCase):
         self.assertTrue(enrollment.is_approved())
 
 
+class EnrollmentReadAnnouncementsTests(TestCase):
+
+    def setUp(self):
+        self.course = baker.make('courses.Course', slug='curso-de-teste')
+        self.enrollment = baker.make('courses.Enrollment', course=self.course, status=1)
+        self.announcements = baker.make('courses.Announcement', course=self.course, _quantity=4)
+
+    def reload(self):
+        return Enrollment.objects.get(pk=self.enrollment.pk)
+
+    def test_nothing_read(self):
+        self.assertEqual(self.enrollment.unread_announcements().count(), 4)
+        self.assertFalse(self.enrollment.has_read(self.announcements[0]))
+
+    def test_mark_announcement_read(self):
+        with CaptureQueriesContext(connection) as context:
+            self.enrollment.mark_announcement_read(self.announcements[2])
+        self.assertEqual(len(context.captured_queries), 1)
+
+        enrollment = self.reload()
+        self.assertTrue(enrollment.has_read(self.announcements[2]))
+        self.assertFalse(enrollment.has_read(self.announcements[1]))
+        self.assertEqual(enrollment.unread_announcements().count(), 3)
+
+        # Already read, nothing is written.
+        with CaptureQueriesContext(connection) as context:
+            enrollment.mark_announcement_read(self.announcements[2])
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(self.reload().announcements_read_ids, enrollment.announcements_read_ids)
+
+    def test_compaction(self):
+        self.enrollment.read_ids_limit = 1
+        self.enrollment.mark_announcement_read(self.announcements[0])
+        self.enrollment.mark_announcement_read(self.announcements[1])
+        self.enrollment.mark_announcement_read(self.announcements[3])
+
+        # The mark moves past the unread 3rd, which is kept as an exception.
+        enrollment = self.reload()
+        self.assertEqual(enrollment.announcements_read_at, self.announcements[3].created_at)
+        self.assertSetEqual(enrollment.read_announcement_ids(), set())
+        self.assertSetEqual(enrollment.unread_announcement_ids(), {self.announcements[2].pk})
+        self.assertFalse(enrollment.has_read(self.announcements[2]))
+        self.assertListEqual(
+            list(enrollment.unread_announcements()),
+            [self.announcements[2]],
+        )
+
+        # Reading it removes the exception with a single UPDATE.
+        with CaptureQueriesContext(connection) as context:
+            enrollment.mark_announcement_read(self.announcements[2])
+        self.assertEqual(len(context.captured_queries), 1)
+        enrollment = self.reload()
+        self.assertTrue(enrollment.has_read(self.announcements[2]))
+        self.assertSetEqual(enrollment.unread_announcement_ids(), set())
+        self.assertFalse(enrollment.unread_announcements().exists())
+
+    def test_compaction_keeps_the_newest_unread(self):
+        self.enrollment.read_ids_limit = 0
+        self.enrollment.unread_ids_limit = 2
+        self.enrollment.mark_announcement_read(self.announcements[3])
+
+        # The oldest unread one is dropped, it counts as read.
+        enrollment = self.reload()
+        self.assertSetEqual(
+            enrollment.unread_announcement_ids(),
+            {self.announcements[1].pk, self.announcements[2].pk},
+        )
+        self.assertTrue(enrollment.has_read(self.announcements[0]))
+        self.assertEqual(enrollment.unread_announcements().count(), 2)
+
+    def test_with_unread_announcements(self):
+        other = baker.make('courses.Enrollment', user=self.enrollment.user, status=1)
+        baker.make('courses.Announcement', course=other.course)
+        self.enrollment.mark_announcement_read(self.announcements[0])
+        self.enrollment.read_ids_limit = 1
+        self.enrollment.mark_announcement_read(self.announcements[1])
+        # The 3rd is left unread below the mark.
+        self.enrollment.mark_announcement_read(self.announcements[3])
+
+        with CaptureQueriesContext(connection) as context:
+            counts = dict(
+                Enrollment.objects
+                .with_unread_announcements()
+                .filter(user=self.enrollment.user)
+                .values_list('pk', 'unread_announcements')
+            )
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertDictEqual(counts, {self.enrollment.pk: 1, other.pk: 1})
+
+
+class EnrollmentLessonProgressTests(TestCase):
+
+    def setUp(self):
+        self.course = baker.make('courses.Course', slug='curso-de-teste')
+        self.lessons = [baker.make('courses.Lesson', course=self.course, order=order) for order in (1, 2, 9, 70)]
+        self.enrollment = baker.make('courses.Enrollment', course=self.course, status=1)
+
+    def test_mark_lesson_viewed(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(self.enrollment.mark_lesson_viewed(self.lessons[2]))
+        self.assertEqual(len(context.captured_queries), 1)
+
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertEqual(bytes(enrollment.lessons_viewed), b'\x00\x01')
+        self.assertTrue(enrollment.has_viewed(self.lessons[2]))
+        self.assertFalse(enrollment.has_viewed(self.lessons[0]))
+        self.assertFalse(enrollment.has_done(self.lessons[2]))
+
+        # Already set, nothing is written.
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(enrollment.mark_lesson_viewed(self.lessons[2]))
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_concurrent_updates_are_kept(self):
+        stale = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.enrollment.mark_lesson_done(self.lessons[0])
+        stale.mark_lesson_done(self.lessons[3])
+
+        enrollment = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.assertTrue(enrollment.has_done(self.lessons[0]))
+        self.assertTrue(enrollment.has_done(self.lessons[3]))
+        self.assertTrue(enrollment.has_viewed(self.lessons[3]))
+
+    def test_progress(self):
+        orders = [lesson.order for lesson in self.lessons]
+        self.assertEqual(self.enrollment.progress(orders), 0)
+        self.assertEqual(self.enrollment.progress([]), 0)
+        self.enrollment.mark_lesson_done(self.lessons[1])
+        self.enrollment.mark_lesson_viewed(self.lessons[0])
+        self.assertEqual(self.enrollment.progress(orders), 25)
+        self.enrollment.mark_lesson_done(self.lessons[3])
+        self.assertEqual(self.enrollment.progress(orders), 50)
+        # Lessons done that were deleted don't count.
+        self.assertEqual(self.enrollment.progress([1, 2]), 50)
+
+
 class AnnouncementModelTests(TestCase):
 
     @classmethod
@@ -310,6 +462,31 @@ class AnnouncementModelTests(TestCase):
         expected = '/cursos/1/curso-de-teste/anuncios/1/'
         self.assertURLEqual(self.announcement.get_absolute_url(), expected)
 
+    def test_comments_change_the_cache_key(self):
+        announcement = baker.make('courses.Announcement')
+        key = announcement.comments_cache_key('latest')
+        announcement.save()
+        self.assertEqual(announcement.comments_cache_key('latest'), key)
+
+        comment = baker.make('courses.Comment', announcement=announcement)
+        self.assertNotEqual(announcement.comments_cache_key('latest'), key)
+        key = announcement.comments_cache_key('latest')
+        comment.delete()
+        self.assertNotEqual(announcement.comments_cache_key('latest'), key)
+
+    def test_content_rendered_on_save(self):
+        announcement = baker.make('courses.Announcement', content='<b>Olá</b>\n\nMundo')
+        self.assertEqual(announcement.content_html, '<p>&lt;b&gt;Olá&lt;/b&gt;</p>\n\n<p>Mundo</p>')
+
+    def test_excerpt(self):
+        announcement = baker.make('courses.Announcement', content='a' * 300)
+        self.assertTrue(announcement.excerpt.startswith('<p>' + 'a' * 190))
+        self.assertTrue(announcement.excerpt.endswith('...</p>'))
+        self.assertNotIn('a' * 200, announcement.excerpt)
+        announcement.content = 'Curto'
+        announcement.save()
+        self.assertEqual(announcement.excerpt, '<p>Curto</p>')
+
 
 class CommentModelTests(TestCase):
 
@@ -349,4 +526,65 @@ class CommentModelTests(TestCase):
     
     def test_get_absolute_url_is_correct(self):
         expected = '/cursos/1/curso-de-teste/anuncios/1/editar-comentario/1/'
-        self.assertURLEqual(self.comment.get_absolute_url(), expected)
\ No newline at end of file
+        self.assertURLEqual(self.comment.get_absolute_url(), expected)
+
+
+def make_image(width, height, name='curso.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CourseImageVariantsTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_variants_generated_on_upload(self):
+        course = baker.make('courses.Course', image=make_image(1200, 900))
+        variants = course.image_variants
+        self.assertEqual((variants['width'], variants['height']), (800, 500))
+        self.assertEqual([width for width, _ in variants['webp']], [200, 400, 800])
+
+        # The variants are cropped to the 400 x 250 proportion.
+        with course.image.storage.open(variants['jpg'][1][1]) as f:
+            self.assertEqual(Image.open(f).size, (400, 250))
+        with course.image.storage.open(variants['webp'][0][1]) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+
+    def test_variants_never_upscale(self):
+        course = baker.make('courses.Course', image=make_image(500, 300))
+        self.assertEqual([width for width, _ in course.image_variants['jpg']], [200, 400])
+
+    def test_variants_not_regenerated_on_save(self):
+        course = baker.make('courses.Course', image=make_image(400, 250))
+        variants = course.image_variants
+        course.name = 'Outro nome'
+        course.save()
+        self.assertEqual(course.image_variants, variants)
+
+    def test_variants_removed_with_image(self):
+        course = baker.make('courses.Course', image=make_image(400, 250))
+        name = course.image_variants['jpg'][0][1]
+        course.image = None
+        course.save()
+        self.assertEqual(course.image_variants, {})
+        self.assertFalse(course.image.storage.exists(name))
+
+    def test_course_image_tag(self):
+        course = baker.make('courses.Course', image=make_image(400, 250))
+        html = Template('{% load courses_tags %}{% course_image course %}').render(Context({'course': course}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('-200.jpg 200w', html)
+        self.assertIn('-400.webp 400w', html)
+    
+    def test_generate_course_image_variants_command(self):
+        course = baker.make('courses.Course', image=make_image(400, 250))
+        Course.objects.filter(pk=course.pk).update(image_variants={})
+        call_command('generate_course_image_variants', stdout=io.StringIO())
+        course.refresh_from_db()
+        self.assertEqual(course.image_variants['width'], 400)
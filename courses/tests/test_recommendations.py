@@ -0,0 +1,77 @@
+import io
+from unittest import mock, skipIf
+
+from django.test import TestCase, SimpleTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+
+from model_bakery import baker
+
+from courses import recommendations
+from courses.models import Course, CourseRecommendation
+from courses.recommendations import course_neighbours
+
+# Users 1 and 2 took the courses 10 and 20, user 3 took 10 and 30.
+PAIRS = [(1, 10), (1, 20), (2, 10), (2, 20), (3, 10), (3, 30), (4, 40)]
+
+
+class CourseNeighboursTests(SimpleTestCase):
+
+    def assertNeighbours(self, neighbours):
+        self.assertEqual(set(neighbours), {10, 20, 30})
+        # 2 of the 3 students of 10 took 20: 2 / sqrt(3 * 2).
+        (first, first_score), (second, second_score) = neighbours[10]
+        self.assertEqual((first, second), (20, 30))
+        self.assertAlmostEqual(first_score, 2 / 6 ** 0.5)
+        self.assertAlmostEqual(second_score, 1 / 3 ** 0.5)
+        self.assertEqual([pk for pk, _ in neighbours[20]], [10])
+
+    def test_python(self):
+        with mock.patch.object(recommendations, 'np', None):
+            neighbours = course_neighbours(PAIRS, top_k=2)
+        self.assertNeighbours(dict(sorted(neighbours.items())))
+
+    @skipIf(recommendations.np is None, 'NumPy and SciPy of the requirements are not installed.')
+    def test_sparse(self):
+        # The pairs come from a queryset iterator.
+        neighbours = course_neighbours(iter(PAIRS), top_k=2)
+        self.assertNeighbours(dict(sorted(neighbours.items())))
+
+    def test_top_k(self):
+        with mock.patch.object(recommendations, 'np', None):
+            neighbours = course_neighbours(PAIRS, top_k=1)
+        self.assertEqual([pk for pk, _ in neighbours[10]], [20])
+
+    def test_no_enrollments(self):
+        self.assertDictEqual(course_neighbours([], top_k=2), {})
+
+
+class BuildRecommendationsCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = baker.make(Course, _quantity=3)
+        users = baker.make(get_user_model(), _quantity=3)
+        for user in users:
+            baker.make('courses.Enrollment', user=user, course=cls.courses[0], status=1)
+        baker.make('courses.Enrollment', user=users[0], course=cls.courses[1], status=1)
+        # Pending enrollments are ignored.
+        baker.make('courses.Enrollment', user=users[1], course=cls.courses[2], status=0)
+
+    def test_command_replaces_the_recommendations(self):
+        baker.make(CourseRecommendation, course=self.courses[2], recommended=self.courses[0], rank=1, score=1)
+        call_command('build_recommendations', stdout=io.StringIO())
+        self.assertSetEqual(
+            set(CourseRecommendation.objects.values_list('course', 'recommended', 'rank')),
+            {(self.courses[0].pk, self.courses[1].pk, 1), (self.courses[1].pk, self.courses[0].pk, 1)},
+        )
+        self.assertListEqual(list(Course.objects.recommended_for(self.courses[1])), [self.courses[0]])
+
+    def test_command_invalid_top(self):
+        baker.make(CourseRecommendation, course=self.courses[2], recommended=self.courses[0], rank=1, score=1)
+        for top in (0, -1):
+            with self.assertRaisesMessage(CommandError, '--top deve ser ao menos 1.'):
+                call_command('build_recommendations', top=top, stdout=io.StringIO())
+        # The stored recommendations are kept.
+        self.assertEqual(CourseRecommendation.objects.count(), 1)
@@ -0,0 +1,127 @@
+import io
+from datetime import datetime, timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from django.db import connection
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+
+from model_bakery import baker
+
+from courses.models import Activity, AnnouncementDailyStats, CourseDailyStats, Enrollment, Comment
+from courses.rollups import rollup_days
+
+
+class RollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.yesterday = cls.today - timedelta(days=1)
+        cls.course = baker.make('courses.Course')
+        cls.other_course = baker.make('courses.Course')
+        cls.announcement = baker.make('courses.Announcement', course=cls.course)
+        cls.users = baker.make(get_user_model(), _quantity=3)
+
+        for user in cls.users:
+            cls.make(Enrollment, cls.yesterday, course=cls.course, user=user)
+        cls.make(Enrollment, cls.today, course=cls.other_course, user=cls.users[0])
+        for user in (cls.users[0], cls.users[0], cls.users[1]):
+            cls.make(Activity, cls.yesterday, kind=Activity.Kind.AULA, course=cls.course, user=user)
+        cls.make(Comment, cls.yesterday, announcement=cls.announcement, user=cls.users[0])
+        cls.make(Comment, cls.today, announcement=cls.announcement, user=cls.users[1])
+
+    @classmethod
+    def make(cls, model, day, **kwargs):
+        obj = baker.make(model, **kwargs)
+        # Noon of the local day, created_at is set on save.
+        created_at = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=12))
+        model.objects.filter(pk=obj.pk).update(created_at=created_at)
+        return obj
+
+    def stats(self):
+        return set(CourseDailyStats.objects.values_list(
+            'course', 'day', 'enrollments', 'active_students', 'comments',
+        ))
+
+    def test_rollup_days(self):
+        self.assertEqual(rollup_days(self.yesterday, self.today), 3)
+        self.assertSetEqual(self.stats(), {
+            (self.course.pk, self.yesterday, 3, 2, 1),
+            (self.course.pk, self.today, 0, 0, 1),
+            (self.other_course.pk, self.today, 1, 0, 0),
+        })
+        self.assertSetEqual(
+            set(AnnouncementDailyStats.objects.values_list('announcement', 'day', 'comments')),
+            {(self.announcement.pk, self.yesterday, 1), (self.announcement.pk, self.today, 1)},
+        )
+
+    def test_rollup_again_does_not_double_count(self):
+        rollup_days(self.yesterday, self.today)
+        stats = self.stats()
+        rollup_days(self.yesterday, self.today)
+        self.assertSetEqual(self.stats(), stats)
+
+    def test_rollup_only_the_period(self):
+        rollup_days(self.today, self.today)
+        self.assertFalse(CourseDailyStats.objects.filter(day=self.yesterday).exists())
+
+        # The other days are kept.
+        rollup_days(self.yesterday, self.yesterday)
+        self.assertEqual(CourseDailyStats.objects.count(), 3)
+
+    def test_command_resumes_from_the_last_day(self):
+        call_command('rollup_stats', stdout=io.StringIO())
+        self.assertEqual(CourseDailyStats.objects.count(), 3)
+
+        self.make(Comment, self.today, announcement=self.announcement, user=self.users[2])
+        out = io.StringIO()
+        call_command('rollup_stats', stdout=out)
+        # Only today is computed again.
+        self.assertIn(f'Consolidado de {self.today} a {self.today}.', out.getvalue())
+        self.assertEqual(CourseDailyStats.objects.get(course=self.course, day=self.today).comments, 2)
+        self.assertEqual(CourseDailyStats.objects.get(course=self.course, day=self.yesterday).comments, 1)
+
+
+    def test_command_invalid_chunk_days(self):
+        for chunk_days in (0, -1):
+            with self.assertRaisesMessage(CommandError, '--chunk-days deve ser ao menos 1.'):
+                call_command('rollup_stats', chunk_days=chunk_days, stdout=io.StringIO())
+        self.assertFalse(CourseDailyStats.objects.exists())
+
+
+class DailyStatsAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@x.com', '123')
+        course = baker.make('courses.Course')
+        today = timezone.localdate()
+        for days in range(365):
+            baker.make(
+                CourseDailyStats, course=course, day=today - timedelta(days=days),
+                enrollments=2, active_students=5, comments=1,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_report_reads_only_the_rollups(self):
+        url = reverse('admin:courses_coursedailystats_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(response, 'Inscrições: 730')
+        self.assertContains(response, 'Comentários: 365')
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('courses_enrollment', tables)
+        self.assertNotIn('courses_comment', tables)
+        self.assertNotIn('courses_activity', tables)
+
+    def test_report_is_read_only(self):
+        self.assertEqual(self.client.get(reverse('admin:courses_coursedailystats_add')).status_code, 403)
+        response = self.client.get(reverse('admin:courses_announcementdailystats_changelist'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,117 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from model_bakery import baker
+
+from courses.models import MaterialBlob
+from courses.storage import material_storage
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        course = baker.make('courses.Course', name='Curso de Teste')
+        cls.lesson = baker.make('courses.Lesson', course=course)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+    
+    def make_material(self, filename, content):
+        return baker.make('courses.Material', lesson=self.lesson, resource=SimpleUploadedFile(filename, content))
+
+    def test_name_is_the_content_hash(self):
+        material = self.make_material('codigo.py', b'print()')
+        digest = hashlib.sha256(b'print()').hexdigest()
+        name = material.resource.name
+        self.assertEqual(name, f'courses/blobs/{digest[:2]}/{digest[2:4]}/{digest}.py')
+        self.assertRegex(name, r'^courses/blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.py$')
+        self.assertEqual(material.get_filename(), 'codigo.py')
+
+    def test_same_content_is_stored_once(self):
+        material1 = self.make_material('video.mp4', b'\x00' * 100)
+        material2 = self.make_material('aula.mp4', b'\x00' * 100)
+        self.assertEqual(material1.resource.name, material2.resource.name)
+        self.assertEqual(material2.get_filename(), 'aula.mp4')
+
+        blob = MaterialBlob.objects.get(name=material1.resource.name)
+        self.assertEqual(blob.references, 2)
+
+    def test_references_on_change_and_delete(self):
+        material1 = self.make_material('notas.txt', b'notas')
+        material2 = self.make_material('notas.txt', b'notas')
+        name = material1.resource.name
+
+        material2.resource = SimpleUploadedFile('outras.txt', b'outras notas')
+        material2.save()
+        self.assertEqual(MaterialBlob.objects.get(name=name).references, 1)
+        self.assertEqual(MaterialBlob.objects.get(name=material2.resource.name).references, 1)
+
+        material1.delete()
+        self.assertEqual(MaterialBlob.objects.get(name=name).references, 0)
+        # The file is only removed by the garbage collection.
+        self.assertTrue(material_storage.exists(name))
+
+    def test_collect_material_blobs(self):
+        material1 = self.make_material('notas.txt', b'removido')
+        material2 = self.make_material('notas.txt', b'mantido')
+        removed, kept = material1.resource.name, material2.resource.name
+        material1.delete()
+
+        call_command('collect_material_blobs', min_age=0, stdout=io.StringIO())
+        self.assertFalse(material_storage.exists(removed))
+        self.assertFalse(MaterialBlob.objects.filter(name=removed).exists())
+        self.assertTrue(material_storage.exists(kept))
+
+    def test_collect_material_blobs_min_age(self):
+        material = self.make_material('notas.txt', b'notas')
+        name = material.resource.name
+        material.delete()
+
+        # Released just now, an upload may still take it.
+        call_command('collect_material_blobs', stdout=io.StringIO())
+        self.assertTrue(material_storage.exists(name))
+        self.assertTrue(MaterialBlob.objects.filter(name=name).exists())
+
+        # Taken again by another material, it is not collected anymore.
+        self.make_material('notas.txt', b'notas')
+        call_command('collect_material_blobs', min_age=0, stdout=io.StringIO())
+        self.assertTrue(material_storage.exists(name))
+        self.assertEqual(MaterialBlob.objects.get(name=name).references, 1)
+
+    def test_collect_keeps_a_blob_taken_by_an_upload(self):
+        material = self.make_material('notas.txt', b'notas')
+        name = material.resource.name
+        material.delete()
+        # Released two days ago.
+        released_at = timezone.now() - timedelta(days=2)
+        MaterialBlob.objects.filter(name=name).update(updated_at=released_at)
+        os.utime(material_storage.path(name), (released_at.timestamp(), released_at.timestamp()))
+
+        # Saved again by an upload, its material isn't saved yet.
+        self.assertEqual(material_storage.save('notas.txt', ContentFile(b'notas')), name)
+        call_command('collect_material_blobs', stdout=io.StringIO())
+        self.assertTrue(material_storage.exists(name))
+
+        baker.make('courses.Material', lesson=self.lesson, resource=name)
+        self.assertEqual(MaterialBlob.objects.get(name=name).references, 1)
+
+    def test_collect_material_blobs_recount(self):
+        material = self.make_material('notas.txt', b'notas')
+        MaterialBlob.objects.filter(name=material.resource.name).update(references=5)
+        call_command('collect_material_blobs', recount=True, stdout=io.StringIO())
+        self.assertEqual(MaterialBlob.objects.get(name=material.resource.name).references, 1)
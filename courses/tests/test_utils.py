@@ -1,8 +1,10 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
 
 from model_bakery import baker
 
-from courses.utils import material_directory_path
+from courses.utils import material_directory_path, personalize_comments
 
 
 def create_material(course_name):
@@ -23,4 +25,31 @@ class MaterialDirectoryPathTests(TestCase):
         instance = create_material('Teste')
         filename = 'teste.txt'
         material_path = material_directory_path(instance, filename)
-        self.assertEqual(material_path, 'courses/lessons/materials/teste/teste.txt')
\ No newline at end of file
+        self.assertEqual(material_path, 'courses/lessons/materials/teste/teste.txt')
+
+
+class PersonalizeCommentsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(username='autor', password='123')
+        cls.other = get_user_model().objects.create_user(username='outro', email='outro@teste.com', password='123')
+        cls.comment = baker.make('courses.Comment', user=cls.author, content='Olá')
+        cls.html = render_to_string('courses/comment_list.html', {'comments': [cls.comment]})
+
+    def test_author_sees_own_comment(self):
+        html = personalize_comments(self.html, self.author)
+        self.assertIn('<strong>Você</strong>', html)
+        self.assertNotIn('autor', html)
+        self.assertIn(self.comment.get_absolute_url(), html)
+
+    def test_other_user_sees_author(self):
+        html = personalize_comments(self.html, self.other)
+        self.assertIn('<strong>autor</strong>', html)
+        self.assertNotIn('Você', html)
+        self.assertNotIn(self.comment.get_absolute_url(), html)
+
+    def test_markers_are_replaced(self):
+        html = personalize_comments(self.html, self.other)
+        self.assertNotIn('<!--', html)
+        self.assertIn('há 0\xa0minuto', html)
@@ -1,13 +1,29 @@
+import io
+import shutil
+import hashlib
+import tempfile
+import zipfile
+from unittest import mock
 from datetime import date, timedelta
 
 from django.core import mail
+from django.core.cache import cache
 from django.urls import reverse
-from django.test import TestCase
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db import connection
+from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
 
 from model_bakery import baker
 
+from courses import activity, heartbeats
+from courses.models import Comment, Material, MaterialUpload
+from courses.pagination import make_cursor
+
 
 class IndexViewTests(TestCase):
 
@@ -122,6 +138,17 @@ class CourseDetailsViewTests(TestCase):
         response = self.client.post(path, data)
         self.assertEqual(mail.outbox[0].from_email, settings.DEFAULT_FROM_EMAIL)
 
+    def test_recommendations_in_a_single_query(self):
+        first, second = baker.make('courses.Course', _quantity=2)
+        baker.make('courses.CourseRecommendation', course=self.course, recommended=second, rank=1, score=0.9)
+        baker.make('courses.CourseRecommendation', course=self.course, recommended=first, rank=2, score=0.5)
+        path = reverse('courses:details', args=(self.course.pk, self.course.slug))
+        response = self.client.get(path)
+        self.assertListEqual(list(response.context['recommendations']), [second, first])
+        self.assertContains(response, first.get_absolute_url())
+        # The course and its recommendations.
+        self.assertNumQueries(2, self.client.get, path)
+
 
 class MakeEnrollmentViewTests(TestCase):
     
@@ -350,6 +377,170 @@ class AnnouncementsViewTests(TestCase):
             ['<Announcement: Anuncio de Teste>', '<Announcement: Anuncio de Teste>'],
         )
 
+    def test_view_shows_only_excerpts(self):
+        self.client.login(username='user', password='123')
+        baker.make('courses.Announcement', course=self.course, content='Início ' + 'a' * 300)
+        response = self.client.get(reverse('courses:announcements', args=(self.course.pk, self.course.slug)))
+        self.assertContains(response, '<p>Início ')
+        self.assertNotContains(response, 'a' * 250)
+        announcement = response.context['announcements'][0]
+        self.assertSetEqual(announcement.get_deferred_fields(), {'content', 'content_html'})
+
+    def count_queries(self):
+        url = reverse('courses:announcements', args=(self.course.pk, self.course.slug))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_view_constant_queries(self):
+        self.client.login(username='user', password='123')
+        announcement = baker.make('courses.Announcement', course=self.course)
+        baker.make('courses.Comment', announcement=announcement)
+        # The first visit creates the feed token and caches the menu.
+        self.count_queries()
+        queries = self.count_queries()
+
+        for announcement in baker.make('courses.Announcement', course=self.course, _quantity=10):
+            baker.make('courses.Comment', announcement=announcement, _quantity=2)
+        # The new announcements changed the menu.
+        self.count_queries()
+        self.assertEqual(self.count_queries(), queries)
+
+    def test_view_comment_counts(self):
+        self.client.login(username='user', password='123')
+        announcement = baker.make('courses.Announcement', course=self.course)
+        baker.make('courses.Comment', announcement=announcement, _quantity=3)
+        baker.make('courses.Announcement', course=self.course)
+        response = self.client.get(reverse('courses:announcements', args=(self.course.pk, self.course.slug)))
+        self.assertContains(response, '3 Comentários')
+        self.assertContains(response, '0 Comentários')
+        self.assertContains(response, '(último há', count=1)
+
+    @override_settings(ANNOUNCEMENTS_PAGE_SIZE=2)
+    def test_view_pagination(self):
+        self.client.login(username='user', password='123')
+        for number in range(5):
+            baker.make('courses.Announcement', course=self.course, title=f'Anúncio {number}')
+        url = reverse('courses:announcements', args=(self.course.pk, self.course.slug))
+
+        cursor = ''
+        for expected in ([4, 3], [2, 1], [0]):
+            response = self.client.get(url, {'antes': cursor} if cursor else {})
+            page = [str(announcement) for announcement in response.context['announcements']]
+            self.assertListEqual(page, [f'Anúncio {number}' for number in expected])
+            cursor = response.context['next_cursor']
+        self.assertIsNone(cursor)
+        self.assertContains(response, 'Anúncios mais recentes')
+        self.assertNotContains(response, 'Anúncios anteriores')
+
+    def test_view_invalid_cursor(self):
+        self.client.login(username='user', password='123')
+        url = reverse('courses:announcements', args=(self.course.pk, self.course.slug))
+        response = self.client.get(url, {'antes': 'invalido'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_view_unread_announcements(self):
+        self.client.login(username='user', password='123')
+        read, unread = baker.make('courses.Announcement', course=self.course, _quantity=2)
+        self.client.get(read.get_absolute_url())
+
+        response = self.client.get(reverse('courses:announcements', args=(self.course.pk, self.course.slug)))
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertContains(response, '<span class="badge">Novo</span>', count=1)
+        announcements = {announcement.pk: announcement for announcement in response.context['announcements']}
+        self.assertFalse(announcements[read.pk].is_unread)
+        self.assertTrue(announcements[unread.pk].is_unread)
+
+        # The dashboard shows the count.
+        response = self.client.get(reverse('accounts:dashboard'))
+        self.assertContains(response, 'title="Anúncios não lidos">1</span>')
+
+
+class AnnouncementsFeedViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', name='Curso de Teste', slug='curso-de-teste')
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        cls.enrollment = baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+        cls.announcement = baker.make('courses.Announcement', course=cls.course, title='Anúncio 1', content='Olá')
+
+    def url(self, feed_format='atom', token=None):
+        token = token or self.enrollment.feed_token
+        return reverse(f'courses:announcements_{feed_format}', args=(self.course.pk, self.course.slug, token))
+
+    def test_list_links_the_feeds(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(reverse('courses:announcements', args=(self.course.pk, self.course.slug)))
+        self.assertContains(response, self.url('atom'))
+        self.assertContains(response, self.url('json'))
+
+    def test_token_created_with_the_enrollment(self):
+        enrollment = baker.make('courses.Enrollment', course=self.course)
+        self.assertEqual(len(enrollment.feed_token), 43)
+        self.assertNotEqual(enrollment.feed_token, self.enrollment.feed_token)
+
+        # Listing the announcements writes nothing.
+        self.client.login(username='user', password='123')
+        url = reverse('courses:announcements', args=(self.course.pk, self.course.slug))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertFalse([query for query in context.captured_queries if query['sql'].startswith('UPDATE')])
+
+    def test_atom_feed(self):
+        response = self.client.get(self.url('atom'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/atom+xml; charset=utf-8')
+        self.assertContains(response, '<title>Anúncio 1</title>')
+        self.assertContains(response, self.announcement.get_absolute_url())
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_json_feed(self):
+        response = self.client.get(self.url('json'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['version'], 'https://jsonfeed.org/version/1.1')
+        self.assertEqual(data['items'][0]['title'], 'Anúncio 1')
+        self.assertEqual(data['items'][0]['content_html'], '<p>Olá</p>')
+
+    def test_invalid_token(self):
+        response = self.client.get(self.url(token='invalido'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_pending_enrollment(self):
+        user = get_user_model().objects.create_user(username='other', email='other@teste.com', password='123')
+        enrollment = baker.make('courses.Enrollment', course=self.course, user=user, status=0)
+        response = self.client.get(self.url(token=enrollment.feed_token))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        url = self.url()
+        response = self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 1)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        url = self.url('json')
+        etag = self.client.get(url)['ETag']
+
+        announcement = baker.make('courses.Announcement', course=self.course, title='Anúncio 2')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # A deleted announcement changes the feed too.
+        announcement.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 1)
+
 
 class AnnouncementDetailsViewTests(TestCase):
 
@@ -358,8 +549,17 @@ class AnnouncementDetailsViewTests(TestCase):
         cls.course = baker.make('courses.Course', slug='curso-de-teste')
         cls.announcement = baker.make('courses.Announcement', course=cls.course)
         cls.user = get_user_model().objects.create_user(username='user', password='123')
-        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
-    
+        # Already read, the counts of queries don't include marking it.
+        baker.make(
+            'courses.Enrollment', course=cls.course, user=cls.user, status=1,
+            announcements_read_at=cls.announcement.created_at,
+        )
+
+    def setUp(self):
+        # The rendered comments and their versions are kept by the cache,
+        # not rolled back after every test.
+        cache.clear()
+
     def test_view_redirects_if_not_logged_in(self):
         url = reverse('courses:announcement_details', args=(self.course.pk, self.course.slug, self.announcement.pk))
         response = self.client.get(url)
@@ -424,20 +624,167 @@ class AnnouncementDetailsViewTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Seja o primeiro a comentar!')
-        self.assertQuerysetEqual(response.context['comments'], [])
+        self.assertEqual(response.context['comments_count'], 0)
     
     def test_view_two_comments(self):
         self.client.login(username='user', password='123')
         # Add two comments.
-        baker.make('courses.Comment', content='Teste', announcement=self.announcement, _quantity=2)
+        baker.make('courses.Comment', content='Comentário de teste', announcement=self.announcement, _quantity=2)
         url = reverse('courses:announcement_details', args=(self.course.pk, self.course.slug, self.announcement.pk))
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(self.announcement.comments.all().count(), 2)
-        self.assertQuerysetEqual(
-            response.context['comments'],
-            ['<Comment: Teste>', '<Comment: Teste>'],
-        )
+        self.assertEqual(response.context['comments_count'], 2)
+        self.assertContains(response, 'Comentário de teste', count=2)
+
+        # The same, from the cache.
+        response = self.client.get(url)
+        self.assertEqual(response.context['comments_count'], 2)
+        self.assertContains(response, 'Comentário de teste', count=2)
+
+    def count_queries(self):
+        url = reverse('courses:announcement_details', args=(self.course.pk, self.course.slug, self.announcement.pk))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_view_constant_queries_for_comments(self):
+        self.client.login(username='user', password='123')
+        instructors, _ = Group.objects.get_or_create(name='instructor')
+        instructor = baker.make(get_user_model())
+        instructor.groups.add(instructors)
+
+        baker.make('courses.Comment', announcement=self.announcement, user=instructor)
+        baker.make('courses.Comment', announcement=self.announcement, user=self.user)
+        cache.clear()
+        queries = self.count_queries()
+
+        # Comments of other users, students and instructors.
+        for _ in range(5):
+            baker.make('courses.Comment', announcement=self.announcement)
+            baker.make('courses.Comment', announcement=self.announcement, user=instructor)
+        # Both counts with nothing cached.
+        cache.clear()
+        self.assertEqual(self.count_queries(), queries)
+
+        response = self.client.get(self.announcement.get_absolute_url())
+        self.assertContains(response, 'Instrutor</em>', count=6)
+
+    def test_view_caches_the_comments(self):
+        self.client.login(username='user', password='123')
+        # Caches the menu.
+        self.count_queries()
+        baker.make('courses.Comment', announcement=self.announcement, _quantity=3)
+        queries = self.count_queries()
+        # The comments and their authors are not queried again.
+        self.assertEqual(self.count_queries(), queries - 3)
+
+    def test_new_comment_invalidates_the_cache(self):
+        self.client.login(username='user', password='123')
+        url = self.announcement.get_absolute_url()
+        self.client.get(url)
+        self.client.post(url, {'content': 'Comentário novo'})
+        self.assertContains(self.client.get(url), 'Comentário novo')
+
+    def test_deleted_comment_invalidates_the_cache(self):
+        self.client.login(username='user', password='123')
+        comment = baker.make('courses.Comment', announcement=self.announcement, content='Comentário removido')
+        url = self.announcement.get_absolute_url()
+        self.assertContains(self.client.get(url), 'Comentário removido')
+        comment.delete()
+        self.assertNotContains(self.client.get(url), 'Comentário removido')
+
+    def test_cached_comments_are_personalized(self):
+        other = get_user_model().objects.create_user(username='other', email='other@teste.com', password='123')
+        baker.make('courses.Enrollment', course=self.course, user=other, status=1)
+        comment = baker.make('courses.Comment', announcement=self.announcement, user=self.user)
+        url = self.announcement.get_absolute_url()
+        edit_url = comment.get_absolute_url()
+
+        self.client.login(username='user', password='123')
+        response = self.client.get(url)
+        self.assertContains(response, '<strong>Você</strong>')
+        self.assertContains(response, edit_url)
+
+        # Now from the cache.
+        self.client.login(username='other', password='123')
+        response = self.client.get(url)
+        self.assertNotContains(response, '<strong>Você</strong>')
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, self.user.username)
+
+
+@override_settings(COMMENTS_PAGE_SIZE=2)
+class AnnouncementCommentsViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', slug='curso-de-teste')
+        cls.announcement = baker.make('courses.Announcement', course=cls.course)
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+        for number in range(5):
+            baker.make('courses.Comment', announcement=cls.announcement, content=f'Comentário {number}')
+        cls.url = reverse('courses:announcement_comments', args=(cls.course.pk, cls.course.slug, cls.announcement.pk))
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='user', password='123')
+
+    def test_details_shows_only_newest_comments(self):
+        response = self.client.get(self.announcement.get_absolute_url())
+        self.assertEqual(response.context['comments_count'], 2)
+        self.assertContains(response, 'Comentário 3')
+        self.assertContains(response, 'Comentário 4')
+        self.assertNotContains(response, 'Comentário 2')
+        self.assertTrue(response.context['has_older'])
+        self.assertContains(response, 'Carregar comentários anteriores')
+
+    def test_load_older_comments(self):
+        response = self.client.get(self.announcement.get_absolute_url())
+        cursor = response.context['older_cursor']
+
+        data = self.client.get(self.url, {'antes': cursor}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertTrue(data['has_more'])
+        self.assertLess(data['html'].index('Comentário 1'), data['html'].index('Comentário 2'))
+
+        data = self.client.get(self.url, {'antes': data['cursor']}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertFalse(data['has_more'])
+        self.assertIn('Comentário 0', data['html'])
+
+    def test_load_newer_comments(self):
+        response = self.client.get(self.announcement.get_absolute_url())
+        cursor = response.context['newer_cursor']
+        data = self.client.get(self.url, {'depois': cursor}).json()
+        self.assertEqual(data['count'], 0)
+        self.assertEqual(data['cursor'], cursor)
+
+        baker.make('courses.Comment', announcement=self.announcement, content='Comentário novo')
+        data = self.client.get(self.url, {'depois': cursor}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertIn('Comentário novo', data['html'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'antes': 'invalido'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'depois': 'invalido'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cache_keyed_on_the_cursor_position(self):
+        comment = self.announcement.comments.earliest('created_at')
+        cursor = make_cursor(comment.created_at, comment.pk)
+        data = self.client.get(self.url, {'depois': cursor}).json()
+
+        # The same position written with another UTC offset.
+        offset = timezone.get_fixed_timezone(-180)
+        other_cursor = make_cursor(comment.created_at.astimezone(offset), comment.pk)
+        self.assertNotEqual(other_cursor, cursor)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(self.url, {'depois': other_cursor}).json(), data)
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('courses_comment', tables)
 
 
 class EditCommentViewTests(TestCase):
@@ -452,7 +799,12 @@ class EditCommentViewTests(TestCase):
         # The users must have enrollment to access.
         baker.make('courses.Enrollment', course=cls.course, user=cls.user1, status=1)
         baker.make('courses.Enrollment', course=cls.course, user=cls.user2, status=1)
-    
+
+    def setUp(self):
+        # The rendered comments and their versions are kept by the cache,
+        # not rolled back after every test.
+        cache.clear()
+
     def test_view_redirect_if_not_logged_in(self):
         url = reverse(
             'courses:edit_comment', 
@@ -529,7 +881,7 @@ class EditCommentViewTests(TestCase):
 
         # Test if the comment was successfully edited.
         before = self.comment.content
-        after = response.context['comments'].get(pk=self.comment.pk).content
+        after = Comment.objects.get(pk=self.comment.pk).content
         self.assertEqual(response.status_code, 200)
         self.assertNotEqual(before, after)
         self.assertContains(response, after)
@@ -646,7 +998,36 @@ class LessonsViewTests(TestCase):
         self.assertContains(response, '(Agendado: Sem previsão)')
         self.assertQuerysetEqual(response.context['lessons'].filter(pk=3), ['<Lesson: Aula de Teste>'])
 
+    def test_view_progress(self):
+        self.client.login(username='user', password='123')
+        past_date = date.today() + timedelta(days=-1)
+        lessons = [
+            baker.make('courses.Lesson', course=self.course, order=order, release_date=past_date)
+            for order in range(1, 5)
+        ]
+        enrollment = self.user.enrollments.get(course=self.course)
+        enrollment.mark_lesson_done(lessons[0])
+        enrollment.mark_lesson_viewed(lessons[1])
+
+        url = reverse('courses:lessons', args=(self.course.pk, self.course.slug))
+        # Caches the user.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.context['progress'], 25)
+        self.assertContains(response, '<strong>25%</strong>')
+        self.assertContains(response, 'title="Concluída"', count=1)
+        self.assertContains(response, 'title="Vista"', count=1)
+
+        # No query per lesson.
+        queries = len(context.captured_queries)
+        baker.make('courses.Lesson', course=self.course, order=5, release_date=past_date, _quantity=3)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertEqual(len(context.captured_queries), queries)
 
+
+@override_settings(ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None)
 class LessonDetailsViewTests(TestCase):
 
     @classmethod
@@ -657,6 +1038,13 @@ class LessonDetailsViewTests(TestCase):
         cls.user = get_user_model().objects.create_user(username='user', password='123')
         baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
 
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
     def test_view_redirect_if_not_logged_in(self):
         url = reverse('courses:lesson_details', args=(self.course.pk, self.course.slug, self.lesson_available.pk))
         response = self.client.get(url)
@@ -730,7 +1118,34 @@ class LessonDetailsViewTests(TestCase):
             ['<Material: Material de Teste>', '<Material: Material de Teste>', '<Material: Material de Teste>'],
         )
 
+    def test_view_marks_lesson_viewed(self):
+        self.client.login(username='user', password='123')
+        self.client.get(self.lesson_available.get_absolute_url())
+        enrollment = self.user.enrollments.get(course=self.course)
+        self.assertTrue(enrollment.has_viewed(self.lesson_available))
+        self.assertFalse(enrollment.has_done(self.lesson_available))
+
+    def test_mark_lesson_done(self):
+        self.client.login(username='user', password='123')
+        url = reverse('courses:lesson_done', args=(self.course.pk, self.course.slug, self.lesson_available.pk))
+        self.assertContains(self.client.get(self.lesson_available.get_absolute_url()), url)
+
+        response = self.client.post(url, follow=True)
+        self.assertRedirects(response, self.lesson_available.get_absolute_url())
+        self.assertContains(response, 'Aula concluída.')
+        self.assertNotContains(response, url)
+        self.assertTrue(self.user.enrollments.get(course=self.course).has_done(self.lesson_available))
 
+    def test_mark_unavailable_lesson_done(self):
+        self.client.login(username='user', password='123')
+        lesson = baker.make('courses.Lesson', course=self.course, release_date=None)
+        url = reverse('courses:lesson_done', args=(self.course.pk, self.course.slug, lesson.pk))
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.user.enrollments.get(course=self.course).has_done(lesson))
+
+
+@override_settings(ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None)
 class MaterialDetailsViewTests(TestCase):
     
     @classmethod
@@ -744,6 +1159,13 @@ class MaterialDetailsViewTests(TestCase):
         cls.user = get_user_model().objects.create_user(username='user', password='123')
         cls.enrollment = baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
 
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
     def test_view_redirect_if_not_logged_in(self):
         url = reverse('courses:material_details', args=(self.course.pk, self.course.slug, self.material_embedded.pk))
         response = self.client.get(url)
@@ -807,4 +1229,363 @@ class MaterialDetailsViewTests(TestCase):
         # If the material is unvailable, an appropriate message is displayed.
         message = list(response.context['messages'])[0]
         self.assertEqual(message.tags, 'error')
-        self.assertEqual(message.message, 'Este material não está disponível.')
\ No newline at end of file
+        self.assertEqual(message.message, 'Este material não está disponível.')
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(), ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None,
+)
+class MaterialDownloadViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', name='Curso de Teste', slug='curso-de-teste')
+        past_date = date.today() + timedelta(days=-1)
+        cls.lesson_available = baker.make('courses.Lesson', course=cls.course, release_date=past_date)
+        cls.material = baker.make(
+            'courses.Material', 
+            lesson=cls.lesson_available, 
+            resource=SimpleUploadedFile('codigo.py', b'0123456789'),
+        )
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+        cls.url = reverse('courses:material_download', args=(cls.course.pk, cls.course.slug, cls.material.pk))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
+    def test_view_redirect_if_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, '/conta/entrar/?next=/cursos/1/curso-de-teste/aulas/materiais/1/baixar/')
+    
+    def test_view_redirects_if_not_has_enrollment(self):
+        get_user_model().objects.create_user(username='other', email='other@teste.com', password='123')
+        self.client.login(username='other', password='123')
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('accounts:dashboard'))
+
+    def test_view_streams_whole_file(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="codigo.py"')
+    
+    def test_view_escapes_the_filename(self):
+        material = baker.make(
+            'courses.Material',
+            lesson=self.lesson_available,
+            resource=SimpleUploadedFile('codigo.py', b'0123456789'),
+        )
+        # The name sent by the chunked upload is kept as is.
+        Material.objects.filter(pk=material.pk).update(filename='aula "1" código.py')
+        self.client.login(username='user', password='123')
+        response = self.client.get(
+            reverse('courses:material_download', args=(self.course.pk, self.course.slug, material.pk))
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="aula _1_ c_digo.py"; '
+            "filename*=UTF-8''aula%20%221%22%20c%C3%B3digo.py",
+        )
+
+    def test_view_byte_range(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+    
+    def test_view_suffix_byte_range(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+    
+    def test_view_unsatisfiable_range(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+    
+    def test_view_if_range(self):
+        self.client.login(username='user', password='123')
+        etag = self.client.get(self.url)['ETag']
+
+        # If-Range matches the current version, so only the range is sent.
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+        # The file changed, the whole file is sent.
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+    
+    def test_view_not_modified(self):
+        self.client.login(username='user', password='123')
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    @override_settings(MATERIALS_SENDFILE_HEADER='X-Accel-Redirect', MATERIALS_SENDFILE_PREFIX='/protected-media/')
+    def test_view_sendfile_header(self):
+        self.client.login(username='user', password='123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.material.resource.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_view_redirects_no_resource(self):
+        self.client.login(username='user', password='123')
+        material = baker.make('courses.Material', lesson=self.lesson_available)
+        url = reverse('courses:material_download', args=(self.course.pk, self.course.slug, material.pk))
+        response = self.client.get(url, follow=True)
+        self.assertRedirects(response, self.lesson_available.get_absolute_url())
+
+        message = list(response.context['messages'])[0]
+        self.assertEqual(message.tags, 'error')
+        self.assertEqual(message.message, 'Este material não possui um recurso para baixar.')
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(), ACTIVITY_LOG_FLUSH_INTERVAL=None, WATCH_POSITIONS_FLUSH_INTERVAL=None,
+)
+class MaterialsZipDownloadViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', name='Curso de Teste', slug='curso-de-teste')
+        past_date = date.today() + timedelta(days=-1)
+        cls.lesson1 = baker.make('courses.Lesson', course=cls.course, name='Aula', order=1, release_date=past_date)
+        cls.lesson2 = baker.make('courses.Lesson', course=cls.course, name='Aula', order=2, release_date=past_date)
+        cls.lesson_unvailable = baker.make('courses.Lesson', course=cls.course, order=3)
+        baker.make('courses.Material', lesson=cls.lesson1, resource=SimpleUploadedFile('notas.txt', b'aula 1'))
+        baker.make('courses.Material', lesson=cls.lesson1, resource=SimpleUploadedFile('codigo.py', b'print()'))
+        baker.make('courses.Material', lesson=cls.lesson2, resource=SimpleUploadedFile('video.mp4', b'\x00' * 100))
+        baker.make('courses.Material', lesson=cls.lesson_unvailable, resource=SimpleUploadedFile('futuro.txt', b'x'))
+        # Materials without resource are ignored.
+        baker.make('courses.Material', lesson=cls.lesson2, url='https://www.youtube.com/embed/Mp0vhMDI7fA')
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+        baker.make('courses.Enrollment', course=cls.course, user=cls.user, status=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Buffers without the flush threads.
+        activity._buffer = heartbeats._buffer = None
+
+    def tearDown(self):
+        activity._buffer = heartbeats._buffer = None
+
+    def get_zip(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_view_redirect_if_not_logged_in(self):
+        url = reverse('courses:course_materials_download', args=(self.course.pk, self.course.slug))
+        response = self.client.get(url)
+        self.assertRedirects(response, '/conta/entrar/?next=/cursos/1/curso-de-teste/aulas/baixar/')
+
+    def test_lesson_zip(self):
+        self.client.login(username='user', password='123')
+        url = reverse('courses:lesson_materials_download', args=(self.course.pk, self.course.slug, self.lesson1.pk))
+        archive = self.get_zip(url)
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['01 - Aula/notas.txt', '01 - Aula/codigo.py'])
+        self.assertEqual(archive.read('01 - Aula/notas.txt'), b'aula 1')
+
+    def test_course_zip_only_released_lessons(self):
+        self.client.login(username='user', password='123')
+        url = reverse('courses:course_materials_download', args=(self.course.pk, self.course.slug))
+        archive = self.get_zip(url)
+        self.assertEqual(
+            archive.namelist(), 
+            ['01 - Aula/notas.txt', '01 - Aula/codigo.py', '02 - Aula/video.mp4'],
+        )
+
+        # The videos are stored, not compressed again.
+        self.assertEqual(archive.getinfo('02 - Aula/video.mp4').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('01 - Aula/notas.txt').compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_lesson_zip_unvailable_lesson(self):
+        self.client.login(username='user', password='123')
+        url = reverse(
+            'courses:lesson_materials_download', 
+            args=(self.course.pk, self.course.slug, self.lesson_unvailable.pk),
+        )
+        response = self.client.get(url, follow=True)
+        self.assertRedirects(response, reverse('courses:lessons', args=(self.course.pk, self.course.slug)))
+
+    def test_lesson_zip_no_resources(self):
+        self.client.login(username='user', password='123')
+        lesson = baker.make('courses.Lesson', course=self.course, order=4, release_date=date.today())
+        url = reverse('courses:lesson_materials_download', args=(self.course.pk, self.course.slug, lesson.pk))
+        response = self.client.get(url, follow=True)
+        self.assertRedirects(response, lesson.get_absolute_url())
+
+        message = list(response.context['messages'])[0]
+        self.assertEqual(message.tags, 'error')
+        self.assertEqual(message.message, 'Esta aula não possui recursos para baixar.')
+
+    def test_lesson_zip_sanitizes_the_names(self):
+        self.client.login(username='user', password='123')
+        lesson = baker.make('courses.Lesson', course=self.course, name='Parte 1/2', order=5, release_date=date.today())
+        material = baker.make('courses.Material', lesson=lesson, resource=SimpleUploadedFile('a.txt', b'a'))
+        Material.objects.filter(pk=material.pk).update(filename='../notas.txt')
+        url = reverse('courses:lesson_materials_download', args=(self.course.pk, self.course.slug, lesson.pk))
+        archive = self.get_zip(url)
+        self.assertEqual(archive.namelist(), ['05 - Parte_12/notas.txt'])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MATERIALS_UPLOAD_CHUNK_SIZE=4)
+class MaterialUploadViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = baker.make('courses.Course', name='Curso de Teste', slug='curso-de-teste')
+        lesson = baker.make('courses.Lesson', course=cls.course)
+        cls.material = baker.make('courses.Material', lesson=lesson)
+        cls.superuser = get_user_model().objects.create_superuser(
+            username='superuser', email='teste@teste.com', password='123',
+        )
+        cls.user = get_user_model().objects.create_user(username='user', password='123')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def start_upload(self, content):
+        data = {'material': self.material.pk, 'filename': 'video.mp4', 'size': len(content)}
+        response = self.client.post(reverse('courses:material_upload_start'), data)
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def send_chunk(self, upload, content, start, end, checksum=None):
+        checksum = checksum or hashlib.sha256(content[start:end + 1]).hexdigest()
+        return self.client.put(
+            reverse('courses:material_upload', args=(upload['id'],)),
+            content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(content)}',
+            HTTP_X_CHUNK_SHA256=checksum,
+        )
+
+    def test_view_only_for_staff(self):
+        self.client.login(username='user', password='123')
+        response = self.client.post(reverse('courses:material_upload_start'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_lesson_admin_has_the_uploads_url(self):
+        self.client.login(username='superuser', password='123')
+        response = self.client.get(reverse('admin:courses_lesson_change', args=(self.material.lesson_id,)))
+        self.assertContains(response, f'data-url="{reverse("courses:material_upload_start")}"')
+
+    def test_upload_in_chunks(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        self.assertEqual(upload['offset'], 0)
+        self.assertEqual(upload['chunk_size'], 4)
+        self.assertEqual(upload['url'], reverse('courses:material_upload', args=(upload['id'],)))
+
+        for start in range(0, len(content), 4):
+            end = min(start + 4, len(content)) - 1
+            response = self.send_chunk(upload, content, start, end)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['offset'], end + 1)
+
+        response = self.client.post(reverse('courses:material_upload_complete', args=(upload['id'],)))
+        self.assertEqual(response.status_code, 200)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.get_filename(), 'video.mp4')
+        self.assertEqual(self.material.resource.read(), content)
+        self.assertFalse(self.material.uploads.exists())
+
+    def test_bad_checksum_keeps_last_good_chunk(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        self.send_chunk(upload, content, 0, 3)
+
+        response = self.send_chunk(upload, content, 4, 7, checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['offset'], 4)
+
+        # Resumes from the offset given by the state of the upload.
+        state = self.client.get(reverse('courses:material_upload', args=(upload['id'],))).json()
+        self.assertEqual(state['offset'], 4)
+        self.assertEqual(self.send_chunk(upload, content, 4, 7).status_code, 200)
+
+    def test_retry_received_while_the_chunk_was_appended(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        receive_chunk = MaterialUpload.receive_chunk
+        retries = []
+
+        def receive_and_retry(material_upload, *args):
+            path = receive_chunk(material_upload, *args)
+            # The other request appends the same chunk before this one.
+            if not retries:
+                retries.append(None)
+                retries[0] = self.send_chunk(upload, content, 0, 3)
+            return path
+
+        with mock.patch.object(MaterialUpload, 'receive_chunk', receive_and_retry):
+            response = self.send_chunk(upload, content, 0, 3)
+        self.assertEqual(retries[0].status_code, 200)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+        self.assertEqual(self.send_chunk(upload, content, 4, 7).status_code, 200)
+        with open(MaterialUpload.objects.get(pk=upload['id']).part_path(), 'rb') as part:
+            self.assertEqual(part.read(), content[:8])
+
+    def test_complete_twice(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123'
+        upload = self.start_upload(content)
+        self.send_chunk(upload, content, 0, 3)
+        url = reverse('courses:material_upload_complete', args=(upload['id'],))
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_chunk_out_of_order(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        response = self.send_chunk(upload, content, 4, 7)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+    def test_chunk_too_big(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        self.assertEqual(self.send_chunk(upload, content, 0, 5).status_code, 413)
+
+    def test_complete_missing_chunks(self):
+        self.client.login(username='superuser', password='123')
+        content = b'0123456789'
+        upload = self.start_upload(content)
+        self.send_chunk(upload, content, 0, 3)
+        response = self.client.post(reverse('courses:material_upload_complete', args=(upload['id'],)))
+        self.assertEqual(response.status_code, 409)
@@ -12,16 +12,44 @@ urlpatterns = [
     path('', views.index, name='index'),
     # Ex: /cursos/1/<SLUG>/
     path('<int:pk>/<slug:slug>/', views.details, name='details'),
+    # Ex: /cursos/envios/
+    path('envios/', views.material_upload_start, name='material_upload_start'),
+    # Ex: /cursos/envios/<UUID>/
+    path('envios/<uuid:upload_pk>/', views.material_upload, name='material_upload'),
+    # Ex: /cursos/envios/<UUID>/concluir/
+    path('envios/<uuid:upload_pk>/concluir/', 
+         views.material_upload_complete, 
+         name='material_upload_complete'),
     # Ex: /cursos/1/<SLUG>/aulas/
     path('<int:pk>/<slug:slug>/aulas/', views.lessons, name='lessons'),
     # Ex: /cursos/1/<SLUG>/aulas/1/
     path('<int:pk>/<slug:slug>/aulas/<int:lesson_pk>/', 
          views.lesson_details, 
          name='lesson_details'),
+    # Ex: /cursos/1/<SLUG>/aulas/1/concluir/
+    path('<int:pk>/<slug:slug>/aulas/<int:lesson_pk>/concluir/', 
+         views.lesson_done, 
+         name='lesson_done'),
+    # Ex: /cursos/1/<SLUG>/aulas/1/baixar/
+    path('<int:pk>/<slug:slug>/aulas/<int:lesson_pk>/baixar/', 
+         views.lesson_materials_download, 
+         name='lesson_materials_download'),
+    # Ex: /cursos/1/<SLUG>/aulas/baixar/
+    path('<int:pk>/<slug:slug>/aulas/baixar/', 
+         views.course_materials_download, 
+         name='course_materials_download'),
 	# Ex: /cursos/1/<SLUG>/aulas/materiais/1/
     path('<int:pk>/<slug:slug>/aulas/materiais/<int:material_pk>/', 
          views.material_details, 
          name='material_details'),
+    # Ex: /cursos/1/<SLUG>/aulas/materiais/1/posicao/
+    path('<int:pk>/<slug:slug>/aulas/materiais/<int:material_pk>/posicao/', 
+         views.material_heartbeat, 
+         name='material_heartbeat'),
+    # Ex: /cursos/1/<SLUG>/aulas/materiais/1/baixar/
+    path('<int:pk>/<slug:slug>/aulas/materiais/<int:material_pk>/baixar/', 
+         views.material_download, 
+         name='material_download'),
     # Ex: /cursos/1/<SLUG>/inscreva-se/
     path('<int:pk>/<slug:slug>/inscreva-se/', 
          views.make_enrollment, 
@@ -34,10 +62,28 @@ urlpatterns = [
     path('<int:pk>/<slug:slug>/anuncios/', 
          views.announcements, 
          name='announcements'),
+    # Ex: /cursos/1/<SLUG>/anuncios/feed/<TOKEN>.atom
+    path('<int:pk>/<slug:slug>/anuncios/feed/<str:token>.atom', 
+         views.announcements_feed, 
+         {'feed_format': 'atom'},
+         name='announcements_atom'),
+    # Ex: /cursos/1/<SLUG>/anuncios/feed/<TOKEN>.json
+    path('<int:pk>/<slug:slug>/anuncios/feed/<str:token>.json', 
+         views.announcements_feed, 
+         {'feed_format': 'json'},
+         name='announcements_json'),
     # Ex: /cursos/1/<SLUG>/anuncios/1/
     path('<int:pk>/<slug:slug>/anuncios/<int:announcement_pk>/', 
          views.announcement_details, 
          name='announcement_details'),
+    # Ex: /cursos/1/<SLUG>/anuncios/1/comentarios/?antes=<CURSOR>
+    path('<int:pk>/<slug:slug>/anuncios/<int:announcement_pk>/comentarios/', 
+         views.announcement_comments, 
+         name='announcement_comments'),
+    # Ex: /cursos/1/<SLUG>/anuncios/1/eventos/?depois=<CURSOR>
+    path('<int:pk>/<slug:slug>/anuncios/<int:announcement_pk>/eventos/', 
+         views.announcement_events, 
+         name='announcement_events'),
     # Ex: /cursos/1/<SLUG>/anuncios/1/editar-comentario/1/
     path('<int:pk>/<slug:slug>/anuncios/<int:announcement_pk>/editar-comentario/<int:comment_pk>/', 
          views.edit_comment, 
@@ -1,3 +1,15 @@
+import re
+import uuid
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+from django.utils.timesince import timesince
+from django.utils.dateparse import parse_datetime
+
+
 def material_directory_path(instance, filename):
     """Returns the material directory.
 
@@ -5,4 +17,133 @@ def material_directory_path(instance, filename):
     name of the course.
     """
     course_name = instance.lesson.course.name.replace(' ', '_').lower()
-    return f'courses/lessons/materials/{course_name}/{filename}'
\ No newline at end of file
+    return f'courses/lessons/materials/{course_name}/{filename}'
+
+
+def render_text(text):
+    """Returns a plain text as escaped HTML paragraphs, like |linebreaks."""
+    return linebreaks(text, autoescape=True)
+
+
+def make_excerpt(html, length):
+    """Truncates the text of `html` to `length` characters.
+
+    The tags left open by the truncation are closed, so the excerpt is
+    still valid HTML.
+    """
+    return Truncator(html).chars(length, html=True)
+
+
+AUTHOR_RE = re.compile(r'<!--author:(\d+)-->(.*?)<!--/author-->', re.DOTALL)
+EDIT_RE = re.compile(r'<!--edit:(\d+):(\S*?)-->')
+SINCE_RE = re.compile(r'<!--since:(\S*?)-->')
+EDIT_LINK = (
+    '<abbr title="Editar Comentário">'
+    '<a href="{}" class="fright"><i class="fas fa-edit"></i></a>'
+    '</abbr>'
+)
+
+
+def personalize_comments(html, user):
+    """Fills the viewer dependent parts of a rendered comment list.
+
+    The comment list is rendered once for all the viewers (see
+    courses/comment_list.html), this pass replaces its markers: the
+    author's own name by "Você", the edit links of the author's own
+    comments and the time since each comment.
+    """
+    user_id = str(user.pk)
+    now = timezone.now()
+
+    def author(match):
+        return '<strong>Você</strong> ' if match.group(1) == user_id else match.group(2)
+
+    def edit(match):
+        return EDIT_LINK.format(match.group(2)) if match.group(1) == user_id else ''
+
+    def since(match):
+        return timesince(parse_datetime(match.group(1)), now)
+
+    html = AUTHOR_RE.sub(author, html)
+    html = EDIT_RE.sub(edit, html)
+    return SINCE_RE.sub(since, html)
+
+
+def _enrollments_version_key(user_id):
+    return f'courses:enrollments-version:{user_id}'
+
+
+def _course_version_key(course_id):
+    return f'courses:course-version:{course_id}'
+
+
+def _comments_version_key(announcement_id):
+    return f'courses:comments-version:{announcement_id}'
+
+
+def _get_versions(keys):
+    """Returns the versions stored under `keys`, creating the missing ones.
+
+    A version is a random token, so a version lost by the cache never
+    matches an old fragment.
+    """
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, uuid.uuid4().hex, None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def get_enrollments_version(user_id):
+    """Returns the version of the enrollments of a user.
+
+    It's part of the cache keys of the dashboard fragments: a version of
+    the user, bumped by the changes of its own enrollments, and one per
+    course enrolled, bumped by the changes of the course. The ids of the
+    courses are kept with the version of the user, so they are only
+    queried when it changes.
+    """
+    from .models import Enrollment
+
+    key = _enrollments_version_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        course_ids = sorted(Enrollment.objects.filter(user_id=user_id).values_list('course_id', flat=True))
+        cache.add(key, (uuid.uuid4().hex, course_ids), None)
+        entry = cache.get(key) or (uuid.uuid4().hex, course_ids)
+    version, course_ids = entry
+    course_versions = _get_versions([_course_version_key(course_id) for course_id in course_ids])
+    return '-'.join([version, *map(str, course_versions)])
+
+
+def bump_enrollments_version(*user_ids):
+    """Invalidates the cached dashboard fragments of the users."""
+    cache.delete_many([_enrollments_version_key(user_id) for user_id in user_ids])
+
+
+def bump_course_version(course_id):
+    """Invalidates the cached dashboard fragments of the users enrolled on a course."""
+    cache.delete(_course_version_key(course_id))
+
+
+def get_comments_version(announcement_id):
+    """Returns the version of the comments of an announcement.
+
+    It's part of the cache keys of the rendered comments.
+    """
+    return _get_versions([_comments_version_key(announcement_id)])[0]
+
+
+def bump_comments_version(announcement_id):
+    """Invalidates the rendered comments of an announcement."""
+    cache.delete(_comments_version_key(announcement_id))
+
+
+def add_query_params(url, **params):
+    """Returns `url` with the `params` added to its query string."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(params)
+    return urlunsplit(parts._replace(query=urlencode(query)))
@@ -1,10 +1,37 @@
+import os
+import re
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from django.utils.text import get_valid_filename
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.shortcuts import render, get_object_or_404, redirect
-
-from .forms import ContactCourseForm, CommentForm
-from .models import Course, Enrollment, Lesson, Material
-from .decorators import enrollment_required
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+
+from .forms import ContactCourseForm, CommentForm, MaterialUploadForm
+from .models import Activity, Course, Enrollment, Lesson, Material, MaterialUpload
+from .events import get_broker
+from .activity import log_activity
+from .heartbeats import get_heartbeat_buffer
+from .feeds import atom_feed, json_feed
+from .decorators import check_enrollment, enrollment_required
+from .utils import add_query_params, personalize_comments
+from .files import serve_file, zip_response
+from .pagination import (
+    decode_cursor, encode_cursor, make_cursor, latest_page, newer_page, older_page, newest_first_page,
+)
 
 
 def index(request):
@@ -28,6 +55,7 @@ def details(request, pk, slug):
     context = {
         'course': course,
         'form': form,
+        'recommendations': Course.objects.recommended_for(course),
     }
     return render(request, 'courses/details.html', context)
 
@@ -75,20 +103,106 @@ def undo_enrollment(request, pk, slug):
 def announcements(request, pk, slug):
     """Displays the announcements of a course."""
     course = request.course
-    
+    enrollment = request.enrollment
+    try:
+        announcements, next_cursor = newest_first_page(
+            course.announcements.all(),
+            request.GET.get('antes'),
+            settings.ANNOUNCEMENTS_PAGE_SIZE,
+        )
+    except ValueError:
+        raise Http404('Página inválida.')
+
+    announcements = (
+        announcements
+        .select_related('course')
+        # The list shows only the excerpts.
+        .defer('content', 'content_html')
+        .annotate(
+            num_comments=Count('comments'),
+            last_comment_at=Max('comments__created_at'),
+        )
+    )
+    for announcement in announcements:
+        announcement.is_unread = enrollment is not None and not enrollment.has_read(announcement)
+
     context = {
         'course': course,
-        'announcements': course.announcements.all(),
+        'announcements': announcements,
+        'unread_count': enrollment.unread_announcements().count() if enrollment else 0,
+        'feed_token': enrollment.feed_token if enrollment and enrollment.is_approved() else None,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('antes'),
     }
     return render(request, 'courses/announcements.html', context)
 
 
+@require_safe
+def announcements_feed(request, pk, slug, token, feed_format):
+    """The announcements of a course as an Atom or JSON feed.
+
+    Authenticated by the feed token of an approved enrollment, instead of
+    the session, for feed readers. The ETag and Last-Modified come from
+    the same query that checks the token, so an unchanged feed costs a
+    single query and a 304.
+    """
+    enrollment = get_object_or_404(
+        Enrollment.objects
+        .filter(course__pk=pk, course__slug=slug, status=Enrollment.EnrollmentStatus.APROVADO)
+        .select_related('course')
+        .annotate(
+            announcements_updated_at=Max('course__announcements__updated_at'),
+            # Tells when an announcement was deleted.
+            announcements_count=Count('course__announcements'),
+        ),
+        feed_token=token,
+    )
+    course = enrollment.course
+    updated_at = max(filter(None, (course.updated_at, enrollment.announcements_updated_at)))
+    last_modified = int(updated_at.timestamp())
+    etag = quote_etag(f'{feed_format}-{enrollment.announcements_count}-{updated_at.timestamp()}')
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        announcements = (
+            course.announcements
+            .select_related('course')
+            .order_by('-created_at', '-pk')[:settings.ANNOUNCEMENTS_FEED_SIZE]
+        )
+        if feed_format == 'json':
+            response = JsonResponse(
+                json_feed(request, course, announcements),
+                content_type='application/feed+json',
+            )
+        else:
+            response = HttpResponse(
+                atom_feed(request, course, announcements),
+                content_type='application/atom+xml; charset=utf-8',
+            )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # The feed is private, only the reader of the token may keep it.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _render_comments(comments):
+    """Renders a list of comments, the same for every viewer.
+
+    The result must go through utils.personalize_comments() before being
+    shown to a user.
+    """
+    return render_to_string('courses/comment_list.html', {'comments': comments})
+
+
 @login_required
 @enrollment_required
 def announcement_details(request, pk, slug, announcement_pk):
     """Displays the details about an announcement and the comments."""
     course = request.course
     announcement = get_object_or_404(course.announcements.all(), pk=announcement_pk)
+    if request.enrollment:
+        request.enrollment.mark_announcement_read(announcement)
 
     # Creates a comment on the announcement.
     form = CommentForm(request.POST or None)
@@ -97,15 +211,154 @@ def announcement_details(request, pk, slug, announcement_pk):
         messages.success(request, 'Seu comentário foi enviado.')
         return redirect(announcement)
 
+    # The newest comments are rendered once per version of the thread, the
+    # older ones are loaded on demand.
+    cache_key = announcement.comments_cache_key('latest')
+    thread = cache.get(cache_key)
+    if thread is None:
+        comments, has_older = latest_page(
+            announcement.comments.with_authors(), 
+            settings.COMMENTS_PAGE_SIZE,
+        )
+        loaded = list(comments)
+        thread = {
+            'html': _render_comments(comments),
+            'count': len(loaded),
+            'has_older': has_older,
+            'older_cursor': encode_cursor(loaded[0]) if loaded else '',
+            # Without comments, any comment is newer than the announcement.
+            'newer_cursor': encode_cursor(loaded[-1]) if loaded else make_cursor(announcement.created_at, 0),
+        }
+        cache.set(cache_key, thread, settings.COMMENTS_CACHE_TIMEOUT)
+
     context = {
         'course': course,
         'announcement': announcement,
-        'comments': announcement.comments.all(),
+        'comments_html': mark_safe(personalize_comments(thread['html'], request.user)),
+        'comments_count': thread['count'],
+        'has_older': thread['has_older'],
+        'older_cursor': thread['older_cursor'],
+        'newer_cursor': thread['newer_cursor'],
+        'comment_events': settings.COMMENT_EVENTS_ENABLED,
         'form': form,
     }
     return render(request, 'courses/announcement_details.html', context)
 
 
+@require_safe
+@login_required
+@enrollment_required
+def announcement_comments(request, pk, slug, announcement_pk):
+    """Returns a page of comments, as a JSON with the rendered HTML.
+
+    Use ?antes=<cursor> for the comments older than the cursor, or
+    ?depois=<cursor> for the newer ones. Without cursor returns the
+    newest comments.
+    """
+    course = request.course
+    announcement = get_object_or_404(course.announcements.all(), pk=announcement_pk)
+    before, after = request.GET.get('antes'), request.GET.get('depois')
+    direction, cursor = ('antes', before) if before else ('depois', after)
+    # Keyed on the decoded position: invalid cursors never reach the cache
+    # and the encodings of a same position share the entry.
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+    if position:
+        created_at, comment_pk = position
+        cache_key = announcement.comments_cache_key(f'{direction}:{created_at.timestamp()}:{comment_pk}')
+    else:
+        cache_key = announcement.comments_cache_key('latest-page')
+    data = cache.get(cache_key)
+    if data is None:
+        comments = announcement.comments.with_authors()
+        size = settings.COMMENTS_PAGE_SIZE
+        if not position:
+            page, has_more = latest_page(comments, size)
+            page = list(page)
+            next_cursor = encode_cursor(page[-1]) if page else ''
+        elif direction == 'antes':
+            page, has_more = older_page(comments, cursor, size)
+            next_cursor = encode_cursor(page[0]) if page else cursor
+        else:
+            page, has_more = newer_page(comments, cursor, size)
+            next_cursor = encode_cursor(page[-1]) if page else cursor
+
+        data = {
+            'html': _render_comments(page),
+            'count': len(page),
+            'has_more': has_more,
+            'cursor': next_cursor,
+        }
+        cache.set(cache_key, data, settings.COMMENTS_CACHE_TIMEOUT)
+
+    return JsonResponse({**data, 'html': personalize_comments(data['html'], request.user)})
+
+
+def _announcement_for_events(request, pk, slug, announcement_pk):
+    """Returns the announcement if the user can see it, otherwise None."""
+    if not request.user.is_authenticated:
+        return None
+    course = get_object_or_404(Course, pk=pk, slug=slug)
+    if not check_enrollment(request.user, course)[0]:
+        return None
+    return get_object_or_404(course.announcements.all(), pk=announcement_pk)
+
+
+def _new_comments_event(request, announcement, cursor):
+    """Returns the SSE event with the comments newer than `cursor`, or ''."""
+    comments = announcement.comments.with_authors()
+    page, _ = newer_page(comments, cursor, settings.COMMENTS_PAGE_SIZE)
+    if not page:
+        return ''
+    html = personalize_comments(_render_comments(page), request.user)
+    data = json.dumps({'html': html, 'count': len(page)})
+    return f'id: {encode_cursor(page[-1])}\nevent: comments\ndata: {data}\n\n'
+
+
+async def announcement_events(request, pk, slug, announcement_pk):
+    """A server-sent events stream of the new comments of an announcement.
+
+    Each request waits, without holding a thread, until a comment is saved
+    or COMMENT_EVENTS_TIMEOUT passes, then returns the events and closes.
+    The EventSource of the browser reconnects by itself sending the id of
+    the last event (the cursor of the last comment) in Last-Event-ID.
+    Must be served by ASGI, with WSGI each waiting viewer holds a worker,
+    so it's only enabled by COMMENT_EVENTS_ENABLED.
+    """
+    if not settings.COMMENT_EVENTS_ENABLED:
+        raise Http404('Atualizações ao vivo desativadas.')
+    announcement = await sync_to_async(_announcement_for_events)(
+        request, pk, slug, announcement_pk,
+    )
+    if announcement is None:
+        return HttpResponseForbidden()
+
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('depois')
+    if not cursor:
+        return JsonResponse({'error': 'Cursor obrigatório.'}, status=400)
+
+    new_comments_event = sync_to_async(_new_comments_event)
+    # Subscribes before looking at the db, so no comment is missed.
+    subscription = get_broker().subscribe(f'announcement-{announcement.pk}')
+    try:
+        event = await new_comments_event(request, announcement, cursor)
+        if not event and await subscription.wait(settings.COMMENT_EVENTS_TIMEOUT):
+            event = await new_comments_event(request, announcement, cursor)
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+    finally:
+        subscription.close()
+
+    # Asks the browser to reconnect right away.
+    body = 'retry: 500\n\n' + (event or ': sem novidades\n\n')
+    response = HttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 @enrollment_required
 def edit_comment(request, pk, slug, announcement_pk, comment_pk):
@@ -139,10 +392,21 @@ def lessons(request, pk, slug):
 
     if request.user.is_staff:
         lessons = course.lessons.all()
+    # The list shows only the excerpts.
+    lessons = lessons.defer('description', 'description_html')
+
+    enrollment = request.enrollment
+    progress = None
+    if enrollment is not None:
+        for lesson in lessons:
+            lesson.is_done = enrollment.has_done(lesson)
+            lesson.is_viewed = enrollment.has_viewed(lesson)
+        progress = enrollment.progress(course.lessons.values_list('order', flat=True))
 
     context = {
         'course': course,
         'lessons': lessons,
+        'progress': progress,
     }
     return render(request, 'courses/lessons.html', context)
 
@@ -157,6 +421,11 @@ def lesson_details(request, pk, slug, lesson_pk):
     if not request.user.is_staff and not lesson.is_available():
         messages.error(request, 'Esta aula não está disponível.')
         return redirect('courses:lessons', pk=course.pk, slug=course.slug)
+
+    enrollment = request.enrollment
+    if enrollment is not None:
+        enrollment.mark_lesson_viewed(lesson)
+    log_activity(Activity.Kind.AULA, request.user, course, lesson=lesson)
     
     # This just work if the instructor set the lesson order correctly.
     try:
@@ -174,10 +443,26 @@ def lesson_details(request, pk, slug, lesson_pk):
         'lesson': lesson,
         'prev_lesson': prev_lesson,
         'next_lesson': next_lesson,
+        'is_done': enrollment is not None and enrollment.has_done(lesson),
+        'can_mark_done': enrollment is not None,
     }
     return render(request, 'courses/lesson_details.html', context)
 
 
+@require_POST
+@login_required
+@enrollment_required
+def lesson_done(request, pk, slug, lesson_pk):
+    """Marks a lesson as done by the user."""
+    course = request.course
+    lesson = get_object_or_404(Lesson, course=course, pk=lesson_pk)
+    if request.enrollment is None or not (request.user.is_staff or lesson.is_available()):
+        return HttpResponseForbidden()
+    if request.enrollment.mark_lesson_done(lesson):
+        messages.success(request, 'Aula concluída.')
+    return redirect(lesson)
+
+
 @login_required
 @enrollment_required
 def material_details(request, pk, slug, material_pk):
@@ -193,10 +478,232 @@ def material_details(request, pk, slug, material_pk):
     if not material.is_embedded():
         messages.error(request, 'Esta aula não possui um vídeo disponível, tente um dos recursos abaixo.')
         return redirect(lesson)
+
+    log_activity(Activity.Kind.MATERIAL, request.user, course, lesson=lesson, material=material)
+
+    # Resumes the video where the user stopped.
+    position = get_heartbeat_buffer().get(request.user.pk, material.pk)
+    if position is None:
+        position = (
+            material.watch_positions
+            .filter(user=request.user)
+            .values_list('position', flat=True)
+            .first()
+        ) or 0
     
     context = {
         'course': course,
         'lesson': lesson,
         'material': material,
+        'video_url': add_query_params(material.url, enablejsapi=1, start=int(position)),
+        'heartbeat_interval': settings.WATCH_HEARTBEAT_INTERVAL,
+    }
+    return render(request, 'courses/material_details.html', context)
+
+
+@require_POST
+@login_required
+@enrollment_required
+def material_heartbeat(request, pk, slug, material_pk):
+    """Receives the position of the user on the video of a material.
+
+    Only buffered in memory, see courses.heartbeats. Expects the position,
+    in seconds, on the `posicao` field.
+    """
+    try:
+        position = float(request.POST['posicao'])
+    except (KeyError, ValueError):
+        return HttpResponse('Posição inválida.', status=400)
+    if not 0 <= position < 24 * 60 * 60:
+        return HttpResponse('Posição inválida.', status=400)
+
+    material = get_object_or_404(
+        Material.objects.only('pk'), lesson__course=request.course, pk=material_pk,
+    )
+    get_heartbeat_buffer().add(request.user.pk, material.pk, position)
+    return HttpResponse(status=204)
+
+
+@require_safe
+@login_required
+@enrollment_required
+def material_download(request, pk, slug, material_pk):
+    """Streams the resource of a material.
+
+    Supports byte ranges, so the videos can be seeked in the browser. By
+    default the resource is sent as an attachment, use ?inline=1 to play
+    it on the page.
+    """
+    course = request.course
+    material = get_object_or_404(
+        Material.objects.select_related('lesson'), 
+        lesson__course=course, 
+        pk=material_pk,
+    )
+    lesson = material.lesson
+
+    if not request.user.is_staff and not lesson.is_available():
+        messages.error(request, 'Este material não está disponível.')
+        return redirect('courses:lessons', pk=course.pk, slug=course.slug)
+
+    if not material.resource:
+        messages.error(request, 'Este material não possui um recurso para baixar.')
+        return redirect(lesson)
+
+    resource = material.resource
+    return serve_file(
+        request,
+        resource.storage,
+        resource.name,
+        filename=material.get_filename(),
+        as_attachment='inline' not in request.GET,
+    )
+
+
+def _material_entries(materials):
+    """Yields the (arcname, storage, name) of each resource for zip_response."""
+    for material in materials:
+        resource = material.resource
+        lesson = material.lesson
+        # A "/" in the names would create directories inside the archive.
+        folder = get_valid_filename(lesson.name).strip('.')
+        filename = get_valid_filename(material.get_filename()).lstrip('.') or os.path.basename(resource.name)
+        arcname = f'{lesson.order:02d} - {folder}/{filename}'
+        yield arcname, resource.storage, resource.name
+
+
+@require_safe
+@login_required
+@enrollment_required
+def lesson_materials_download(request, pk, slug, lesson_pk):
+    """Streams a ZIP file with all the resources of a lesson."""
+    course = request.course
+    lesson = get_object_or_404(Lesson, course=course, pk=lesson_pk)
+
+    if not request.user.is_staff and not lesson.is_available():
+        messages.error(request, 'Esta aula não está disponível.')
+        return redirect('courses:lessons', pk=course.pk, slug=course.slug)
+
+    materials = lesson.materials.exclude(resource='').exclude(resource__isnull=True)
+    if not materials.exists():
+        messages.error(request, 'Esta aula não possui recursos para baixar.')
+        return redirect(lesson)
+
+    materials = materials.select_related('lesson').order_by('pk')
+    return zip_response(_material_entries(materials), f'{course.slug}-aula-{lesson.order}.zip')
+
+
+@require_safe
+@login_required
+@enrollment_required
+def course_materials_download(request, pk, slug):
+    """Streams a ZIP file with the resources of all the lessons of a course."""
+    course = request.course
+    lessons = course.released_lessons()
+
+    if request.user.is_staff:
+        lessons = course.lessons.all()
+
+    materials = (
+        Material.objects
+        .filter(lesson__in=lessons)
+        .exclude(resource='')
+        .exclude(resource__isnull=True)
+    )
+    if not materials.exists():
+        messages.error(request, 'Este curso não possui recursos para baixar.')
+        return redirect('courses:lessons', pk=course.pk, slug=course.slug)
+
+    materials = materials.select_related('lesson').order_by('lesson__order', 'pk')
+    return zip_response(_material_entries(materials.iterator()), f'{course.slug}.zip')
+
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'chunk_size': settings.MATERIALS_UPLOAD_CHUNK_SIZE,
+        'url': reverse('courses:material_upload', args=(upload.pk,)),
+        'complete_url': reverse('courses:material_upload_complete', args=(upload.pk,)),
     }
-    return render(request, 'courses/material_details.html', context)
\ No newline at end of file
+
+
+@require_POST
+@staff_member_required
+def material_upload_start(request):
+    """Starts a resumable upload of the resource of a material."""
+    form = MaterialUploadForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    upload = form.save(request.user)
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@require_http_methods(['GET', 'PUT'])
+@staff_member_required
+def material_upload(request, upload_pk):
+    """Returns the state of an upload (GET) or receives a chunk (PUT).
+
+    A chunk is the request body, with the headers:
+        Content-Range: bytes <first byte>-<last byte>/<file size>
+        X-Chunk-Sha256: <SHA-256 of the chunk, in hex>
+    The first byte must be the current offset of the upload, so after a
+    failure the client asks for the state and continues from the offset.
+    """
+    if request.method == 'GET':
+        upload = get_object_or_404(MaterialUpload, pk=upload_pk, user=request.user)
+        return JsonResponse(_upload_state(upload))
+
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    checksum = request.headers.get('X-Chunk-Sha256', '')
+    if not match or not checksum:
+        return JsonResponse({'error': 'Cabeçalhos Content-Range e X-Chunk-Sha256 são obrigatórios.'}, status=400)
+
+    start, end, size = (int(value) for value in match.groups())
+    length = end - start + 1
+    upload = get_object_or_404(MaterialUpload, pk=upload_pk, user=request.user)
+    if size != upload.size or end >= size or length <= 0:
+        return JsonResponse({'error': 'Intervalo inválido.'}, status=416)
+    if length > settings.MATERIALS_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({'error': 'Parte maior que o permitido.'}, status=413)
+    if start != upload.offset:
+        # The client is out of sync, it must continue from the offset.
+        return JsonResponse(_upload_state(upload), status=409)
+
+    # Read from the client before taking the lock, however slow it is.
+    chunk_path = upload.receive_chunk(request, length, checksum)
+    if chunk_path is None:
+        return JsonResponse({'error': 'A soma de verificação não confere.', **_upload_state(upload)}, status=400)
+    try:
+        # Retries of the same chunk may arrive at the same time, the row
+        # lock makes only the first one append it.
+        with transaction.atomic():
+            upload = get_object_or_404(
+                MaterialUpload.objects.select_for_update(), pk=upload_pk, user=request.user,
+            )
+            if start != upload.offset:
+                return JsonResponse(_upload_state(upload), status=409)
+            upload.append_chunk(chunk_path, length)
+    finally:
+        os.remove(chunk_path)
+    return JsonResponse(_upload_state(upload))
+
+
+@require_POST
+@staff_member_required
+def material_upload_complete(request, upload_pk):
+    """Finishes an upload, saving the file as the resource of the material."""
+    # Two completes at the same time, the second finds the upload deleted.
+    with transaction.atomic():
+        upload = get_object_or_404(
+            MaterialUpload.objects.select_for_update(), pk=upload_pk, user=request.user,
+        )
+        if not upload.is_complete():
+            return JsonResponse(_upload_state(upload), status=409)
+        material = upload.complete()
+    return JsonResponse({'material': material.pk, 'resource': material.resource.name})
\ No newline at end of file
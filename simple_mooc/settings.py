@@ -53,7 +53,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -138,6 +138,83 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_ROOT = BASE_DIR / 'core' / 'media'
 MEDIA_URL = '/media/'
 
+# Lesson materials are only served through courses:material_download. To let
+# the front server send the file, set 'X-Accel-Redirect' (nginx) or
+# 'X-Sendfile' (Apache/lighttpd). With nginx the prefix must be an internal
+# location aliased to MEDIA_ROOT.
+MATERIALS_SENDFILE_HEADER = os.getenv('MATERIALS_SENDFILE_HEADER')
+MATERIALS_SENDFILE_PREFIX = os.getenv('MATERIALS_SENDFILE_PREFIX', '/protected-media/')
+
+# Biggest chunk accepted by the resumable upload of lesson materials.
+MATERIALS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+# Courses.
+
+# Announcements shown per page on the list of announcements.
+ANNOUNCEMENTS_PAGE_SIZE = 20
+# Announcements on the Atom and JSON feeds of a course.
+ANNOUNCEMENTS_FEED_SIZE = 20
+# Courses recommended on the details of a course, by build_recommendations.
+COURSE_RECOMMENDATIONS_SIZE = 4
+# Comments shown per page on the announcement details.
+COMMENTS_PAGE_SIZE = 50
+# Seconds a rendered page of comments is kept in the cache. It's also
+# invalidated when a comment is saved or deleted.
+COMMENTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The cache must be shared by all the processes: the sessions, the users
+# of the requests and the CacheBroker are kept on it. CACHE_LOCATION is
+# the memcached server, host:port. Without it the cache is local to each
+# process, only for development and the tests (see accounts.checks).
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+
+# The sessions are read from the cache and written through to the db.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Seconds the user of the requests is cached, see accounts.middleware.
+# It's also cleared when the user is saved or their groups change.
+USER_SNAPSHOT_CACHE_TIMEOUT = 60 * 15
+
+# Seconds the totals of the about page are cached, see core.stats.
+SITE_STATS_CACHE_TIMEOUT = 60 * 5
+# Courses per page and instructors shown on the about page.
+ABOUT_COURSES_PAGE_SIZE = 12
+ABOUT_INSTRUCTORS_SIZE = 12
+
+# Live comment updates, see courses.views.announcement_events. Off by
+# default: each viewer waits on an open request, which only costs nothing
+# under ASGI. Under WSGI (the gunicorn of the Procfile) each one holds a
+# worker, the "Carregar novos comentários" link is used instead.
+COMMENT_EVENTS_ENABLED = bool(int(os.getenv('COMMENT_EVENTS_ENABLED', '0')))
+# Broker of the live comment updates. With many processes use
+# 'courses.events.CacheBroker' and a cache shared by them.
+COURSES_EVENTS_BROKER = os.getenv('COURSES_EVENTS_BROKER', 'courses.events.LocalBroker')
+# Seconds a viewer waits for new comments before reconnecting.
+COMMENT_EVENTS_TIMEOUT = 25
+
+# Seconds between the watch position heartbeats of the video players.
+WATCH_HEARTBEAT_INTERVAL = 5
+# The heartbeats are buffered in memory and written to the db in batches,
+# every WATCH_POSITIONS_FLUSH_INTERVAL seconds (None: only by size, not
+# at exit) or when WATCH_POSITIONS_FLUSH_SIZE viewers are waiting.
+WATCH_POSITIONS_FLUSH_INTERVAL = 10
+WATCH_POSITIONS_FLUSH_SIZE = 500
+
+# The lesson and material views are logged in a ring buffer of at most
+# ACTIVITY_LOG_BUFFER_SIZE events (the oldest are dropped when full) and
+# inserted in batches of ACTIVITY_LOG_BATCH_SIZE, every
+# ACTIVITY_LOG_FLUSH_INTERVAL seconds (None: only by flush()).
+ACTIVITY_LOG_BUFFER_SIZE = 10000
+ACTIVITY_LOG_BATCH_SIZE = 500
+ACTIVITY_LOG_FLUSH_INTERVAL = 5
+
 
 # E-mails
 
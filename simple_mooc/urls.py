@@ -24,4 +24,11 @@ urlpatterns = [
     path('cursos/', include('courses.urls')),
     path('admin/', admin.site.urls),
     path('conta/', include('accounts.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Only the course images are public, the lesson materials are served by
+# courses:material_download after checking the enrollment.
+urlpatterns += static(
+    f'{settings.MEDIA_URL}courses/images/',
+    document_root=settings.MEDIA_ROOT / 'courses' / 'images',
+)